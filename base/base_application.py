@@ -1,19 +1,33 @@
 import json
 import os
 from collections import OrderedDict
+from pathlib import Path
 from time import sleep
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 from signalslot import Signal
 
 from base.common.config import Config, get_config
 from base.common.debug_utils import copy_logfiles_to_nas
-from base.common.exceptions import DockingError, MountError, NetworkError
+from base.common.exceptions import (
+    BackupHddAccessError,
+    DockingError,
+    MountError,
+    NetworkError,
+    SbuCommunicationTimeout,
+    SbuNoResponseError,
+    SerialInterfaceError,
+)
 from base.common.interrupts import Button0Interrupt, Button1Interrupt, ShutdownInterrupt
 from base.common.logger import LoggerFactory
+from base.common.ssh_interface import SSHInterface
 from base.hardware.hardware import Hardware
+from base.hardware.sbu.communicator import SbuCommunicator
 from base.hardware.sbu.sbu import WakeupReason
+from base.logic.backup.backup_browser import BackupBrowser
 from base.logic.backup.backup_conductor import BackupConductor
+from base.logic.backup.scrubber import Scrubber
+from base.logic.backup.synchronisation.bandwidth_controller import HardwareReadings
 from base.logic.schedule import Schedule
 from base.webapp.webapp_server import WebappServer
 
@@ -63,8 +77,9 @@ class BaSeApplication:
         self._config: Config = get_config("base.json")
         self._maintenance_mode = MaintenanceMode()
         self._hardware = Hardware()
-        self._backup_conductor = BackupConductor(self._maintenance_mode.is_on)
+        self._backup_conductor = BackupConductor(self._maintenance_mode.is_on, self._hardware_readings)
         self._schedule = Schedule()
+        self._scrubber: Optional[Scrubber] = None
         self._maintenance_mode.set_connections([(self._schedule.backup_request, self._backup_conductor.run)])
         self._codebook = {
             "dock": self._hardware.dock,
@@ -81,6 +96,7 @@ class BaSeApplication:
         self._connect_signals()
 
     def start(self) -> None:
+        self._hardware.start_telemetry()
         self.prepare_service()
         while not self._shutting_down:
             try:
@@ -118,6 +134,7 @@ class BaSeApplication:
 
     def _on_go_to_idle_state(self, **kwargs):  # type: ignore
         self._schedule.on_reschedule_backup()
+        self._schedule.on_schedule_scrub()
         if self._config.shutdown_between_backups:
             LOG.info("Now starting sleep timer")
             self.schedule_shutdown_timer()
@@ -125,6 +142,7 @@ class BaSeApplication:
             LOG.info("Now staying awake")
 
     def _on_backup_request(self, **kwargs):  # type: ignore
+        self._stop_scrubbing()
         try:
             self._backup_conductor.run()
         except NetworkError as e:
@@ -135,21 +153,52 @@ class BaSeApplication:
             LOG.error(e)
         # TODO: Postpone backup
 
+    def _hardware_readings(self) -> HardwareReadings:
+        try:
+            return HardwareReadings(
+                sbu_temperature=self._hardware.sbu_temperature, input_current=self._hardware.input_current
+            )
+        except (SbuCommunicationTimeout, SbuNoResponseError, SerialInterfaceError) as e:
+            LOG.debug(f"cannot read the measurements of the SBU: {e}")
+            return HardwareReadings()
+
+    def _on_scrub_request(self, **kwargs):  # type: ignore
+        """scrubs only while the backup hdd is mounted anyway and no backup is running"""
+        if self._backup_conductor.is_running or not self._hardware.mounted:
+            return
+        if self._scrubber is not None and self._scrubber.is_alive():
+            return
+        try:
+            browser = BackupBrowser()
+            self._scrubber = Scrubber(Path(get_config("sync.json").local_backup_target_location), browser.catalog)
+        except BackupHddAccessError as e:
+            LOG.warning(f"cannot scrub: {e}")
+            return
+        self._scrubber.start()
+
+    def _stop_scrubbing(self) -> None:
+        if self._scrubber is not None and self._scrubber.is_alive():
+            self._scrubber.terminate()
+            self._scrubber.join()
+
     def schedule_shutdown_timer(self) -> None:
         if not self._backup_conductor.is_running:
             self._schedule.on_shutdown_requested()
 
     def finalize_service(self) -> None:
+        SSHInterface.close_all()
         self._hardware.disengage()
         self._hardware.prepare_sbu_for_shutdown(
             self._schedule.next_backup_timestamp, self._schedule.next_backup_seconds  # Todo: wake BCU a little earlier?
         )
+        SbuCommunicator.close_session()
         self._execute_shutdown()
         sleep(1)
 
     def _connect_signals(self) -> None:
         self._schedule.shutdown_request.connect(self._initiate_shutdown)
         self._schedule.backup_request.connect(self._on_backup_request)
+        self._schedule.scrub_request.connect(self._on_scrub_request)
         self._backup_conductor.postpone_request.connect(self._schedule.on_postpone_backup)
         self._backup_conductor.reschedule_request.connect(self._schedule.on_reschedule_backup)
         self._backup_conductor.hardware_engage_request.connect(self._hardware.engage)
@@ -174,7 +223,8 @@ class BaSeApplication:
         os.system("shutdown -h now")  # TODO: os.system() is deprecated. Replace with subprocess.call().
 
     def _stop_threads(self) -> None:
-        pass
+        self._stop_scrubbing()
+        self._hardware.stop_telemetry()  # it would reopen the SBU session after finalize_service has closed it
 
     @property
     def collect_status(self) -> str:
@@ -196,6 +246,7 @@ class BaSeApplication:
                 "mounted": self._hardware.mounted,
                 "backup_running": self._backup_conductor.is_running,
                 "backup_hdd_usage": self._hardware.drive_space_used,
+                "last_verification": self._backup_conductor.last_verification,
                 "recent_warnings_count": LoggerFactory.get_warning_count(),
                 "log_tail": LoggerFactory.get_last_lines(),
             }
@@ -203,4 +254,6 @@ class BaSeApplication:
 
     def on_webapp_event(self, payload, **kwargs):  # type: ignore
         LOG.debug(f"received webapp event with payload: {payload}")
+        if payload in ["unmount", "undock", "unpower"]:
+            self._stop_scrubbing()  # an open file would keep the backup hdd busy
         self._codebook[payload]()
@@ -25,6 +25,8 @@ class BoundConfig(Config):
         return self
 
     def __init__(self, config_file_name: str, read_only: bool = True, *args: Any, **kwargs: Any) -> None:
+        if "_initialized" in self.__dict__:
+            return  # __new__ has returned the instance that is bound to this file already
         super(Config, self).__init__(*args, **kwargs)
         self._read_only: bool = read_only
         self._config_path: Path = self.base_path / config_file_name
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Dict, Tuple
+
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class DiskUsage:
+    total_bytes: int
+    free_bytes: int  # available to unprivileged users, like "avail" of df
+    used_bytes: int
+    free_inodes: int
+
+    @property
+    def percent_used(self) -> int:
+        """rounded up, like "use%" of df"""
+        usable_bytes = self.used_bytes + self.free_bytes
+        return math.ceil(100 * self.used_bytes / usable_bytes) if usable_bytes else 0
+
+    @classmethod
+    def from_statvfs(cls, stat: os.statvfs_result) -> DiskUsage:
+        return cls(
+            total_bytes=stat.f_blocks * stat.f_frsize,
+            free_bytes=stat.f_bavail * stat.f_frsize,
+            used_bytes=(stat.f_blocks - stat.f_bfree) * stat.f_frsize,
+            free_inodes=stat.f_favail,
+        )
+
+
+class DiskSpace:
+    """Reports the usage of the file system a path is located on. Results are cached for a short time, since the status
+    is polled every second. Whoever writes or deletes large amounts of data on the backup hdd calls invalidate()."""
+
+    ttl: float = 2.0
+    _cache: Dict[Path, Tuple[float, DiskUsage]] = {}
+    _lock = Lock()
+
+    @classmethod
+    def usage(cls, path: Path) -> DiskUsage:
+        """:raises OSError: if the path cannot be accessed"""
+        with cls._lock:
+            cached = cls._cache.get(path)
+            if cached is not None and monotonic() - cached[0] < cls.ttl:
+                return cached[1]
+        usage = DiskUsage.from_statvfs(os.statvfs(path))
+        with cls._lock:
+            cls._cache[path] = (monotonic(), usage)
+        return usage
+
+    @classmethod
+    def invalidate(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import socket
+from threading import Lock
 from types import TracebackType
-from typing import Optional, Tuple, Type, Union
+from typing import Dict, Optional, Tuple, Type, Union
 
 import paramiko
 
@@ -12,11 +13,40 @@ from base.common.logger import LoggerFactory
 LOG = LoggerFactory.get_logger(__name__)
 
 
+KEEPALIVE_INTERVAL = 30  # seconds, detects connections that have been dropped by the nas
+
+
 class SSHInterface:
+    """Established connections are kept open and shared per host and user, so that the handshake and the
+    authentication happen once per session instead of once per command. close_all() closes them."""
+
+    _pool: Dict[Tuple[str, str], paramiko.SSHClient] = {}
+    _pool_lock = Lock()
+
     def __init__(self) -> None:
         self._client = paramiko.SSHClient()
+        self._pooled = False
 
     def connect(self, host: str, user: str) -> str:
+        with self._pool_lock:
+            pooled_client = self._pool.get((host, user))
+            if pooled_client is not None and _is_active(pooled_client):
+                self._client = pooled_client
+                self._pooled = True
+                return "Established"
+            if pooled_client is not None:
+                LOG.info(f"connection to {user}@{host} has been lost, reconnecting")
+                pooled_client.close()
+            response = self._connect(host, user)
+            if response == "Established":
+                self._pool[(host, user)] = self._client
+                self._pooled = True
+                transport = self._client.get_transport()
+                if transport is not None:
+                    transport.set_keepalive(KEEPALIVE_INTERVAL)
+            return response
+
+    def _connect(self, host: str, user: str) -> str:
         try:
             self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             self._client.connect(host, username=user, timeout=10)
@@ -48,7 +78,15 @@ class SSHInterface:
     def __exit__(
         self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException], exc_tb: Optional[TracebackType]
     ) -> None:
-        self._client.close()
+        if not self._pooled:
+            self._client.close()
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._pool_lock:
+            for client in cls._pool.values():
+                client.close()
+            cls._pool.clear()
 
     def run(self, command: str) -> Union[Tuple[None, None], Tuple[str, str]]:
         response = None, None
@@ -70,3 +108,8 @@ class SSHInterface:
             raise RuntimeError(stderr_lines)
         else:
             return "".join([line for line in stdout])
+
+
+def _is_active(client: paramiko.SSHClient) -> bool:
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
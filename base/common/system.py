@@ -1,10 +1,11 @@
-import subprocess
 from pathlib import Path
 from subprocess import PIPE, Popen
-from typing import IO, List
+from typing import List, Optional, Tuple
 
+from base.common.disk_space import DiskSpace
 from base.common.exceptions import BackupSizeRetrievalError, NetworkError
 from base.common.logger import LoggerFactory
+from base.logic.backup.synchronisation.change_list import ChangeList, parse_change_list
 from base.logic.backup.synchronisation.rsync_command import RsyncCommand
 
 LOG = LoggerFactory.get_logger(__name__)
@@ -12,47 +13,39 @@ LOG = LoggerFactory.get_logger(__name__)
 
 class System:
     @staticmethod
-    def size_of_next_backup(local_target_location: Path, source_location: Path) -> int:
+    def size_of_next_backup(
+        local_target_location: Path, source_location: Path, link_dest: Optional[Path] = None
+    ) -> int:
         """Return size of next backup increment in bytes."""
-        cmd = RsyncCommand().compose(local_target_location, source_location, dry=True)
+        size, _ = System.dry_run_next_backup(local_target_location, source_location, link_dest)
+        return size
+
+    @staticmethod
+    def dry_run_next_backup(
+        local_target_location: Path, source_location: Path, link_dest: Optional[Path] = None
+    ) -> Tuple[int, ChangeList]:
+        """Return size of next backup increment in bytes and the paths that are going to be transferred or deleted."""
+        cmd = RsyncCommand().compose(local_target_location, source_location, dry=True, link_dest=link_dest)
         LOG.info(f"estimating size of new backup with: {cmd}")
         p = Popen(cmd, stdout=PIPE, stderr=PIPE, shell=True)
-        p.wait()
+        stdout, stderr = p.communicate()
+        lines = stdout.splitlines()
         try:
-            lines: List[str] = [
-                l.decode() for l in p.stdout.readlines() if l.startswith(b"Total transferred file size")  # type: ignore
-            ]
-            line = lines[0]
-            return int("".join(c for c in line if c.isdigit()))
-        except (IndexError, ValueError, AttributeError) as e:
-            if p.stderr:
-                LOG.error("\n".join([str(l) for l in p.stderr.read()]))
+            line = [l.decode() for l in lines if l.startswith(b"Total transferred file size")][0]
+            size = int("".join(c for c in line if c.isdigit()))
+        except (IndexError, ValueError) as e:
+            LOG.error(stderr.decode(errors="replace"))
             raise BackupSizeRetrievalError from e
-
-    @staticmethod
-    def copy_newest_backup_with_hardlinks(recent_backup: Path, new_backup: Path) -> subprocess.Popen:
-        copy_command = f"cp -al {recent_backup}/* {new_backup}"
-        LOG.info(f"copy command: {copy_command}")
-        return Popen(copy_command, bufsize=0, shell=True, stdout=PIPE, stderr=PIPE)
+        return size, parse_change_list(lines)
 
     @staticmethod
     def free_space(backup_target: Path) -> int:
         """returns free space on backup hdd in bytes"""
-
-        def _remove_heading_from_df_output(df_output: IO[bytes]) -> int:
-            return int(list(df_output)[-1].decode().strip())
-
-        command: List[str] = ["df", "--output=avail", backup_target.as_posix()]
-        out = Popen(command, stdout=PIPE, stderr=PIPE)
-        out.wait()
-        if out.stderr is not None:
-            stderr_lines = out.stderr.readlines()
-            if stderr_lines:
-                raise BackupSizeRetrievalError(
-                    f"Cannot obtain free space on backup hdd: {[stderr_line.decode().strip() for stderr_line in stderr_lines]}"
-                )
-        free_space_on_bu_hdd = _remove_heading_from_df_output(out.stdout)  # type: ignore
-        LOG.info(f"obtaining free space on bu hdd with command: {' '.join(command)}. Received {free_space_on_bu_hdd}")
+        try:
+            free_space_on_bu_hdd = DiskSpace.usage(backup_target).free_bytes
+        except OSError as e:
+            raise BackupSizeRetrievalError(f"Cannot obtain free space on backup hdd: {e}") from e
+        LOG.info(f"free space on bu hdd: {free_space_on_bu_hdd} bytes")
         return free_space_on_bu_hdd
 
 
@@ -1,11 +1,11 @@
 from pathlib import Path
-from subprocess import PIPE, Popen, run
+from subprocess import PIPE, run
 from time import sleep, time
 from typing import Optional
-from typing.io import IO
 
 from base.common.config import Config, get_config
 from base.common.constants import BACKUP_HDD_DEVICE_NODE
+from base.common.disk_space import DiskSpace
 from base.common.exceptions import BackupHddNotAvailable, MountError, UnmountError
 from base.common.logger import LoggerFactory
 from base.common.status import HddState
@@ -28,6 +28,7 @@ class Drive:
             LOG.info(f"Mounted /dev/BACKUPHDD at {self._config.backup_hdd_mount_point}")
         else:
             LOG.debug("BackupHDD is already mounted. No need to mount")
+        DiskSpace.invalidate()
         self._available = HddState.available
 
     def unmount(self) -> None:
@@ -36,6 +37,7 @@ class Drive:
             self._unmount_backup_hdd_or_raise()
         else:
             LOG.debug("Backup HDD not mounted, therefore no need to unmount")
+        DiskSpace.invalidate()
         self._available = HddState.not_available
 
     def _wait_for_backup_hdd(self) -> None:
@@ -96,38 +98,14 @@ class Drive:
     def space_used_percent(self) -> int:
         space_used = 0
         if self.is_mounted:
-            mount_point = self._config.backup_hdd_mount_point
-            command = ["df", "--output=pcent", mount_point]
-            LOG.debug(f"obtaining space used on bu hdd with command: {command}")
             try:
-                proc = Popen(command, stdout=PIPE, stderr=PIPE)
-                assert proc.stdout is not None
-                space_used = int(self._extract_space_used_from_output(proc.stdout))
-            except FileNotFoundError:
-                LOG.debug(f"FileNotFound during 'space_used_percent' with command {command}")
-            except TypeError:
-                LOG.debug(f"Retrival of used space not possible yet. Mounting still in progress")
-            except IndexError:
-                LOG.debug(f"IndexError during 'space_used_percent' with command {command}")
-            except ValueError:
-                LOG.debug(f"Value Error during 'space_used_percent' with command {command}")
-        LOG.debug("not mounted")
+                space_used = DiskSpace.usage(Path(self._config.backup_hdd_mount_point)).percent_used
+            except OSError as e:
+                LOG.debug(f"Retrival of used space not possible: {e}")
+        else:
+            LOG.debug("not mounted")
         return space_used
 
-    def _extract_space_used_from_output(self, df_output: IO[bytes]) -> float:
-        df_output_str = self._get_string_from_df_output(df_output)
-        space_used_percentage = self._remove_heading_from_df_output(df_output_str)
-        return space_used_percentage
-
-    @staticmethod
-    def _get_string_from_df_output(df_output: IO[bytes]) -> str:
-        return str(df_output.read().decode())
-
-    @staticmethod
-    def _remove_heading_from_df_output(df_output_str: str) -> float:
-        string = "".join(x for x in df_output_str if x.isdigit())
-        return float(string) if string else 0
-
     def _call_mount_command(self) -> None:
         command = f"mount {self._backup_hdd_device_node}"
         LOG.debug(f"Mounting with {command}")
@@ -11,6 +11,7 @@ from base.hardware.mechanics import Mechanics
 from base.hardware.power import Power
 from base.hardware.sbu.communicator import SbuCommunicator
 from base.hardware.sbu.sbu import SBU, WakeupReason
+from base.hardware.sbu.telemetry import INPUT_CURRENT, SBU_TEMPERATURE, VCC3V, SbuTelemetry
 from base.logic.backup.backup_browser import BackupBrowser
 
 LOG = LoggerFactory.get_logger(__name__)
@@ -22,9 +23,19 @@ class Hardware:
         self._mechanics: Mechanics = Mechanics()
         self._power: Power = Power()
         self._sbu: SBU = SBU(SbuCommunicator())
+        self._telemetry: SbuTelemetry = SbuTelemetry(self._sbu)
         self._hmi: HMI = HMI(self._sbu)
         self._drive: Drive = Drive()
 
+    def start_telemetry(self) -> None:
+        if self._sbu.available:
+            self._telemetry.start()
+
+    def stop_telemetry(self) -> None:
+        self._telemetry.terminate()
+        if self._telemetry.is_alive():
+            self._telemetry.join()
+
     def get_wakeup_reason(self) -> WakeupReason:
         return self._sbu.request_wakeup_reason()
 
@@ -68,7 +79,7 @@ class Hardware:
 
     @property
     def powered(self) -> bool:
-        input_current = self._sbu.measure_base_input_current()
+        input_current = self.input_current
         return False if input_current is None else self.docked and input_current > 0.3 or False
 
     def unpower(self) -> None:
@@ -94,15 +105,15 @@ class Hardware:
 
     @property
     def input_current(self) -> Optional[float]:
-        return self._sbu.measure_base_input_current()
+        return self._telemetry.get(INPUT_CURRENT)
 
     @property
     def system_voltage_vcc3v(self) -> Optional[float]:
-        return self._sbu.measure_vcc3v_voltage()
+        return self._telemetry.get(VCC3V)
 
     @property
     def sbu_temperature(self) -> Optional[float]:
-        return self._sbu.measure_sbu_temperature()
+        return self._telemetry.get(SBU_TEMPERATURE)
 
     @property
     def bcu_temperature(self) -> float:
@@ -0,0 +1,64 @@
+import json
+import os
+from pathlib import Path
+from typing import Sequence
+
+from base.common.constants import BAUD_RATE
+from base.common.exceptions import SbuCommunicationTimeout
+from base.common.logger import LoggerFactory
+from base.hardware.sbu.serial_interface import SerialInterface
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+def negotiate_baud_rate(interface: SerialInterface, candidates: Sequence[int]) -> int:
+    """Raises the baud rate of the open interface to the highest candidate the SBU supports.
+
+    The BaSe proposes a rate with "BD:<rate>". The SBU answers "BD:<rate>" if it supports the rate and switches to it
+    after Ready, or "BD:0" if it doesn't. Then the new rate is verified with the echo test. The SBU has to return to
+    BAUD_RATE by itself if it doesn't receive a valid message within a second after switching. Firmware that doesn't
+    know "BD" doesn't answer, so the negotiation ends at the current rate.
+
+    :return: the rate that is in effect afterwards
+    """
+    for rate in sorted(candidates, reverse=True):
+        if rate <= interface.baud_rate:
+            break
+        try:
+            accepted = interface.propose_baud_rate(rate)
+        except SbuCommunicationTimeout as e:
+            LOG.debug(f"SBU doesn't negotiate the baud rate: {e}")
+            break
+        if not accepted:
+            continue
+        previous_rate = interface.baud_rate
+        interface.change_baud_rate(rate)
+        if interface.echo():
+            LOG.info(f"SBU communicates at {rate} baud")
+            return rate
+        LOG.warning(f"verification of {rate} baud failed, falling back to {previous_rate} baud")
+        interface.change_baud_rate(previous_rate)
+        if not interface.echo():
+            break
+    return interface.baud_rate
+
+
+def load_baud_rate(path: Path) -> int:
+    """the rate of the last negotiation, the SBU keeps it while the BaSe is shut down"""
+    try:
+        return int(json.loads(Path(path).read_text())["baud_rate"])
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        LOG.warning(f"ignoring the invalid baud rate file {path}: {e}")
+    return BAUD_RATE
+
+
+def save_baud_rate(path: Path, baud_rate: int) -> None:
+    path = Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+    try:
+        temporary.write_text(json.dumps({"baud_rate": baud_rate}))
+        os.replace(temporary, path)
+    except OSError as e:
+        LOG.warning(f"cannot write the baud rate file {path}: {e}")
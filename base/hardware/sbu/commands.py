@@ -1,24 +1,35 @@
 from dataclasses import dataclass
+from enum import IntEnum
+
+
+class SbuPriority(IntEnum):
+    """the SbuSession handles pending commands with lower values first"""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
 
 
 @dataclass
 class SbuCommand:
     message_code: str
     response_keyword: str = ""
+    priority: SbuPriority = SbuPriority.NORMAL
 
 
 class SbuCommands:
     test = SbuCommand(message_code="Test", response_keyword="Echo")
+    set_baud_rate = SbuCommand(message_code="BD", response_keyword="BD")
     write_to_display_line1 = SbuCommand(message_code="D1")
     write_to_display_line2 = SbuCommand(message_code="D2")
     set_display_brightness = SbuCommand(message_code="DB")
     set_led_brightness = SbuCommand(message_code="DL")
-    set_seconds_to_next_bu = SbuCommand(message_code="BU", response_keyword="CMP")
+    set_seconds_to_next_bu = SbuCommand(message_code="BU", response_keyword="CMP", priority=SbuPriority.HIGH)
     send_readable_timestamp_of_next_bu = SbuCommand(message_code="BR")
-    measure_current = SbuCommand(message_code="CC", response_keyword="CC")
-    measure_vcc3v = SbuCommand(message_code="3V", response_keyword="3V")
-    measure_temperature = SbuCommand(message_code="TP", response_keyword="TP")
-    request_shutdown = SbuCommand(message_code="SR")
-    abort_shutdown = SbuCommand(message_code="SA")
+    measure_current = SbuCommand(message_code="CC", response_keyword="CC", priority=SbuPriority.LOW)
+    measure_vcc3v = SbuCommand(message_code="3V", response_keyword="3V", priority=SbuPriority.LOW)
+    measure_temperature = SbuCommand(message_code="TP", response_keyword="TP", priority=SbuPriority.LOW)
+    request_shutdown = SbuCommand(message_code="SR", priority=SbuPriority.HIGH)
+    abort_shutdown = SbuCommand(message_code="SA", priority=SbuPriority.HIGH)
     request_wakeup_reason = SbuCommand(message_code="WR")
     set_wakeup_reason = SbuCommand(message_code="WD")
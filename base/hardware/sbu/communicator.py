@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+from concurrent.futures import TimeoutError
 from pathlib import Path
+from threading import Lock
 from typing import Optional
 
-from base.common.constants import BAUD_RATE
-from base.common.exceptions import ComponentOffError, SbuCommunicationTimeout, SbuNoResponseError, SbuNotAvailableError
+from base.common.exceptions import ComponentOffError, SbuCommunicationTimeout, SbuNotAvailableError
 from base.common.logger import LoggerFactory
 from base.hardware.sbu.commands import SbuCommand
 from base.hardware.sbu.message import SbuMessage
-from base.hardware.sbu.serial_interface import SerialInterface
+from base.hardware.sbu.session import SbuSession
 from base.hardware.sbu.uart_finder import get_sbu_uart_interface
 
 LOG = LoggerFactory.get_logger(__name__)
@@ -16,6 +17,8 @@ LOG = LoggerFactory.get_logger(__name__)
 
 class SbuCommunicator:
     _sbu_uart_interface: Optional[Path] = None
+    _session: Optional[SbuSession] = None
+    _session_lock = Lock()
 
     def __init__(self) -> None:
         if self._sbu_uart_interface is None:
@@ -42,25 +45,41 @@ class SbuCommunicator:
         return interface
 
     def write(self, command: SbuCommand, payload: str = "") -> None:
-        message = SbuMessage(command=command, payload=payload)
         if self._sbu_uart_interface is not None:
-            try:
-                with SerialInterface(port=self._sbu_uart_interface, baud_rate=BAUD_RATE) as ser:
-                    ser.write_to_sbu(message=message)
-            except SbuNoResponseError as e:
-                raise e
-            except SbuCommunicationTimeout as e:
-                raise e
+            self._request(SbuMessage(command=command, payload=payload), query=False)
 
     def query(self, command: SbuCommand, payload: str = "") -> str:
         sbu_response = ""
         if self._sbu_uart_interface is not None:
-            message = SbuMessage(command=command, payload=payload)
-            try:
-                with SerialInterface(port=self._sbu_uart_interface, baud_rate=BAUD_RATE) as ser:
-                    sbu_response = ser.query_from_sbu(message=message)
-            except SbuNoResponseError as e:
-                raise e
-            except SbuCommunicationTimeout as e:
-                raise e
+            sbu_response = self._request(SbuMessage(command=command, payload=payload), query=True)
         return sbu_response
+
+    def _request(self, message: SbuMessage, query: bool) -> str:
+        """:raises: the errors of the SerialInterface, SbuCommunicationTimeout if the session doesn't respond in time"""
+        session = self._get_session()
+        future = session.submit(message, query=query)
+        try:
+            response: str = future.result(timeout=session.request_timeout)
+        except TimeoutError as e:
+            future.cancel()
+            raise SbuCommunicationTimeout(f"no response to {message.code} within {session.request_timeout}s") from e
+        return response
+
+    def _get_session(self) -> SbuSession:
+        """one session for all communicators, it's started with the first request"""
+        assert self._sbu_uart_interface is not None
+        with self._session_lock:
+            session = SbuCommunicator._session
+            if session is None or session.closed:
+                session = SbuSession(port=self._sbu_uart_interface)
+                session.start()
+                SbuCommunicator._session = session
+            return session
+
+    @classmethod
+    def close_session(cls) -> None:
+        """releases the serial port, e.g. before the SBU is flashed or the BaSe shuts down"""
+        with cls._session_lock:
+            if cls._session is not None:
+                cls._session.close(timeout=cls._session.request_timeout)
+                cls._session = None
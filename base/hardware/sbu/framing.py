@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import struct
+from binascii import crc_hqx
+from dataclasses import dataclass
+from typing import List
+
+MAGIC = 0xB5
+VERSION = 1
+BINARY_FRAMING_OFFER = f"BIN{VERSION}"
+FLAG_NAK = 0x01
+MAX_PAYLOAD_LENGTH = 256
+SEQUENCE_MODULO = 256
+
+_HEADER = struct.Struct("<BBBBH")
+_CRC = struct.Struct("<H")
+
+
+def crc16(data: bytes) -> int:
+    return crc_hqx(data, 0xFFFF)
+
+
+@dataclass
+class Frame:
+    """Binary framing of the SBU protocol.
+
+    The text protocol needs at least three line reads per command (ACK, response, Ready) and handles one command at a
+    time. With binary framing, every request gets exactly one response frame, and several requests can be outstanding:
+    responses are matched to their requests by the sequence number.
+
+    Frame (little endian):
+
+        magic (1 byte, 0xB5) | version (1) | sequence (1) | flags (1) | length (2) | payload (length) | crc (2)
+
+    The payload of a request is the text message without the line end, e.g. b"D1:Hello". The payload of a response is
+    what the SBU would have answered in the text protocol, e.g. b"CC:1234", or nothing for commands without response.
+    A response with FLAG_NAK set means that the SBU has discarded the request, e.g. because its CRC didn't match.
+    The CRC is CRC-16/CCITT-FALSE over everything between magic and crc.
+
+    The framing is negotiated with the text protocol: the BaSe sends "Test:BIN1" and only switches if the answer
+    contains "BIN1". Firmware without binary framing answers "Echo" and the text protocol is kept. The SBU has to accept
+    the text Test message in binary mode as well, so that the negotiation can be repeated whenever the port is reopened.
+    """
+
+    sequence: int
+    payload: bytes = b""
+    flags: int = 0
+
+    @property
+    def nak(self) -> bool:
+        return bool(self.flags & FLAG_NAK)
+
+    def encode(self) -> bytes:
+        if len(self.payload) > MAX_PAYLOAD_LENGTH:
+            raise ValueError(f"payload of {len(self.payload)} bytes exceeds {MAX_PAYLOAD_LENGTH} bytes")
+        content = _HEADER.pack(MAGIC, VERSION, self.sequence % SEQUENCE_MODULO, self.flags, len(self.payload))
+        content += self.payload
+        return content + _CRC.pack(crc16(content[1:]))
+
+
+class FrameDecoder:
+    """Extracts frames from the bytes received so far. Bytes before a magic byte, e.g. a "\\0" of the text protocol,
+    and frames with a wrong version or CRC are skipped."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Frame]:
+        self._buffer += data
+        frames: List[Frame] = []
+        while True:
+            start = self._buffer.find(MAGIC)
+            if start < 0:
+                self._buffer.clear()
+                return frames
+            del self._buffer[:start]
+            if len(self._buffer) < _HEADER.size:
+                return frames
+            _, version, sequence, flags, length = _HEADER.unpack_from(self._buffer)
+            if version != VERSION or length > MAX_PAYLOAD_LENGTH:
+                del self._buffer[0]
+                continue
+            end = _HEADER.size + length + _CRC.size
+            if len(self._buffer) < end:
+                return frames
+            (crc,) = _CRC.unpack_from(self._buffer, end - _CRC.size)
+            if crc != crc16(bytes(self._buffer[1 : end - _CRC.size])):
+                del self._buffer[0]
+                continue
+            frames.append(
+                Frame(sequence=sequence, payload=bytes(self._buffer[_HEADER.size : end - _CRC.size]), flags=flags)
+            )
+            del self._buffer[:end]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from base.hardware.sbu.commands import SbuCommand, SbuCommands
+from base.hardware.sbu.commands import SbuCommand, SbuCommands, SbuPriority
 
 
 class SbuMessage:
@@ -8,6 +8,7 @@ class SbuMessage:
         self._code: str = command.message_code
         self._payload: str = payload
         self._response_keyword = command.response_keyword
+        self._priority: SbuPriority = command.priority
         self._retries: int = 3  # TODO: Use retries
 
     @property
@@ -18,9 +19,17 @@ class SbuMessage:
     def response_keyword(self) -> str:
         return self._response_keyword
 
+    @property
+    def priority(self) -> SbuPriority:
+        return self._priority
+
+    @property
+    def text(self) -> str:
+        return f"{self.code}:{self._payload}"
+
     @property
     def binary(self) -> bytes:
-        return f"{self.code}:{self._payload}\n".encode()
+        return f"{self.text}\n".encode()
 
 
 class PredefinedSbuMessages:
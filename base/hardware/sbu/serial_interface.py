@@ -12,6 +12,8 @@ from base.common.constants import BAUD_RATE
 from base.common.exceptions import SbuCommunicationTimeout, SbuNoResponseError, SerialInterfaceError
 from base.common.logger import LoggerFactory
 from base.hardware.pin_interface import PinInterface
+from base.hardware.sbu.commands import SbuCommands
+from base.hardware.sbu.framing import BINARY_FRAMING_OFFER, Frame
 from base.hardware.sbu.message import SbuMessage
 
 LOG = LoggerFactory.get_logger(__name__)
@@ -31,19 +33,35 @@ class SerialInterface:
         self._pin_interface: PinInterface = PinInterface.global_instance()
 
     def __enter__(self) -> SerialInterface:
-        assert isinstance(self._config, Config)
-        self._wait_for_channel_free()
-        SerialInterface._channel_busy = True
-        self._connect_serial_communication_path()
-        self._establish_serial_connection_or_raise()
-        # self._serial_connection.open() is called implicitly!
-        self.flush_sbu_channel()
+        self.open()
         return self
 
     def __exit__(
         self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException], exc_tb: Optional[TracebackType]
     ) -> None:
-        self.flush_sbu_channel()
+        self.close()
+
+    def open(self) -> None:
+        """occupies the channel until close() is called, the SbuSession keeps it open between commands"""
+        assert isinstance(self._config, Config)
+        self._wait_for_channel_free()
+        SerialInterface._channel_busy = True
+        try:
+            self._connect_serial_communication_path()
+            self._establish_serial_connection_or_raise()
+            # self._serial_connection.open() is called implicitly!
+            self.flush_sbu_channel()
+        except Exception:
+            self._release_channel()
+            raise
+
+    def close(self) -> None:
+        try:
+            self.flush_sbu_channel()
+        finally:
+            self._release_channel()
+
+    def _release_channel(self) -> None:
         self._close_connection()
         self._pin_interface.disable_receiving_messages_from_sbu()
         SerialInterface._channel_busy = False
@@ -97,6 +115,47 @@ class SerialInterface:
         self._wait_for_sbu_ready()
         return response
 
+    @property
+    def baud_rate(self) -> int:
+        return self._baud_rate
+
+    def change_baud_rate(self, baud_rate: int) -> None:
+        """switches the open connection to another rate, bytes received at the previous rate are discarded"""
+        self._baud_rate = baud_rate
+        if self._serial_connection is not None:
+            self._serial_connection.baudrate = baud_rate
+            self._serial_connection.reset_input_buffer()
+
+    def propose_baud_rate(self, baud_rate: int) -> bool:
+        """:return: whether the SBU switches to the rate after this message, see negotiate_baud_rate"""
+        response = self.query_from_sbu(message=SbuMessage(SbuCommands.set_baud_rate, payload=str(baud_rate)))
+        return response.rsplit(":", 1)[-1].strip() == str(baud_rate)
+
+    def echo(self) -> bool:
+        """:return: whether the SBU answers the Test message at the current rate"""
+        try:
+            return self.query_from_sbu(message=SbuMessage(SbuCommands.test)).endswith("Echo")
+        except SbuCommunicationTimeout as e:
+            LOG.debug(f"no echo at {self._baud_rate} baud: {e}")
+            return False
+
+    def negotiate_binary_framing(self) -> bool:
+        """offers the binary framing with the Test message of the text protocol
+
+        :return: whether the SBU has accepted it, older firmware just answers "Echo"
+        """
+        response = self.query_from_sbu(message=SbuMessage(SbuCommands.test, payload=BINARY_FRAMING_OFFER))
+        return BINARY_FRAMING_OFFER in response
+
+    def send_frame(self, frame: Frame) -> None:
+        self._send_message(frame.encode())
+
+    def receive(self) -> bytes:
+        """what has arrived so far, waits up to serial_connection_timeout for the first byte"""
+        if self._serial_connection is None:
+            raise RuntimeError(f"Use {self.__class__.__name__} as context manager only")
+        return bytes(self._serial_connection.read(max(1, self._serial_connection.in_waiting)))
+
     def _send_message(self, message: bytes) -> None:
         if self._serial_connection is None:
             raise RuntimeError(f"Use {self.__class__.__name__} as context manager only")
@@ -117,7 +176,7 @@ class SerialInterface:
         time_start = time()
         duration: float = 0.0
         while duration < self._config.sbu_response_timeout:
-            response: str = self._serial_connection.read_until().decode()
+            response: str = self._serial_connection.read_until().decode(errors="replace")
             if response_keyword in response:
                 return duration, response.strip("\x00").strip()
             duration = time() - time_start
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from itertools import count
+from pathlib import Path
+from queue import Empty, PriorityQueue
+from threading import Thread
+from time import monotonic
+from typing import Dict, Iterator, List, Optional
+
+import serial
+
+from base.common.config import Config, get_config
+from base.common.constants import BAUD_RATE
+from base.common.exceptions import (
+    SbuCommunicationTimeout,
+    SbuNoResponseError,
+    SbuNotAvailableError,
+    SerialInterfaceError,
+)
+from base.common.logger import LoggerFactory
+from base.hardware.sbu.baud_rate import load_baud_rate, negotiate_baud_rate, save_baud_rate
+from base.hardware.sbu.framing import SEQUENCE_MODULO, Frame, FrameDecoder
+from base.hardware.sbu.message import SbuMessage
+from base.hardware.sbu.serial_interface import SerialInterface
+
+LOG = LoggerFactory.get_logger(__name__)
+
+# after all pending requests, so that e.g. the shutdown request is still sent
+CLOSE_PRIORITY = 99
+# a request without valid response frame is sent once more before it fails
+FRAME_ATTEMPTS = 2
+
+
+@dataclass(order=True)
+class SbuRequest:
+    priority: int
+    sequence: int  # keeps the order of requests with the same priority
+    message: Optional[SbuMessage] = field(compare=False)  # None closes the session
+    query: bool = field(compare=False, default=False)
+    future: Future = field(compare=False, default_factory=Future)
+
+
+class SbuSession(Thread):
+    """Owns the serial connection to the SBU, so that callers from the main loop, the webapp and the backup threads
+    don't wait for each other to open and close the port.
+
+    Requests are queued by priority and handled one after another by this thread. Each caller gets a future of its
+    response. The port stays open between requests and is closed after session_idle_timeout seconds without requests
+    (0 keeps it open) or after an error, it's reopened with the next request.
+    If binary_framing is on and the SBU accepts it when the port is opened, up to binary_framing_window requests are
+    sent at once and their responses are matched by sequence number (see Frame). Otherwise the text protocol is used.
+    If baud_rate_negotiation is on, the port is opened at the rate of the last negotiation, which is kept in
+    baud_rate_file because the SBU stays at it while the BaSe is shut down. If the SBU doesn't answer there, the port
+    falls back to BAUD_RATE. The rate is negotiated once per session (see negotiate_baud_rate) and after each fallback.
+    """
+
+    def __init__(self, port: Path) -> None:
+        super().__init__(name="SbuSession", daemon=True)
+        self._config: Config = get_config("sbu.json")
+        self._port = port
+        self._baud_rate: int = load_baud_rate(self._config.baud_rate_file) if self._negotiating else BAUD_RATE
+        self._baud_rate_negotiated = False
+        self._queue: PriorityQueue[SbuRequest] = PriorityQueue()
+        self._sequence: Iterator[int] = count()
+        self._interface: Optional[SerialInterface] = None
+        self._binary_framing = False
+        self._frame_sequence: Iterator[int] = count()
+        self._decoder = FrameDecoder()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def binary_framing(self) -> bool:
+        """whether the SBU has accepted the binary framing for the current connection"""
+        return self._binary_framing
+
+    @property
+    def baud_rate(self) -> int:
+        return self._baud_rate
+
+    @property
+    def _negotiating(self) -> bool:
+        return bool(self._config.baud_rate_negotiation and self._config.baud_rate_file)
+
+    @property
+    def request_timeout(self) -> float:
+        """how long a caller waits for its response: the time the channel may be busy with other requests, plus
+        opening the port and waiting for the acknowledge, the response and Ready"""
+        return float(
+            self._config.wait_for_channel_free_timeout
+            + self._config.serial_connection_timeout
+            + 3 * self._config.sbu_response_timeout
+        )
+
+    def submit(self, message: SbuMessage, query: bool = False) -> Future:
+        """:raises SbuNotAvailableError: if the session has been closed"""
+        if self._closed:
+            raise SbuNotAvailableError("SBU session is closed")
+        request = SbuRequest(priority=message.priority, sequence=next(self._sequence), message=message, query=query)
+        self._queue.put(request)
+        return request.future
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """handles the pending requests, closes the port and stops the thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(SbuRequest(priority=CLOSE_PRIORITY, sequence=next(self._sequence), message=None))
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self) -> None:
+        idle_timeout = self._config.session_idle_timeout or None
+        while True:
+            try:
+                request = self._queue.get(timeout=idle_timeout)
+            except Empty:
+                self._disconnect()
+                continue
+            if request.message is None:
+                break
+            self._handle(self._with_pending(request))
+        self._disconnect()
+
+    def _with_pending(self, request: SbuRequest) -> List[SbuRequest]:
+        batch = [request]
+        while self._binary_framing and len(batch) < self._config.binary_framing_window:
+            try:
+                pending = self._queue.get_nowait()
+            except Empty:
+                break
+            if pending.message is None:
+                self._queue.put(pending)  # closes the session after this batch
+                break
+            batch.append(pending)
+        return batch
+
+    def _handle(self, batch: List[SbuRequest]) -> None:
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]  # or given up
+        try:
+            interface = self._connect()
+            if self._binary_framing:
+                self._exchange_frames(interface, batch)
+            else:
+                for request in batch:
+                    request.future.set_result(self._exchange_text(interface, request))
+        except Exception as e:  # every error belongs to the callers, the session goes on with a fresh connection
+            self._disconnect()
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+    @staticmethod
+    def _exchange_text(interface: SerialInterface, request: SbuRequest) -> str:
+        assert request.message is not None
+        if request.query:
+            return interface.query_from_sbu(message=request.message)
+        interface.write_to_sbu(message=request.message)
+        return ""
+
+    def _exchange_frames(self, interface: SerialInterface, batch: List[SbuRequest]) -> None:
+        unanswered = batch
+        for _ in range(FRAME_ATTEMPTS):
+            unanswered = self._send_and_match(interface, unanswered)
+            if not unanswered:
+                return
+        codes = ", ".join(request.message.code for request in unanswered if request.message is not None)
+        raise SbuNoResponseError(f"no valid response frame to {codes}")
+
+    def _send_and_match(self, interface: SerialInterface, requests: List[SbuRequest]) -> List[SbuRequest]:
+        """:return: the requests that haven't been answered or have been rejected by the SBU"""
+        outstanding: Dict[int, SbuRequest] = {}
+        for request in requests:
+            assert request.message is not None
+            sequence = next(self._frame_sequence) % SEQUENCE_MODULO
+            outstanding[sequence] = request
+            interface.send_frame(Frame(sequence=sequence, payload=request.message.text.encode()))
+        rejected: List[SbuRequest] = []
+        deadline = monotonic() + self._config.sbu_response_timeout
+        while outstanding and monotonic() < deadline:
+            for frame in self._decoder.feed(interface.receive()):
+                if frame.sequence not in outstanding:
+                    continue  # late response to an earlier attempt
+                request = outstanding.pop(frame.sequence)
+                if frame.nak:
+                    rejected.append(request)
+                else:
+                    request.future.set_result(frame.payload.decode() if request.query else "")
+        return rejected + list(outstanding.values())
+
+    def _connect(self) -> SerialInterface:
+        if self._interface is None:
+            interface = SerialInterface(port=self._port, baud_rate=self._baud_rate)
+            interface.open()
+            self._interface = interface
+            if self._negotiating:
+                self._adjust_baud_rate(interface)
+            self._decoder = FrameDecoder()
+            self._binary_framing = bool(self._config.binary_framing) and self._negotiate_binary_framing(interface)
+        return self._interface
+
+    def _adjust_baud_rate(self, interface: SerialInterface) -> None:
+        if interface.baud_rate != BAUD_RATE and not interface.echo():
+            LOG.warning(f"SBU doesn't answer at {interface.baud_rate} baud, falling back to {BAUD_RATE} baud")
+            interface.change_baud_rate(BAUD_RATE)
+            self._baud_rate_negotiated = False
+        if not self._baud_rate_negotiated:
+            negotiate_baud_rate(interface, self._config.baud_rates)
+            self._baud_rate_negotiated = True
+        if interface.baud_rate != self._baud_rate:
+            self._baud_rate = interface.baud_rate
+            save_baud_rate(self._config.baud_rate_file, self._baud_rate)
+
+    @staticmethod
+    def _negotiate_binary_framing(interface: SerialInterface) -> bool:
+        try:
+            accepted = interface.negotiate_binary_framing()
+        except SbuCommunicationTimeout as e:
+            LOG.debug(f"negotiation of the binary framing failed: {e}")
+            return False
+        LOG.info(f"SBU communicates with {'binary frames' if accepted else 'text messages'}")
+        return accepted
+
+    def _disconnect(self) -> None:
+        if self._interface is None:
+            return
+        try:
+            self._interface.close()
+        except (SerialInterfaceError, serial.SerialException, RuntimeError) as e:
+            LOG.warning(f"closing the serial connection to the SBU failed: {e}")
+        finally:
+            self._interface = None
+            self._binary_framing = False
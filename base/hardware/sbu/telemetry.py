@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+from base.common.config import Config, get_config
+from base.common.exceptions import SbuCommunicationTimeout, SerialInterfaceError
+from base.common.logger import LoggerFactory
+from base.hardware.sbu.sbu import SBU
+
+LOG = LoggerFactory.get_logger(__name__)
+
+INPUT_CURRENT = "input_current"
+VCC3V = "vcc3v"
+SBU_TEMPERATURE = "sbu_temperature"
+
+
+@dataclass
+class Sample:
+    value: Optional[float]
+    timestamp: float  # monotonic
+
+
+class SbuTelemetry(Thread):
+    """Measures the input current, VCC3V and the temperature of the SBU every telemetry_interval seconds in the
+    background, so that the status of the main loop is collected without any serial communication.
+
+    A value that is older than telemetry_max_age seconds, e.g. because the sampling hasn't been started or the SBU
+    didn't answer, is measured again on request.
+    """
+
+    def __init__(self, sbu: SBU) -> None:
+        super().__init__(name="SbuTelemetry", daemon=True)
+        self._config: Config = get_config("hardware.json")
+        self._measurements: Dict[str, Callable[[], Optional[float]]] = {
+            INPUT_CURRENT: sbu.measure_base_input_current,
+            VCC3V: sbu.measure_vcc3v_voltage,
+            SBU_TEMPERATURE: sbu.measure_sbu_temperature,
+        }
+        self._samples: Dict[str, Sample] = {}
+        self._lock = Lock()
+        self._terminated = Event()
+
+    def terminate(self) -> None:
+        self._terminated.set()
+
+    def run(self) -> None:
+        if self._config.telemetry_interval <= 0:
+            return
+        while not self._terminated.is_set():
+            self.sample()
+            self._terminated.wait(self._config.telemetry_interval)
+
+    def sample(self) -> None:
+        for quantity in self._measurements:
+            try:
+                self._measure(quantity)
+            except (SbuCommunicationTimeout, SerialInterfaceError) as e:
+                LOG.debug(f"cannot measure {quantity}: {e}")
+
+    def get(self, quantity: str) -> Optional[float]:
+        """:raises: the errors of the SbuCommunicator if the value is outdated and cannot be measured"""
+        with self._lock:
+            sample = self._samples.get(quantity)
+        if sample is not None and monotonic() - sample.timestamp <= self._config.telemetry_max_age:
+            return sample.value
+        return self._measure(quantity)
+
+    def _measure(self, quantity: str) -> Optional[float]:
+        value = self._measurements[quantity]()
+        with self._lock:
+            self._samples[quantity] = Sample(value=value, timestamp=monotonic())
+        return value
@@ -1,6 +1,7 @@
 from pathlib import Path
-from typing import Generator
+from typing import Generator, List
 
+from base.common.config import get_config
 from base.common.constants import BAUD_RATE
 from base.common.exceptions import (
     SbuCommunicationTimeout,
@@ -9,6 +10,7 @@ from base.common.exceptions import (
     SerialInterfaceError,
 )
 from base.common.logger import LoggerFactory
+from base.hardware.sbu.baud_rate import load_baud_rate
 from base.hardware.sbu.message import PredefinedSbuMessages
 from base.hardware.sbu.serial_interface import SerialInterface
 
@@ -23,15 +25,25 @@ def get_sbu_uart_interface() -> Path:
 
 
 def _test_uart_interfaces_for_echo(uart_interfaces: Generator[Path, None, None]) -> Path:
+    baud_rates = _baud_rates()
     for uart_interface in uart_interfaces:
-        if _test_uart_interface_for_echo(uart_interface):
+        if any(_test_uart_interface_for_echo(uart_interface, baud_rate) for baud_rate in baud_rates):
             return uart_interface
     raise SbuNotAvailableError("UART interface not found!")
 
 
-def _test_uart_interface_for_echo(uart_interface: Path) -> bool:
+def _baud_rates() -> List[int]:
+    """the rate of the last negotiation first, the SBU stays at it while the BaSe is shut down"""
+    config = get_config("sbu.json")
+    if not config.baud_rate_negotiation or not config.baud_rate_file:
+        return [BAUD_RATE]
+    baud_rate = load_baud_rate(config.baud_rate_file)
+    return [baud_rate] if baud_rate == BAUD_RATE else [baud_rate, BAUD_RATE]
+
+
+def _test_uart_interface_for_echo(uart_interface: Path, baud_rate: int = BAUD_RATE) -> bool:
     try:
-        response = _challenge_interface(uart_interface)
+        response = _challenge_interface(uart_interface, baud_rate)
     except SerialInterfaceError:
         return False
     except SbuNoResponseError:
@@ -42,8 +54,8 @@ def _test_uart_interface_for_echo(uart_interface: Path) -> bool:
         return response.endswith("Echo")
 
 
-def _challenge_interface(uart_interface: Path) -> str:
-    with SerialInterface(port=uart_interface, baud_rate=BAUD_RATE) as ser:
+def _challenge_interface(uart_interface: Path, baud_rate: int = BAUD_RATE) -> str:
+    with SerialInterface(port=uart_interface, baud_rate=baud_rate) as ser:
         ser.reset_buffers()
         ser.flush_sbu_channel()
         response = ser.query_from_sbu(message=PredefinedSbuMessages.test_for_echo)
@@ -5,6 +5,7 @@ from typing import Optional
 
 from base.common.logger import LoggerFactory
 from base.hardware.pin_interface import PinInterface
+from base.hardware.sbu.communicator import SbuCommunicator
 from base.hardware.sbu.uart_finder import get_sbu_uart_interface
 
 LOG = LoggerFactory.get_logger(__name__)
@@ -20,6 +21,7 @@ class SbuUpdater:
         self._pin_interface.enable_receiving_messages_from_sbu()
 
     def update(self, sbu_fw_filename: Optional[Path] = None) -> None:
+        SbuCommunicator.close_session()  # pyupdi needs the serial port for itself
         self.prepare_update()
         sbu_uart_channel = self._get_sbu_uart_channel()
         if sbu_uart_channel is None:
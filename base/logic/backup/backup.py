@@ -5,11 +5,21 @@ from typing import Callable, Optional
 
 from signalslot import Signal
 
+from base.common.config import get_config
 from base.common.constants import BackupDirectorySuffix, BackupProcessStep
+from base.common.disk_space import DiskSpace
 from base.common.logger import LoggerFactory
+from base.logic.backup.checksum_manifest import ChecksumManifest
+from base.logic.backup.dedup_pool import DedupPool
 from base.logic.backup.source import BackupSource
+from base.logic.backup.synchronisation.bandwidth_controller import HardwareReadings
+from base.logic.backup.synchronisation.change_list import ChangeList
+from base.logic.backup.synchronisation.sharded_sync import ShardedSync
 from base.logic.backup.synchronisation.sync import Sync
+from base.logic.backup.synchronisation.sync_status import SyncStatus
+from base.logic.backup.synchronisation.transport_tuner import TransportTuner
 from base.logic.backup.target import BackupTarget
+from base.logic.backup.verification import Verification, VerificationMode, VerificationResult
 
 LOG = LoggerFactory.get_logger(__name__)
 
@@ -17,16 +27,35 @@ LOG = LoggerFactory.get_logger(__name__)
 class Backup(Thread):
     terminated = Signal()
 
-    def __init__(self, on_backup_finished: Callable) -> None:
+    def __init__(
+        self, on_backup_finished: Callable, hardware_readings: Optional[Callable[[], HardwareReadings]] = None
+    ) -> None:
+        """
+        :param hardware_readings:   current measurements of the SBU, the bandwidth is reduced if they are too high
+        """
         super().__init__()
         self._source = BackupSource().path
         self._target = BackupTarget().path
         self._estimated_backup_size: Optional[int] = None
         self._actual_backup_size: Optional[int] = None
-        self._sync = Sync(self._target, self._source)
+        self._link_dest: Optional[Path] = None
+        self._change_list: Optional[ChangeList] = None
+        self._sync_status = SyncStatus()
+        self._dedup_pool: Optional[DedupPool] = None
+        self._checksum_manifest: Optional[ChecksumManifest] = None
+        self._verification: Optional[Verification] = None
+        self._verification_result: Optional[VerificationResult] = None
+        self._transport_tuner: Optional[TransportTuner] = None
+        self._sync = self._create_sync()
+        self._hardware_readings = hardware_readings
         self._on_backup_finished = on_backup_finished
         self.terminated.connect(self._on_backup_finished)
 
+    def _create_sync(self) -> Sync:
+        if get_config("sync.json").sync_workers > 1:
+            return ShardedSync(self._target, self._source)
+        return Sync(self._target, self._source)
+
     @property
     def estimated_backup_size(self) -> Optional[int]:
         return self._estimated_backup_size
@@ -35,6 +64,39 @@ class Backup(Thread):
     def estimated_backup_size(self, size_bytes: int) -> None:
         self._estimated_backup_size = size_bytes
 
+    @property
+    def link_dest(self) -> Optional[Path]:
+        """backup to hardlink unchanged files from during synchronisation (rsync's --link-dest)"""
+        return self._link_dest
+
+    @link_dest.setter
+    def link_dest(self, backup: Optional[Path]) -> None:
+        self._link_dest = backup
+
+    @property
+    def change_list(self) -> Optional[ChangeList]:
+        """paths found by the dry run, so that the synchronisation doesn't have to scan the source again"""
+        return self._change_list
+
+    @change_list.setter
+    def change_list(self, change_list: Optional[ChangeList]) -> None:
+        self._change_list = change_list
+
+    @property
+    def sync_status(self) -> SyncStatus:
+        """the most recent status of the synchronisation"""
+        return self._sync_status
+
+    @property
+    def verification_result(self) -> Optional[VerificationResult]:
+        """None if the backup hasn't been verified"""
+        return self._verification_result
+
+    @property
+    def completed(self) -> bool:
+        """whether the synchronisation ran to its end, as opposed to being terminated or failing"""
+        return self._sync_status.finished and not self._sync_status.error and not self._sync.terminated
+
     @property
     def source(self) -> Path:
         return self._source
@@ -58,14 +120,69 @@ class Backup(Thread):
         return self._sync.pid
 
     def run(self) -> None:
+        self._tune_transport()
         self._sync.update_target(self._target)
+        self._sync.update_link_dest(self._link_dest)
+        self._sync.update_change_list(self._change_list)
+        self._sync.update_hardware_readings(self._hardware_readings)
+        status = SyncStatus()
         with self._sync as output_generator:
             for status in output_generator:
                 LOG.debug(str(status))
             LOG.info("Backup finished!")
+        self._sync_status = status
+        DiskSpace.invalidate()
+        if status.summary is not None:
+            LOG.info(
+                f"transferred {status.summary.total_transferred_file_size} of {status.summary.total_file_size} bytes "
+                f"({status.summary.number_of_regular_files_transferred} files) "
+                f"at {status.summary.bytes_per_second:.0f} bytes/s, speedup is {status.summary.speedup:.2f}"
+            )
+        if self.completed:
+            self._post_process()
         self.terminated.emit()
         self.terminated.disconnect(self._on_backup_finished)
 
+    def _tune_transport(self) -> None:
+        """before the synchronisation, so that it already uses the new profile"""
+        if get_config("sync.json").protocol != "ssh":
+            return
+        self._transport_tuner = TransportTuner(self._target.parent, self._source)
+        try:
+            self._transport_tuner.tune_if_due()
+        finally:
+            self._transport_tuner = None
+
+    def _post_process(self) -> None:
+        """Deduplication comes first, so that the manifest records the final inodes. The verification reads the
+        manifest, so it comes last."""
+        config = get_config("backup.json")
+        try:
+            if config.dedup_pool:
+                self._dedup_pool = DedupPool(self._target.parent)
+                self._dedup_pool.deduplicate(self._target)
+            if config.checksum_manifest:
+                self._checksum_manifest = ChecksumManifest(self._target.parent)
+                self._checksum_manifest.create(self._target)
+            if VerificationMode(config.verification) != VerificationMode.OFF:
+                self._verify()
+        except OSError as e:
+            LOG.error(f"post-processing of {self._target} failed: {e}")
+
+    def _verify(self) -> None:
+        local_source = self._source if get_config("sync.json").protocol == "smb" else None
+        self._verification = Verification(self._target, local_source)
+        self._verification_result = self._verification.run()
+
     def terminate(self) -> None:
+        transport_tuner = self._transport_tuner  # is released by run() once the tuning is over
+        if transport_tuner is not None:
+            transport_tuner.terminate()
         if self._sync is not None:
             self._sync.terminate()
+        if self._dedup_pool is not None:
+            self._dedup_pool.terminate()
+        if self._checksum_manifest is not None:
+            self._checksum_manifest.terminate()
+        if self._verification is not None:
+            self._verification.terminate()
@@ -2,45 +2,94 @@ from __future__ import annotations
 
 import shutil
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from base.common.config import Config, get_config
 from base.common.constants import BackupDirectorySuffix
+from base.common.disk_space import DiskSpace
 from base.common.exceptions import BackupDeletionError, BackupHddAccessError
 from base.common.logger import LoggerFactory
+from base.logic.backup.backup_catalog import BackupCatalog, CatalogEntry
+from base.logic.backup.checksum_manifest import ChecksumManifest
+from base.logic.backup.dedup_pool import DedupPool
+from base.logic.backup.snapshot_size_index import SnapshotSizeIndex
 
 LOG = LoggerFactory.get_logger(__name__)
 
 
 class BackupBrowser:
-    def __init__(self) -> None:
+    def __init__(self, from_sd_copy: bool = False) -> None:
+        """
+        :param from_sd_copy:    read the sd card copy of the backup catalog, so the backup hdd isn't accessed at all
+        """
         self._config: Config = get_config("sync.json")
+        self._from_sd_copy = from_sd_copy
+        self._catalog: Optional[BackupCatalog] = None
+        self._size_index: Optional[SnapshotSizeIndex] = None
+        self._entries: Dict[str, CatalogEntry] = {}
         self._backup_index: List[Path] = self._read_backups()
 
+    @property
+    def catalog(self) -> BackupCatalog:
+        if self._catalog is None:
+            self._catalog = BackupCatalog(
+                self._config.local_backup_target_location, self._config.backup_catalog_sd_copy
+            )
+        return self._catalog
+
     def _read_backups(self) -> List[Path]:
         """
         :return:    present backups. Lowest index is the oldest.
         """
-        try:
-            return sorted(
-                [
-                    path
-                    for path in Path(self._config.local_backup_target_location).iterdir()
-                    if path.stem.startswith("backup")
-                ],
-                reverse=True,
-            )
-        except OSError as e:
-            LOG.error(f"BackupHDD cannot be accessed! {e}")
-            raise BackupHddAccessError
+        if self._from_sd_copy:
+            entries = self.catalog.sd_copy_entries()
+        else:
+            try:
+                entries = self.catalog.entries()
+            except OSError as e:
+                LOG.error(f"BackupHDD cannot be accessed! {e}")
+                raise BackupHddAccessError
+        self._entries = {entry.name: entry for entry in entries}
+        location = Path(self._config.local_backup_target_location)
+        return sorted([location / entry.directory_name for entry in entries], reverse=True)
 
     @property
     def index(self) -> List[str]:
         return [str(bu) for bu in self._backup_index]
 
+    @property
+    def index_with_sizes(self) -> List[Dict[str, Any]]:
+        """like index, with the unique and shared bytes of every backup (None if not measured yet)"""
+        index = []
+        for backup in self._backup_index:
+            entry = self._entries.get(backup.stem, CatalogEntry(name=backup.stem))
+            index.append({"path": str(backup), "unique_bytes": entry.unique_bytes, "shared_bytes": entry.shared_bytes})
+        return index
+
+    @property
+    def size_index(self) -> SnapshotSizeIndex:
+        """the pooled inodes are read once, so that deleting several backups doesn't read the DedupPool for each"""
+        if self._size_index is None:
+            pooled_inodes = DedupPool(self._config.local_backup_target_location).pooled_inodes()
+            self._size_index = SnapshotSizeIndex(self.catalog, pooled_inodes)
+        return self._size_index
+
+    def previous_backup(self, backup: Path) -> Optional[Path]:
+        """the next older backup"""
+        position = self._backup_index.index(backup)
+        return self._backup_index[position + 1] if position + 1 < len(self._backup_index) else None
+
+    def neighbours(self, backup: Path) -> List[Path]:
+        position = self._backup_index.index(backup)
+        return self._backup_index[max(position - 1, 0) : position] + self._backup_index[position + 1 : position + 2]
+
+    @property
+    def oldest_first(self) -> List[Path]:
+        return list(reversed(self._backup_index))
+
     @property
     def oldest_backup(self) -> Optional[Path]:
-        return self._backup_index[0] if self._backup_index else None
+        return self._backup_index[-1] if self._backup_index else None
 
     @property
     def newest_valid_backup(self) -> Optional[Path]:
@@ -50,9 +99,26 @@ class BackupBrowser:
                 latest_valid_backup = backup
         return latest_valid_backup
 
+    @property
+    def newest_interrupted_backup(self) -> Optional[Path]:
+        """the newest backup whose preparation or synchronisation has been interrupted"""
+        interrupted = [BackupDirectorySuffix.while_copying.suffix, BackupDirectorySuffix.while_backing_up.suffix]
+        for backup in self._backup_index:
+            if backup.suffix in interrupted:
+                return backup
+        return None
+
     def delete_oldest_backup(self) -> None:
         if self.oldest_backup is not None:
-            shutil.rmtree(self.oldest_backup.absolute())
-            LOG.info(f"deleting {self.oldest_backup} to free space for new backup")
+            self.delete_backup(self.oldest_backup)
         else:
             raise BackupDeletionError(f"no backup found to delete. Available backups: {self.index}")
+
+    def delete_backup(self, backup: Path) -> None:
+        LOG.info(f"deleting {backup} to free space for new backup")
+        self.size_index.on_backup_deleted(backup, self.neighbours(backup))
+        shutil.rmtree(backup.absolute())
+        ChecksumManifest(backup.parent).remove(backup)
+        DiskSpace.invalidate()
+        self.catalog.remove(backup.stem)
+        self._backup_index.remove(backup)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from threading import RLock
+from typing import Any, Dict, List, Optional, Tuple
+
+from base.common.logger import LoggerFactory
+from base.logic.backup.scrubber import ScrubResult
+from base.logic.backup.synchronisation.sync_status import SyncSummary
+from base.logic.backup.verification import VerificationResult
+
+LOG = LoggerFactory.get_logger(__name__)
+
+CATALOG_FILE_NAME = ".backup_catalog.jsonl"
+
+
+@dataclass
+class CatalogEntry:
+    name: str  # e.g. backup_2022_01_16-12_00_00
+    suffix: str = ""  # see BackupDirectorySuffix
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    bytes_transferred: int = 0
+    files_transferred: int = 0
+    stats: Optional[SyncSummary] = None
+    unique_bytes: Optional[int] = None  # see SnapshotSizeIndex
+    shared_bytes: Optional[int] = None
+    verification: Optional[VerificationResult] = None
+    scrub: Optional[ScrubResult] = None  # findings of the Scrubber
+
+    @property
+    def directory_name(self) -> str:
+        return self.name + self.suffix
+
+    @classmethod
+    def from_directory(cls, directory: Path) -> CatalogEntry:
+        return cls(name=directory.stem, suffix=directory.suffix)
+
+    def to_json(self) -> str:
+        entry: Dict[str, Any] = asdict(self)
+        for key in ["start_time", "end_time"]:
+            entry[key] = entry[key].isoformat() if entry[key] is not None else None
+        return json.dumps(entry)
+
+    @classmethod
+    def from_json(cls, line: str) -> CatalogEntry:
+        entry = json.loads(line)
+        for key in ["start_time", "end_time"]:
+            entry[key] = datetime.fromisoformat(entry[key]) if entry[key] is not None else None
+        entry["stats"] = SyncSummary(**entry["stats"]) if entry["stats"] is not None else None
+        verification = entry.get("verification")
+        entry["verification"] = VerificationResult(**verification) if verification is not None else None
+        scrub = entry.get("scrub")
+        entry["scrub"] = ScrubResult(**scrub) if scrub is not None else None
+        return cls(**entry)
+
+
+class BackupCatalog:
+    """Records the backups on the backup hdd, so they don't have to be looked up in the directory tree.
+
+    The catalog is a JSON-lines file in the root of the backup hdd, which is the authoritative copy. A second copy on the
+    sd card serves requests while the backup hdd is not available. Both are rewritten atomically on every update.
+    If the catalog has corrupt lines, it is rebuilt from the lines that can be parsed, the sd card copy and the backup
+    directories. The corrupt catalog is kept as .backup_catalog.jsonl.corrupt.
+    """
+
+    _lock = RLock()
+
+    def __init__(self, backup_hdd_location: Path, sd_copy: Path) -> None:
+        self._backup_hdd_location = Path(backup_hdd_location)
+        self._catalog = self._backup_hdd_location / CATALOG_FILE_NAME
+        self._sd_copy = Path(sd_copy)
+
+    def entries(self) -> List[CatalogEntry]:
+        """:raises OSError: if the backup hdd cannot be accessed"""
+        try:
+            entries, corrupt_lines = self._read(self._catalog)
+        except FileNotFoundError:
+            LOG.info(f"no backup catalog found at {self._catalog}")
+            return self.reconcile()
+        if corrupt_lines:
+            LOG.warning(f"backup catalog {self._catalog} has {corrupt_lines} corrupt lines, rebuilding it")
+            return self.reconcile()
+        return entries
+
+    def sd_copy_entries(self) -> List[CatalogEntry]:
+        """the entries as of the last update, without accessing the backup hdd"""
+        try:
+            entries, corrupt_lines = self._read(self._sd_copy)
+        except OSError as e:
+            LOG.debug(f"cannot read the sd card copy of the backup catalog: {e}")
+            return []
+        if corrupt_lines:
+            LOG.warning(f"ignoring {corrupt_lines} corrupt lines of the sd card copy of the backup catalog")
+        return entries
+
+    def update(self, name: str, **changes: Any) -> None:
+        """changes the details of a backup, adds it if it isn't recorded yet"""
+        with self._lock:
+            entries = self.entries()
+            for index, entry in enumerate(entries):
+                if entry.name == name:
+                    entries[index] = replace(entry, **changes)
+                    break
+            else:
+                entries.append(replace(CatalogEntry(name=name), **changes))
+            self._write(entries)
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._write([entry for entry in self.entries() if entry.name != name])
+
+    def reconcile(self) -> List[CatalogEntry]:
+        """Brings the catalog in line with the backup directories that are actually present. Recorded details are kept.
+
+        :raises OSError: if the backup hdd cannot be accessed
+        """
+        with self._lock:
+            recorded = self._recorded_entries()
+            entries = []
+            for directory in self._backup_hdd_location.iterdir():
+                if directory.is_dir() and directory.stem.startswith("backup"):
+                    entry = recorded.get(directory.stem, CatalogEntry.from_directory(directory))
+                    entries.append(replace(entry, suffix=directory.suffix))
+            return self._write(entries)
+
+    def _recorded_entries(self) -> Dict[str, CatalogEntry]:
+        """the entries of the catalog, completed by the ones of the sd card copy
+
+        :raises OSError: if the catalog exists but cannot be read, or a corrupt catalog cannot be kept
+        """
+        recorded = {entry.name: entry for entry in self.sd_copy_entries()}
+        try:
+            entries, corrupt_lines = self._read(self._catalog)
+        except FileNotFoundError:
+            return recorded
+        if corrupt_lines:
+            shutil.copy2(self._catalog, self._catalog.with_name(CATALOG_FILE_NAME + ".corrupt"))
+        recorded.update({entry.name: entry for entry in entries})
+        return recorded
+
+    @staticmethod
+    def _read(catalog: Path) -> Tuple[List[CatalogEntry], int]:
+        """:return: the entries and the number of lines that cannot be parsed"""
+        entries = []
+        corrupt_lines = 0
+        with open(catalog, "r", errors="replace") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(CatalogEntry.from_json(line))
+                except (ValueError, KeyError, TypeError):
+                    corrupt_lines += 1
+        return entries, corrupt_lines
+
+    def _write(self, entries: List[CatalogEntry]) -> List[CatalogEntry]:
+        entries = sorted(entries, key=lambda entry: entry.name)
+        _write_atomically(self._catalog, entries)
+        try:
+            self._sd_copy.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomically(self._sd_copy, entries)
+        except OSError as e:
+            LOG.warning(f"cannot update the sd card copy of the backup catalog: {e}")
+        return entries
+
+
+def _write_atomically(catalog: Path, entries: List[CatalogEntry]) -> None:
+    temporary = catalog.with_name(catalog.name + ".tmp")
+    with open(temporary, "w") as file:
+        file.writelines(entry.to_json() + "\n" for entry in entries)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, catalog)
@@ -1,14 +1,22 @@
 from collections import Callable
-from typing import Optional
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, Optional
 
 from signalslot import Signal
 
 from base.common.config import get_config
 from base.common.constants import BackupDirectorySuffix
-from base.common.exceptions import DockingError, MountError, NetworkError
+from base.common.exceptions import BackupHddAccessError, DockingError, MountError, NetworkError
 from base.common.logger import LoggerFactory
 from base.logic.backup.backup import Backup
+from base.logic.backup.backup_browser import BackupBrowser
+from base.logic.backup.backup_catalog import BackupCatalog
 from base.logic.backup.backup_preparator import BackupPreparator
+from base.logic.backup.checkpoint import BackupCheckpoint, BackupPhase
+from base.logic.backup.scrubber import Scrubber
+from base.logic.backup.synchronisation.bandwidth_controller import HardwareReadings
+from base.logic.backup.verification import VerificationResult
 from base.logic.nas import Nas
 from base.logic.network_share import NetworkShare
 
@@ -32,19 +40,32 @@ class BackupConductor:
     stop_shutdown_timer_request = Signal()
     backup_finished_notification = Signal()
 
-    def __init__(self, is_maintenance_mode_on: Callable) -> None:
+    def __init__(
+        self,
+        is_maintenance_mode_on: Callable,
+        hardware_readings: Optional[Callable[[], HardwareReadings]] = None,
+    ) -> None:
         self._is_maintenance_mode_on = is_maintenance_mode_on
+        self._hardware_readings = hardware_readings
         self._backup: Optional[Backup] = None
         self._config = get_config("backup.json")
         self._postpone_count = 0
         self._nas = Nas()
         self._network_share = NetworkShare()
-        self._backup_preparator = Optional[BackupPreparator]
+        self._backup_preparator: Optional[BackupPreparator] = None
+        self._catalog: Optional[BackupCatalog] = None
+        self._last_verification: Optional[VerificationResult] = None
+        self._scrubber: Optional[Scrubber] = None
 
     @property
     def network_share(self) -> NetworkShare:
         return self._network_share
 
+    @property
+    def last_verification(self) -> Optional[Dict[str, Any]]:
+        """the result of the verification of the most recent backup, None if it hasn't been verified"""
+        return asdict(self._last_verification) if self._last_verification is not None else None
+
     @property
     def conditions_met(self) -> bool:
         return not self._is_maintenance_mode_on() and not self.is_running
@@ -60,11 +81,19 @@ class BackupConductor:
             self.stop_shutdown_timer_request.emit()
             self._attach_backup_datasource()
             self._attach_backup_target()
-            self._backup = Backup(self.on_backup_finished)
+            start_time = datetime.now()
+            self._catalog = BackupBrowser().catalog
+            self._backup = Backup(self.on_backup_finished, self._hardware_readings)
+            self._complete_interrupted_finalisation()
+            self._catalog.reconcile()
             LOG.info(f"Backing up into: {self._backup.target}")
             self._backup_preparator = BackupPreparator(self._backup)
             self._backup_preparator.prepare()
-            self._backup.start()
+            self._record_backup(start_time=start_time)
+            if self._backup_preparator.aborted:
+                self._on_preparation_aborted()
+            else:
+                self._backup.start()
         else:
             LOG.debug("...but backup conditions are not met.")
 
@@ -83,10 +112,25 @@ class BackupConductor:
             self._backup_preparator.terminate()
         if self._backup is not None:
             self._backup.terminate()
+        scrubber = self._scrubber  # is released by _scrub() once the session is over
+        if scrubber is not None:
+            scrubber.terminate()
+
+    def _on_preparation_aborted(self) -> None:
+        LOG.info("Backup aborted during preparation")
+        try:
+            self._return_to_default_state()
+        except DockingError as e:
+            LOG.error(e)
+        except NetworkError as e:
+            LOG.error(e)
+        finally:
+            self.backup_finished_notification.emit()
 
     def on_backup_finished(self, **kwargs):  # type: ignore
         LOG.info("Backup terminated")
         self._mark_backup_target_as_finished()
+        self._scrub()
         try:
             self._return_to_default_state()
         except DockingError as e:
@@ -96,9 +140,79 @@ class BackupConductor:
         finally:
             self.backup_finished_notification.emit()
 
+    def _complete_interrupted_finalisation(self) -> None:
+        """A backup that was interrupted after its synchronisation only needs to be renamed"""
+        assert self._backup is not None
+        checkpoint = BackupCheckpoint(self._backup.target.parent)
+        interrupted = checkpoint.load()
+        if interrupted is None or interrupted.phase != BackupPhase.FINALISATION:
+            return
+        unfinished = (self._backup.target.parent / interrupted.backup).with_suffix(
+            BackupDirectorySuffix.while_backing_up.suffix
+        )
+        if unfinished.exists():
+            LOG.info(f"completing the finalisation of {unfinished}")
+            unfinished.rename(unfinished.with_suffix(BackupDirectorySuffix.finished.suffix))
+        checkpoint.clear()
+
     def _mark_backup_target_as_finished(self) -> None:
+        """The checkpoint of the finalisation makes sure that a crash during the renaming doesn't lead to a full
+        synchronisation on the next run. An incomplete synchronisation keeps its suffix to be resumed."""
         if self._backup is not None:
+            if not self._backup.completed:
+                LOG.warning(f"Synchronisation incomplete. Keeping {self._backup.target} to resume it next time.")
+                return
+            checkpoint = BackupCheckpoint(self._backup.target.parent)
+            checkpoint.save(self._backup.target, BackupPhase.FINALISATION)
             self._backup.set_process_step(BackupDirectorySuffix.finished)
+            checkpoint.clear()
+            status = self._backup.sync_status
+            self._record_backup(
+                end_time=datetime.now(),
+                bytes_transferred=status.bytes_transferred,
+                files_transferred=status.files_transferred,
+                stats=status.summary,
+                verification=self._backup.verification_result,
+            )
+            if self._backup.verification_result is not None:
+                self._last_verification = self._backup.verification_result
+            self._measure_backup_target()
+
+    def _scrub(self) -> None:
+        """Runs a scrub session (bounded by scrub_bytes_per_session) while the backup hdd is still docked, since it is
+        disengaged right afterwards and the BaSe may shut down until the next backup."""
+        if not self._config.scrub_after_backup or self._backup is None or not self._backup.completed:
+            return
+        if self._catalog is None:
+            return
+        self._scrubber = Scrubber(self._backup.target.parent, self._catalog)
+        try:
+            self._scrubber.scrub()
+        except OSError as e:
+            LOG.warning(f"scrub session stopped: {e}")
+        finally:
+            self._scrubber = None
+
+    def _measure_backup_target(self) -> None:
+        if self._backup is None:
+            return
+        try:
+            backup_browser = BackupBrowser()
+            target = self._backup.target
+            backup_browser.size_index.on_backup_added(target, backup_browser.previous_backup(target))
+        except (OSError, ValueError, BackupHddAccessError) as e:
+            LOG.warning(f"cannot update the size index with {self._backup.target}: {e}")
+
+    def _record_backup(self, **details: Any) -> None:
+        """Writes the current name and details of the backup to the catalog. The catalog isn't essential for the backup,
+        so failing to update it is only logged."""
+        if self._backup is None or self._catalog is None:
+            return
+        target = self._backup.target
+        try:
+            self._catalog.update(target.stem, suffix=target.suffix, **details)
+        except OSError as e:
+            LOG.warning(f"cannot record {target} in the backup catalog: {e}")
 
     def _return_to_default_state(self) -> None:
         self.hardware_disengage_request.emit()
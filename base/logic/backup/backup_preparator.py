@@ -1,14 +1,18 @@
-import os
-import signal
-import subprocess
-from typing import Optional
+from pathlib import Path
+from typing import List, Optional
 
+from base.common.config import Config, get_config
 from base.common.constants import BackupDirectorySuffix
-from base.common.exceptions import BackupDeletionError, BackupSizeRetrievalError
+from base.common.exceptions import BackupSizeRetrievalError
 from base.common.logger import LoggerFactory
 from base.common.system import System
 from base.logic.backup.backup import Backup
 from base.logic.backup.backup_browser import BackupBrowser
+from base.logic.backup.checkpoint import BackupCheckpoint, BackupPhase
+from base.logic.backup.dedup_pool import POOL_DIRECTORY_NAME, DedupPool
+from base.logic.backup.hardlink_snapshot import HardlinkSnapshot
+from base.logic.backup.snapshot_strategy import SnapshotStrategy
+from base.logic.backup.space_planner import SpacePlanner
 
 LOG = LoggerFactory.get_logger(__name__)
 
@@ -16,56 +20,129 @@ LOG = LoggerFactory.get_logger(__name__)
 class BackupPreparator:
     def __init__(self, backup: Backup):
         self._backup = backup
-        self._copy_process: Optional[subprocess.Popen] = None
+        self._config: Config = get_config("sync.json")
+        self._snapshot_strategy = SnapshotStrategy(self._config.snapshot_strategy)
+        self._hardlink_snapshot: Optional[HardlinkSnapshot] = None
+        self._snapshot_complete = False
 
     @property
     def running(self) -> bool:
-        if self._copy_process is not None:
-            not_finished = self._copy_process.returncode is None
-        else:
-            not_finished = False
-        return not_finished
+        return self._hardlink_snapshot is not None and self._hardlink_snapshot.running
+
+    @property
+    def aborted(self) -> bool:
+        return self._hardlink_snapshot is not None and self._hardlink_snapshot.aborted
 
     def terminate(self) -> None:
-        if self.running:
-            os.kill(self._copy_process.pid, signal.SIGTERM)  # type: ignore
-            self._copy_process.wait()  # type: ignore
-            self._copy_process.poll()  # type: ignore
+        if self._hardlink_snapshot is not None:
+            self._hardlink_snapshot.terminate()
 
     def prepare(self) -> None:
-        self._backup.target.mkdir(exist_ok=True)
-        self._free_space_if_necessary()
+        """The snapshot is taken before the estimation, so that the dry run sees the same target as the transfer"""
+        self._create_or_resume_target()
         newest_backup = BackupBrowser().newest_valid_backup
         if newest_backup is not None:
-            self._copy_process = System.copy_newest_backup_with_hardlinks(newest_backup, self._backup.target)
-            self._copy_process.wait()
+            self._snapshot(newest_backup)
+        if self.aborted:
+            LOG.warning(f"Preparation aborted. Keeping {self._backup.target} to resume it next time.")
+            return
+        self._free_space_if_necessary()
         self._finish_preparation()
 
+    def _snapshot(self, newest_backup: Path) -> None:
+        if self._snapshot_strategy == SnapshotStrategy.LINK_DEST:
+            LOG.info(f"rsync will hardlink unchanged files from {newest_backup}")
+            self._backup.link_dest = newest_backup
+        elif self._snapshot_complete:
+            LOG.info(f"snapshot of {newest_backup} is already complete")
+        else:
+            self._hardlink_snapshot = HardlinkSnapshot(newest_backup, self._backup.target)
+            self._hardlink_snapshot.run()
+
+    def _create_or_resume_target(self) -> None:
+        """Continues an interrupted backup under the name of the new one. If its snapshot was complete, the
+        synchronisation only transfers what is still missing."""
+        backup_browser = BackupBrowser()
+        interrupted_backup = backup_browser.newest_interrupted_backup
+        if interrupted_backup is not None and interrupted_backup != self._backup.target:
+            LOG.info(f"resuming interrupted backup {interrupted_backup}")
+            self._snapshot_complete = self._checkpoint.phase_of(interrupted_backup) in [
+                BackupPhase.SYNCHRONISATION,
+                BackupPhase.FINALISATION,
+            ]
+            interrupted_backup.rename(self._backup.target)
+            backup_browser.catalog.remove(interrupted_backup.stem)
+        self._backup.target.mkdir(exist_ok=True)
+        self._checkpoint.save(
+            self._backup.target, BackupPhase.SYNCHRONISATION if self._snapshot_complete else BackupPhase.SNAPSHOT
+        )
+
     def _finish_preparation(self) -> None:
         self._backup.set_process_step(BackupDirectorySuffix.while_backing_up)
+        self._checkpoint.save(self._backup.target, BackupPhase.SYNCHRONISATION)
 
     def _free_space_if_necessary(self) -> None:
-        while not self._enough_space_for_next_backup():
+        """Deletes the backups planned by the SpacePlanner at once and estimates a second time afterwards"""
+        missing_space = self._missing_space_for_next_backup()
+        if missing_space == 0:
+            return
+        backup_browser = BackupBrowser()
+        dedup_pool = self._dedup_pool
+        pooled_inodes = dedup_pool.pooled_inodes() if dedup_pool is not None else set()
+        plan = SpacePlanner(self._deletable_backups(backup_browser), pooled_inodes).plan(missing_space)
+        LOG.info(f"deleting {len(plan.backups)} backups to free {plan.bytes_freed} of {missing_space} missing bytes")
+        for backup in plan.backups:
             try:
-                BackupBrowser().delete_oldest_backup()
-            except BackupDeletionError as e:
-                LOG.error(f"{e}. Resuming until space is full.")
+                backup_browser.delete_backup(backup)
+            except OSError as e:
+                LOG.error(f"cannot delete {backup}: {e}")
+        if dedup_pool is not None:
+            dedup_pool.collect_garbage()
+        if not plan.sufficient or self._missing_space_for_next_backup() > 0:
+            LOG.error("Not enough space for next backup even after deleting old backups. Resuming until space is full.")
+
+    def _deletable_backups(self, backup_browser: BackupBrowser) -> List[Path]:
+        """oldest first. The backup in preparation and the one it is based on are kept."""
+        keep = {self._backup.target, backup_browser.newest_valid_backup}
+        return [backup for backup in backup_browser.oldest_first if backup not in keep]
 
     def _enough_space_for_next_backup(self) -> bool:
+        return self._missing_space_for_next_backup() == 0
+
+    def _missing_space_for_next_backup(self) -> int:
+        """estimates the next backup and returns how many bytes are missing on the backup hdd, 0 if it fits"""
         try:
             free_space_on_bu_hdd: int = self._free_space()
-            self._backup.estimated_backup_size = System.size_of_next_backup(self._backup.target, self._backup.source)
-            LOG.info(
-                f"Space free on BU HDD: {free_space_on_bu_hdd}, Space needed: {self._backup.estimated_backup_size}"
+            estimated_backup_size, change_list = System.dry_run_next_backup(
+                self._backup.target, self._backup.source, link_dest=self._backup.link_dest
             )
-            enough = free_space_on_bu_hdd > self._backup.estimated_backup_size
+            self._backup.estimated_backup_size = estimated_backup_size
+            if self._reuse_change_list:
+                self._backup.change_list = change_list
+            LOG.info(f"Space free on BU HDD: {free_space_on_bu_hdd}, Space needed: {estimated_backup_size}")
+            missing_space = max(estimated_backup_size - free_space_on_bu_hdd, 0)
         except BackupSizeRetrievalError as e:
             LOG.error(
                 "Estimation of whether there's sufficient space for next backup failed."
                 f"Assuming it is enough and wait for further errors. Details: {e}"
             )
-            enough = True
-        return enough
+            missing_space = 0
+        return missing_space
+
+    @property
+    def _dedup_pool(self) -> Optional[DedupPool]:
+        """the pool holds a link of the deduplicated files, so they aren't freed by deleting backups alone"""
+        backup_hdd = self._backup.target.parent
+        return DedupPool(backup_hdd) if (backup_hdd / POOL_DIRECTORY_NAME).exists() else None
+
+    @property
+    def _checkpoint(self) -> BackupCheckpoint:
+        return BackupCheckpoint(self._backup.target.parent)
+
+    @property
+    def _reuse_change_list(self) -> bool:
+        """With --link-dest the change list lacks the unchanged files, which have to be linked into the target as well"""
+        return self._config.reuse_change_list and self._snapshot_strategy == SnapshotStrategy.HARDLINK_COPY
 
     def _free_space(self) -> int:
         """returns free space on backup hdd in bytes"""
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Optional
+
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+CHECKPOINT_FILE_NAME = ".backup_checkpoint.json"
+
+
+class BackupPhase(Enum):
+    SNAPSHOT = "snapshot"
+    SYNCHRONISATION = "synchronisation"
+    FINALISATION = "finalisation"
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    backup: str  # name of the backup directory without suffix
+    phase: BackupPhase
+
+
+class BackupCheckpoint:
+    """Remembers which phase the running backup has reached, so that an interrupted backup can be resumed without
+    repeating completed phases. The checkpoint file lives in the root of the backup hdd and is replaced atomically."""
+
+    def __init__(self, backup_hdd_location: Path) -> None:
+        self._file = Path(backup_hdd_location) / CHECKPOINT_FILE_NAME
+
+    def load(self) -> Optional[Checkpoint]:
+        try:
+            with open(self._file, "r") as file:
+                content = json.load(file)
+            return Checkpoint(backup=content["backup"], phase=BackupPhase(content["phase"]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            LOG.warning(f"ignoring unreadable backup checkpoint {self._file}: {e}")
+            return None
+
+    def phase_of(self, backup: Path) -> Optional[BackupPhase]:
+        checkpoint = self.load()
+        return checkpoint.phase if checkpoint is not None and checkpoint.backup == backup.stem else None
+
+    def save(self, backup: Path, phase: BackupPhase) -> None:
+        LOG.debug(f"checkpoint: {backup.stem} reached phase {phase.value}")
+        temporary = self._file.with_name(self._file.name + ".tmp")
+        with open(temporary, "w") as file:
+            json.dump({"backup": backup.stem, "phase": phase.value}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self._file)
+
+    def clear(self) -> None:
+        try:
+            self._file.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Event
+from typing import Dict, Generator, List, Optional
+
+from base.common.config import get_config
+from base.common.logger import LoggerFactory
+from base.logic.backup.file_hash import hash_files, regular_files
+
+LOG = LoggerFactory.get_logger(__name__)
+
+MANIFEST_DIRECTORY_NAME = ".manifests"
+MANIFEST_SUFFIX = ".jsonl.gz"
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    path: str  # relative to the backup
+    size: int
+    mtime_ns: int
+    inode: int
+    digest: str
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"p": self.path, "s": self.size, "m": self.mtime_ns, "i": self.inode, "h": self.digest},
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> ManifestEntry:
+        entry = json.loads(line)
+        return cls(path=entry["p"], size=entry["s"], mtime_ns=entry["m"], inode=entry["i"], digest=entry["h"])
+
+
+@dataclass
+class ManifestStatus:
+    files_hashed: int = 0
+    files_carried_over: int = 0
+    errors: int = 0
+
+
+class ChecksumManifest:
+    """Records path, size, mtime and blake2b hash of every regular file of a backup in a gzipped JSON-lines file in
+    .manifests/ on the backup hdd.
+
+    Unchanged files are hardlinked from the previous backup, so their inode is the same. Entries of the previous
+    manifest whose inode, size and mtime match are carried over, only new and changed files are hashed (in a process
+    pool). The manifest is written while hashing and renamed when complete.
+    """
+
+    def __init__(self, backup_hdd_location: Path) -> None:
+        self._directory = Path(backup_hdd_location) / MANIFEST_DIRECTORY_NAME
+        self._abort = Event()
+
+    def terminate(self) -> None:
+        LOG.info("aborting checksum manifest")
+        self._abort.set()
+
+    def path_of(self, backup: Path) -> Path:
+        return self._directory / (backup.stem + MANIFEST_SUFFIX)
+
+    def exists(self, backup: Path) -> bool:
+        return self.path_of(backup).exists()
+
+    def entries(self, backup: Path) -> Generator[ManifestEntry, None, None]:
+        """:raises OSError: if there is no manifest of the backup"""
+        with gzip.open(self.path_of(backup), "rt") as file:
+            for line in file:
+                yield ManifestEntry.from_json(line)
+
+    def remove(self, backup: Path) -> None:
+        try:
+            self.path_of(backup).unlink()
+        except FileNotFoundError:
+            pass
+
+    def previous_manifest_of(self, backup: Path) -> Optional[Path]:
+        """the manifest of the newest backup that is older than the given one"""
+        try:
+            older = sorted(
+                manifest
+                for manifest in self._directory.iterdir()
+                if manifest.name.endswith(MANIFEST_SUFFIX) and manifest.name < backup.stem + MANIFEST_SUFFIX
+            )
+        except FileNotFoundError:
+            return None
+        return older[-1] if older else None
+
+    def create(self, backup: Path) -> ManifestStatus:
+        status = ManifestStatus()
+        self._directory.mkdir(exist_ok=True)
+        carried_over = self._previous_entries_by_inode(backup)
+        manifest = self.path_of(backup)
+        temporary = manifest.with_name(manifest.name + ".tmp")
+        to_hash: List[Path] = []
+        with gzip.open(temporary, "wt") as file:
+            for path in regular_files(backup):
+                try:
+                    stat = os.lstat(path)
+                except OSError:
+                    status.errors += 1
+                    continue
+                previous = carried_over.get(stat.st_ino)
+                if previous is not None and (previous.size, previous.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                    file.write(_entry(backup, path, stat, previous.digest).to_json() + "\n")
+                    status.files_carried_over += 1
+                else:
+                    to_hash.append(path)
+            for path, digest in hash_files(to_hash, get_config("backup.json").manifest_workers, self._abort):
+                try:
+                    stat = os.lstat(path)
+                except OSError:
+                    digest = None
+                if digest is None:
+                    status.errors += 1
+                    continue
+                file.write(_entry(backup, path, stat, digest).to_json() + "\n")
+                status.files_hashed += 1
+        if self._abort.is_set():
+            temporary.unlink()
+            LOG.warning(f"checksum manifest of {backup} aborted")
+            return status
+        os.replace(temporary, manifest)
+        LOG.info(f"checksum manifest of {backup} written: {status}")
+        return status
+
+    def _previous_entries_by_inode(self, backup: Path) -> Dict[int, ManifestEntry]:
+        previous_manifest = self.previous_manifest_of(backup)
+        if previous_manifest is None:
+            return {}
+        try:
+            with gzip.open(previous_manifest, "rt") as file:
+                return {entry.inode: entry for entry in map(ManifestEntry.from_json, file)}
+        except (OSError, ValueError, KeyError) as e:
+            LOG.warning(f"cannot read the previous manifest {previous_manifest}, hashing everything: {e}")
+            return {}
+
+
+def _entry(backup: Path, path: Path, stat: os.stat_result, digest: str) -> ManifestEntry:
+    return ManifestEntry(
+        path=os.fsdecode(path.relative_to(backup)),
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        inode=stat.st_ino,
+        digest=digest,
+    )
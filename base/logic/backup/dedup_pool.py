@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Event
+from typing import IO, Dict, List, Set, Tuple
+
+from base.common.config import Config, get_config
+from base.common.disk_space import DiskSpace
+from base.common.logger import LoggerFactory
+from base.logic.backup.file_hash import hash_files, regular_files
+from base.logic.backup.space_planner import BLOCK_SIZE
+
+LOG = LoggerFactory.get_logger(__name__)
+
+POOL_DIRECTORY_NAME = ".dedup_pool"
+INDEX_FILE_NAME = "index.jsonl"
+
+
+@dataclass(frozen=True)
+class PoolEntry:
+    digest: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+@dataclass
+class DeduplicationStatus:
+    files_hashed: int = 0
+    files_pooled: int = 0  # content seen for the first time, added to the pool
+    files_linked: int = 0  # content already pooled, replaced by a link to the pool
+    bytes_saved: int = 0
+    errors: int = 0
+
+
+class DedupPool:
+    """Content-addressed pool on the backup hdd that shares files between backups regardless of their path.
+
+    Hardlink snapshots only share a file as long as it keeps its path, so moving a directory on the NAS results in a
+    second copy. After the synchronisation every file of the new backup that isn't linked to the pool yet is hashed (in
+    a process pool). New content is linked into the pool, content that is already pooled replaces the file in the
+    backup by a link to the pool copy. Files are only replaced if size, mtime, mode and owner match, since hardlinks
+    share these as well.
+
+    The pool holds one link of every pooled file. collect_garbage() removes the files that aren't used by any backup
+    anymore.
+    """
+
+    def __init__(self, backup_hdd_location: Path) -> None:
+        self._config: Config = get_config("backup.json")
+        self._pool = Path(backup_hdd_location) / POOL_DIRECTORY_NAME
+        self._index_file = self._pool / INDEX_FILE_NAME
+        self._abort = Event()
+
+    def terminate(self) -> None:
+        LOG.info("aborting deduplication")
+        self._abort.set()
+
+    def pooled_inodes(self) -> Set[Tuple[int, int]]:
+        """(device, inode) of every pooled file"""
+        try:
+            device = os.stat(self._pool).st_dev
+        except FileNotFoundError:
+            return set()
+        return {(device, entry.inode) for entry in self._load_index().values()}
+
+    def deduplicate(self, backup: Path) -> DeduplicationStatus:
+        status = DeduplicationStatus()
+        self._pool.mkdir(exist_ok=True)
+        index = self._load_index()
+        pooled_inodes = {entry.inode for entry in index.values()}
+        candidates = [path for path in regular_files(backup) if self._is_candidate(path, pooled_inodes)]
+        LOG.info(f"deduplicating {len(candidates)} files of {backup} with {self._config.dedup_pool_workers} workers")
+        with open(self._index_file, "a") as index_file:
+            for path, digest in hash_files(candidates, self._config.dedup_pool_workers, self._abort):
+                status.files_hashed += 1
+                if digest is None:
+                    status.errors += 1
+                    continue
+                try:
+                    self._pool_or_link(path, digest, index, index_file, status)
+                except OSError as e:
+                    LOG.warning(f"cannot deduplicate {path}: {e}")
+                    status.errors += 1
+        DiskSpace.invalidate()
+        LOG.info(f"deduplication of {backup} finished: {status}")
+        return status
+
+    def collect_garbage(self) -> int:
+        """removes pooled files that aren't linked into any backup anymore. Returns the freed bytes."""
+        freed = 0
+        remaining = {}
+        for digest, entry in self._load_index().items():
+            path = self._pool_path(digest)
+            try:
+                stat = os.stat(path)
+                if stat.st_nlink > 1:
+                    remaining[digest] = entry
+                    continue
+                path.unlink()
+                freed += stat.st_blocks * BLOCK_SIZE
+            except FileNotFoundError:
+                pass
+        if self._index_file.exists():
+            self._write_index(list(remaining.values()))
+        LOG.info(f"removed unused files from the deduplication pool, freed {freed} bytes")
+        DiskSpace.invalidate()
+        return freed
+
+    def _is_candidate(self, path: Path, pooled_inodes: Set[int]) -> bool:
+        try:
+            stat = os.lstat(path)
+        except OSError:
+            return False
+        return stat.st_size >= self._config.dedup_pool_min_file_size and stat.st_ino not in pooled_inodes
+
+    def _pool_or_link(
+        self, path: Path, digest: str, index: Dict[str, PoolEntry], index_file: IO, status: DeduplicationStatus
+    ) -> None:
+        stat = os.lstat(path)
+        pool_path = self._pool_path(digest)
+        if not pool_path.exists():
+            pool_path.parent.mkdir(exist_ok=True)
+            os.link(path, pool_path)
+            self._add_to_index(PoolEntry(digest, stat.st_size, stat.st_mtime_ns, stat.st_ino), index, index_file)
+            status.files_pooled += 1
+            return
+        pooled = os.stat(pool_path)
+        if digest not in index:
+            self._add_to_index(PoolEntry(digest, pooled.st_size, pooled.st_mtime_ns, pooled.st_ino), index, index_file)
+        if _metadata(pooled) != _metadata(stat):
+            return
+        temporary = path.with_name(f".{path.name}.dedup")
+        os.link(pool_path, temporary)
+        os.replace(temporary, path)
+        status.files_linked += 1
+        if stat.st_nlink == 1:
+            status.bytes_saved += stat.st_blocks * BLOCK_SIZE
+
+    @staticmethod
+    def _add_to_index(entry: PoolEntry, index: Dict[str, PoolEntry], index_file: IO) -> None:
+        index[entry.digest] = entry
+        index_file.write(json.dumps(asdict(entry)) + "\n")
+
+    def _pool_path(self, digest: str) -> Path:
+        return self._pool / digest[:2] / digest[2:]
+
+    def _load_index(self) -> Dict[str, PoolEntry]:
+        try:
+            with open(self._index_file, "r") as file:
+                entries = [PoolEntry(**json.loads(line)) for line in file if line.strip()]
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError) as e:
+            LOG.warning(f"deduplication pool index {self._index_file} is corrupt, rebuilding it: {e}")
+            entries = self._rebuild_index()
+            self._write_index(entries)
+        return {entry.digest: entry for entry in entries}
+
+    def _rebuild_index(self) -> List[PoolEntry]:
+        entries = []
+        for path in regular_files(self._pool):
+            if path.parent == self._pool:  # the index itself
+                continue
+            stat = os.lstat(path)
+            digest = path.parent.name + path.name
+            entries.append(PoolEntry(digest=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino))
+        return entries
+
+    def _write_index(self, entries: List[PoolEntry]) -> None:
+        temporary = self._index_file.with_name(self._index_file.name + ".tmp")
+        with open(temporary, "w") as file:
+            file.writelines(json.dumps(asdict(entry)) + "\n" for entry in entries)
+        os.replace(temporary, self._index_file)
+
+
+def _metadata(stat: os.stat_result) -> Tuple[int, int, int, int, int]:
+    return stat.st_size, stat.st_mtime_ns, stat.st_mode, stat.st_uid, stat.st_gid
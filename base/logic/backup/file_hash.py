@@ -0,0 +1,73 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from threading import Event, Lock
+from time import monotonic, sleep
+from typing import Generator, List, Optional, Tuple
+
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class RateLimiter:
+    """Token bucket shared by several readers. A rate of 0 means unlimited."""
+
+    def __init__(self, bytes_per_second: int) -> None:
+        self._bytes_per_second = bytes_per_second
+        self._lock = Lock()
+        self._next_free = monotonic()
+
+    def acquire(self, amount_bytes: int) -> None:
+        if self._bytes_per_second <= 0:
+            return
+        with self._lock:
+            now = monotonic()
+            start = max(self._next_free, now)
+            self._next_free = start + amount_bytes / self._bytes_per_second
+        if start > now:
+            sleep(start - now)
+
+
+def hash_file(path: Path, rate_limiter: Optional[RateLimiter] = None) -> Optional[str]:
+    """blake2b of the content, None if the file cannot be read. Runs in worker processes, so it has to stay picklable."""
+    digest = hashlib.blake2b(digest_size=32)
+    try:
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                if rate_limiter is not None:
+                    rate_limiter.acquire(len(chunk))
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def hash_files(paths: List[Path], workers: int, abort: Event) -> Generator[Tuple[Path, Optional[str]], None, None]:
+    """hashes in a process pool, in batches so that an abort doesn't have to wait for all files"""
+    batch_size = 16 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(paths), batch_size):
+            if abort.is_set():
+                return
+            batch = paths[start : start + batch_size]
+            yield from zip(batch, executor.map(hash_file, batch))
+
+
+def regular_files(directory: Path) -> Generator[Path, None, None]:
+    """regular files, symlinks aren't followed"""
+    directories = [directory]
+    while directories:
+        current = directories.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        yield Path(entry.path)
+        except OSError as e:
+            LOG.warning(f"cannot list {current}: {e}")
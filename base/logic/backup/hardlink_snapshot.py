@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Event, Lock
+from time import time
+from typing import List, Set, Tuple
+
+from base.common.config import Config, get_config
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+@dataclass
+class HardlinkSnapshotStatus:
+    files_linked: int = 0
+    files_already_present: int = 0
+    directories_created: int = 0
+    errors: int = 0
+    start_time: float = 0.0
+    finished: bool = False
+
+    @property
+    def files_processed(self) -> int:
+        return self.files_linked + self.files_already_present
+
+    @property
+    def files_per_second(self) -> float:
+        duration = time() - self.start_time
+        return self.files_processed / duration if duration > 0 else 0.0
+
+
+class HardlinkSnapshot:
+    """Replicates the directory tree of the recent backup into the new backup and hardlinks every file (like 'cp -al').
+
+    The tree is walked with os.scandir by a pool of workers, each of them handling one directory at a time. Entries that
+    already exist in the new backup (e.g. from an interrupted run) are skipped, so the snapshot can be resumed.
+    """
+
+    def __init__(self, recent_backup: Path, new_backup: Path) -> None:
+        self._config: Config = get_config("backup.json")
+        self._recent_backup = recent_backup
+        self._new_backup = new_backup
+        self._status = HardlinkSnapshotStatus()
+        self._status_lock = Lock()
+        self._abort = Event()
+        self._running = False
+
+    @property
+    def status(self) -> HardlinkSnapshotStatus:
+        return self._status
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def aborted(self) -> bool:
+        return self._abort.is_set()
+
+    def terminate(self) -> None:
+        LOG.info("aborting hardlink snapshot")
+        self._abort.set()
+
+    def run(self) -> HardlinkSnapshotStatus:
+        LOG.info(
+            f"hardlinking {self._recent_backup} into {self._new_backup} "
+            f"with {self._config.hardlink_snapshot_workers} workers"
+        )
+        self._running = True
+        self._status.start_time = time()
+        try:
+            self._new_backup.mkdir(exist_ok=True)
+            self._walk()
+        finally:
+            self._running = False
+        self._status.finished = not self.aborted
+        self._log_progress()
+        return self._status
+
+    def _walk(self) -> None:
+        report_interval = self._config.hardlink_snapshot_report_interval
+        last_report = time()
+        with ThreadPoolExecutor(max_workers=self._config.hardlink_snapshot_workers) as executor:
+            pending: Set[Future] = {
+                executor.submit(self._link_directory, str(self._recent_backup), str(self._new_backup))
+            }
+            while pending:
+                done, pending = wait(pending, timeout=report_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for source_directory, target_directory in future.result():
+                        pending.add(executor.submit(self._link_directory, source_directory, target_directory))
+                if time() - last_report > report_interval:
+                    self._log_progress()
+                    last_report = time()
+
+    def _link_directory(self, source_directory: str, target_directory: str) -> List[Tuple[str, str]]:
+        """links all files of source_directory into target_directory and returns the subdirectories to process next"""
+        if self._abort.is_set():
+            return []
+        subdirectories = []
+        linked = already_present = created = errors = 0
+        # rsync transfers everything that is missing afterwards, so there's no need to give up on errors here
+        try:
+            with os.scandir(source_directory) as entries:
+                for entry in entries:
+                    target = os.path.join(target_directory, entry.name)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            created += self._make_directory(entry.path, target)
+                            subdirectories.append((entry.path, target))
+                        elif self._link(entry.path, target):
+                            linked += 1
+                        else:
+                            already_present += 1
+                    except OSError as e:
+                        LOG.warning(f"cannot hardlink {entry.path} to {target}: {e}")
+                        errors += 1
+        except OSError as e:
+            LOG.warning(f"cannot read {source_directory}: {e}")
+            errors += 1
+        with self._status_lock:
+            self._status.files_linked += linked
+            self._status.files_already_present += already_present
+            self._status.directories_created += created
+            self._status.errors += errors
+        return subdirectories
+
+    @staticmethod
+    def _make_directory(source: str, target: str) -> int:
+        try:
+            os.mkdir(target)
+        except FileExistsError:
+            return 0
+        shutil.copystat(source, target, follow_symlinks=False)  # timestamps are corrected by rsync afterwards
+        return 1
+
+    @staticmethod
+    def _link(source: str, target: str) -> bool:
+        """:return: False if the target already existed (i.e. was linked before the snapshot got interrupted)"""
+        try:
+            os.link(source, target, follow_symlinks=False)
+        except FileExistsError:
+            return False  # if it differs from the source, rsync will replace it anyway
+        return True
+
+    def _log_progress(self) -> None:
+        LOG.info(
+            f"hardlink snapshot: {self._status.files_linked} files linked, "
+            f"{self._status.files_already_present} already present, "
+            f"{self._status.directories_created} directories created, {self._status.errors} errors "
+            f"({self._status.files_per_second:.0f} files/s)"
+        )
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from threading import Event, Thread
+from typing import TYPE_CHECKING, List, Optional, Set
+
+from base.common.config import Config, get_config
+from base.common.constants import BackupDirectorySuffix
+from base.common.logger import LoggerFactory
+from base.logic.backup.checksum_manifest import ChecksumManifest, ManifestEntry
+from base.logic.backup.file_hash import RateLimiter, hash_file
+
+if TYPE_CHECKING:
+    from base.logic.backup.backup_catalog import BackupCatalog  # the catalog stores ScrubResult
+
+LOG = LoggerFactory.get_logger(__name__)
+
+CURSOR_FILE_NAME = ".scrub_cursor.json"
+MAX_EXAMPLES = 20
+
+
+@dataclass
+class ScrubResult:
+    files_checked: int = 0
+    bytes_checked: int = 0
+    missing: int = 0
+    unreadable: int = 0
+    corrupted: int = 0
+    complete: bool = False  # whether the current pass has checked every file of the backup
+    last_scrubbed: Optional[str] = None  # isoformat
+    examples: List[str] = field(default_factory=list)  # e.g. "corrupted: photos/IMG_0001.jpg"
+
+    @property
+    def ok(self) -> bool:
+        return self.missing == self.unreadable == self.corrupted == 0
+
+    def add_finding(self, kind: str, path: str) -> None:
+        setattr(self, kind, getattr(self, kind) + 1)
+        if len(self.examples) < MAX_EXAMPLES:
+            self.examples.append(f"{kind}: {path}")
+
+
+@dataclass
+class ScrubCursor:
+    backup: str  # name of the backup, e.g. backup_2022_01_16-12_00_00
+    position: int = 0  # index into the checksum manifest of the backup
+
+
+class Scrubber(Thread):
+    """Rereads finished backups and compares them with their checksum manifests to detect bit rot.
+
+    Backups are scrubbed oldest first, one session at a time. A session stops after scrub_bytes_per_session bytes and
+    reads at most scrub_bytes_per_second, so it only uses idle time while the backup hdd is docked anyway. The cursor
+    on the backup hdd remembers where the last session stopped. Files that are hardlinked from the previous backup have
+    been scrubbed with it already and are skipped. Backups without manifest cannot be scrubbed. The findings are
+    written to the backup catalog.
+    """
+
+    def __init__(self, backup_hdd_location: Path, catalog: BackupCatalog) -> None:
+        super().__init__()
+        self._config: Config = get_config("backup.json")
+        self._backup_hdd_location = Path(backup_hdd_location)
+        self._catalog = catalog
+        self._manifest = ChecksumManifest(self._backup_hdd_location)
+        self._rate_limiter = RateLimiter(self._config.scrub_bytes_per_second)
+        self._abort = Event()
+        self._bytes_left = 0
+
+    @property
+    def cursor_file(self) -> Path:
+        return self._backup_hdd_location / CURSOR_FILE_NAME
+
+    def terminate(self) -> None:
+        LOG.info("aborting scrub session")
+        self._abort.set()
+
+    def run(self) -> None:
+        try:
+            self.scrub()
+        except OSError as e:
+            LOG.warning(f"scrub session stopped: {e}")
+
+    def scrub(self) -> Optional[ScrubCursor]:
+        """runs one session
+
+        :return: where the next session will continue, None if the pass over all backups is complete
+        """
+        self._bytes_left = self._config.scrub_bytes_per_session
+        backups = self._scrubbable_backups()
+        cursor = self._load_cursor()
+        for index, backup in enumerate(backups):
+            if cursor is not None and backup.stem < cursor.backup:
+                continue
+            position = cursor.position if cursor is not None and cursor.backup == backup.stem else 0
+            previous_backup = backups[index - 1] if index > 0 else None
+            cursor = self._scrub_backup(backup, previous_backup, position)
+            if cursor is not None:
+                self._save_cursor(cursor)
+                return cursor
+        LOG.info("scrub pass over all backups complete")
+        self.clear_cursor()
+        return None
+
+    def _scrubbable_backups(self) -> List[Path]:
+        return [
+            self._backup_hdd_location / entry.directory_name
+            for entry in self._catalog.entries()
+            if entry.suffix == BackupDirectorySuffix.finished.suffix
+            and self._manifest.exists(self._backup_hdd_location / entry.directory_name)
+        ]
+
+    def _scrub_backup(self, backup: Path, previous_backup: Optional[Path], position: int) -> Optional[ScrubCursor]:
+        """:return: the cursor if the session has stopped within this backup"""
+        result = self._previous_result(backup) if position > 0 else ScrubResult()
+        scrubbed_with_previous_backup = self._inodes_of(previous_backup) if previous_backup is not None else set()
+        cursor: Optional[ScrubCursor] = None
+        LOG.info(f"scrubbing {backup} from file {position} on")
+        for index, entry in enumerate(self._manifest.entries(backup)):
+            if index < position or entry.inode in scrubbed_with_previous_backup:
+                continue
+            if self._abort.is_set() or self._bytes_left <= 0:
+                cursor = ScrubCursor(backup=backup.stem, position=index)
+                break
+            self._check(backup, entry, result)
+        result.complete = cursor is None
+        result.last_scrubbed = datetime.now().isoformat()
+        self._catalog.update(backup.stem, scrub=result)
+        if not result.ok:
+            LOG.warning(f"scrubbing {backup} found bit rot: {result}")
+        return cursor
+
+    def _check(self, backup: Path, entry: ManifestEntry, result: ScrubResult) -> None:
+        path = backup / entry.path
+        try:
+            stat = os.lstat(path)
+        except FileNotFoundError:
+            result.add_finding("missing", entry.path)
+            return
+        digest = hash_file(path, self._rate_limiter)
+        self._bytes_left -= stat.st_size
+        result.files_checked += 1
+        result.bytes_checked += stat.st_size
+        if digest is None:
+            result.add_finding("unreadable", entry.path)
+        elif digest != entry.digest:
+            result.add_finding("corrupted", entry.path)
+
+    def _previous_result(self, backup: Path) -> ScrubResult:
+        """the findings of the sessions that have scrubbed the beginning of the backup"""
+        for entry in self._catalog.entries():
+            if entry.name == backup.stem and entry.scrub is not None:
+                return entry.scrub
+        return ScrubResult()
+
+    def _inodes_of(self, backup: Path) -> Set[int]:
+        try:
+            return {entry.inode for entry in self._manifest.entries(backup)}
+        except (OSError, ValueError, KeyError) as e:
+            LOG.warning(f"cannot read the manifest of {backup}: {e}")
+            return set()
+
+    def _load_cursor(self) -> Optional[ScrubCursor]:
+        try:
+            return ScrubCursor(**json.loads(self.cursor_file.read_text()))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            LOG.warning(f"scrub cursor {self.cursor_file} is corrupt, starting over: {e}")
+            return None
+
+    def _save_cursor(self, cursor: ScrubCursor) -> None:
+        temporary = self.cursor_file.with_name(CURSOR_FILE_NAME + ".tmp")
+        temporary.write_text(json.dumps(asdict(cursor)))
+        os.replace(temporary, self.cursor_file)
+
+    def clear_cursor(self) -> None:
+        try:
+            self.cursor_file.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,111 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from base.common.logger import LoggerFactory
+from base.logic.backup.backup_catalog import BackupCatalog, CatalogEntry
+from base.logic.backup.space_planner import BLOCK_SIZE
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+class SnapshotSizeIndex:
+    """Keeps the exclusively owned (unique) and the shared bytes of every backup in the backup catalog, so they don't
+    have to be determined with a walk over all backups.
+
+    A file is unique to a backup while it has a single link. Backups only share files with their neighbours in practice,
+    since every snapshot is linked from the newest backup. Therefore a change of ownership is found by walking the added
+    or deleted backup once and looking up the files with exactly two links at the same path in the neighbours:
+    - a new backup turns such a file of the backup before it from unique into shared
+    - deleting a backup turns such a file of a neighbour from shared into unique
+    Files that have been renamed between backups aren't found this way. rescan() corrects the figures of a backup.
+    The link held by the DedupPool isn't counted, a pooled file is unique to a backup while no other backup links it.
+    """
+
+    def __init__(self, catalog: BackupCatalog, pooled_inodes: Optional[Set[Tuple[int, int]]] = None) -> None:
+        """
+        :param pooled_inodes:   (device, inode) of the files in the DedupPool
+        """
+        self._catalog = catalog
+        self._pooled_inodes = pooled_inodes or set()
+
+    def on_backup_added(self, backup: Path, previous_backup: Optional[Path]) -> None:
+        neighbours = [previous_backup] if previous_backup is not None else []
+        unique_bytes, shared_bytes, bytes_shared_with = _measure(backup, neighbours, self._pooled_inodes)
+        self._catalog.update(backup.stem, unique_bytes=unique_bytes, shared_bytes=shared_bytes)
+        for neighbour, size in bytes_shared_with.items():
+            self._move_bytes(neighbour, from_unique_to_shared=size)
+        LOG.info(f"{backup} owns {unique_bytes} bytes and shares {shared_bytes} bytes")
+
+    def on_backup_deleted(self, backup: Path, neighbours: List[Path]) -> None:
+        """to be called before the backup is deleted"""
+        _, _, bytes_shared_with = _measure(backup, neighbours, self._pooled_inodes)
+        for neighbour, size in bytes_shared_with.items():
+            self._move_bytes(neighbour, from_unique_to_shared=-size)
+
+    def rescan(self, backup: Path) -> None:
+        unique_bytes, shared_bytes, _ = _measure(backup, [], self._pooled_inodes)
+        self._catalog.update(backup.stem, unique_bytes=unique_bytes, shared_bytes=shared_bytes)
+
+    def _move_bytes(self, backup: Path, from_unique_to_shared: int) -> None:
+        entry = self._entry(backup.stem)
+        if entry is None or entry.unique_bytes is None or entry.shared_bytes is None:
+            return
+        self._catalog.update(
+            entry.name,
+            unique_bytes=max(entry.unique_bytes - from_unique_to_shared, 0),
+            shared_bytes=max(entry.shared_bytes + from_unique_to_shared, 0),
+        )
+
+    def _entry(self, name: str) -> Optional[CatalogEntry]:
+        for entry in self._catalog.entries():
+            if entry.name == name:
+                return entry
+        return None
+
+
+def _measure(
+    backup: Path, neighbours: List[Path], pooled_inodes: Set[Tuple[int, int]]
+) -> Tuple[int, int, Dict[Path, int]]:
+    """
+    :return:    unique bytes, shared bytes and the bytes shared with each neighbour alone
+    """
+    unique_bytes = 0
+    shared_bytes = 0
+    bytes_shared_with: Dict[Path, int] = {}
+    directories = [backup]
+    while directories:
+        directory = directories.pop()
+        try:
+            unique_bytes += os.stat(directory, follow_symlinks=False).st_blocks * BLOCK_SIZE
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(Path(entry.path))
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    size = stat.st_blocks * BLOCK_SIZE
+                    links = stat.st_nlink - 1 if (stat.st_dev, stat.st_ino) in pooled_inodes else stat.st_nlink
+                    if links == 1:
+                        unique_bytes += size
+                        continue
+                    shared_bytes += size
+                    if links == 2:
+                        relative_path = Path(entry.path).relative_to(backup)
+                        neighbour = _holder_of_other_link(relative_path, stat, neighbours)
+                        if neighbour is not None:
+                            bytes_shared_with[neighbour] = bytes_shared_with.get(neighbour, 0) + size
+        except OSError as e:
+            LOG.warning(f"cannot measure {directory}: {e}")
+    return unique_bytes, shared_bytes, bytes_shared_with
+
+
+def _holder_of_other_link(relative_path: Path, stat: os.stat_result, neighbours: List[Path]) -> Optional[Path]:
+    for neighbour in neighbours:
+        try:
+            other = os.stat(neighbour / relative_path, follow_symlinks=False)
+        except OSError:
+            continue
+        if (other.st_dev, other.st_ino) == (stat.st_dev, stat.st_ino):
+            return neighbour
+    return None
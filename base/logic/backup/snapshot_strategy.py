@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from enum import Enum
+
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+class SnapshotStrategy(Enum):
+    HARDLINK_COPY = "hardlink_copy"  # hardlink the newest backup into the new one, then rsync into it
+    LINK_DEST = "link_dest"  # rsync into an empty directory and let rsync hardlink unchanged files (--link-dest)
+
+    @classmethod
+    def _missing_(cls, value: object) -> SnapshotStrategy:
+        LOG.error(f"{value} is not a valid snapshot strategy! Defaulting to {SnapshotStrategy.HARDLINK_COPY.value}.")
+        return SnapshotStrategy.HARDLINK_COPY
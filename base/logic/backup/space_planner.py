@@ -0,0 +1,78 @@
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+BLOCK_SIZE = 512  # unit of st_blocks
+
+
+@dataclass
+class DeletionPlan:
+    backups: List[Path] = field(default_factory=list)
+    bytes_freed: int = 0
+    sufficient: bool = True
+
+
+class SpacePlanner:
+    """Plans which backups have to be deleted to free a given amount of space, before anything is deleted.
+
+    Snapshots share most of their files as hardlinks, so deleting a backup only frees the files whose every link lies
+    within the deleted backups. The planner walks the candidates oldest first and counts the links it has seen per inode.
+    An inode is freed as soon as all of its links (st_nlink) have been seen. Files with a single link are freed right
+    away and aren't remembered.
+    """
+
+    def __init__(self, candidates: List[Path], pooled_inodes: Optional[Set[Tuple[int, int]]] = None) -> None:
+        """
+        :param candidates:      backups that may be deleted, oldest first
+        :param pooled_inodes:   (device, inode) of the files in the DedupPool. The pool holds one more link of them,
+                                which is removed by its garbage collection.
+        """
+        self._candidates = candidates
+        self._pooled_inodes = pooled_inodes or set()
+
+    def plan(self, bytes_needed: int) -> DeletionPlan:
+        plan = DeletionPlan()
+        links_seen: Counter[Tuple[int, int]] = Counter()
+        for backup in self._candidates:
+            if plan.bytes_freed >= bytes_needed:
+                break
+            freed = self._bytes_freed_by(backup, links_seen)
+            LOG.debug(f"deleting {backup} frees {freed} bytes")
+            plan.backups.append(backup)
+            plan.bytes_freed += freed
+        plan.sufficient = plan.bytes_freed >= bytes_needed
+        return plan
+
+    def _bytes_freed_by(self, backup: Path, links_seen: Counter) -> int:
+        freed = 0
+        directories = [str(backup)]
+        while directories:
+            directory = directories.pop()
+            try:
+                freed += os.stat(directory, follow_symlinks=False).st_blocks * BLOCK_SIZE
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                        else:
+                            freed += self._bytes_freed_by_file(entry, links_seen)
+            except OSError as e:
+                LOG.warning(f"cannot account for {directory}: {e}")
+        return freed
+
+    def _bytes_freed_by_file(self, entry: os.DirEntry, links_seen: Counter) -> int:
+        stat = entry.stat(follow_symlinks=False)
+        inode = (stat.st_dev, stat.st_ino)
+        links_elsewhere = stat.st_nlink - 1 if inode in self._pooled_inodes else stat.st_nlink
+        if links_elsewhere > 1:
+            links_seen[inode] += 1
+            if links_seen[inode] < links_elsewhere:
+                return 0
+            del links_seen[inode]
+        return stat.st_blocks * BLOCK_SIZE
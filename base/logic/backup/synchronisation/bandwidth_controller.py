@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from datetime import datetime, time
+from time import monotonic
+from typing import Callable, Optional
+
+from base.common.config import Config
+from base.common.exceptions import RemoteCommandError
+from base.common.logger import LoggerFactory
+from base.logic.nas import Nas
+
+LOG = LoggerFactory.get_logger(__name__)
+
+UNLIMITED = 0
+KIB = 1024
+# a new limit has to differ at least that much from the current one to be worth restarting rsync
+MINIMUM_RELATIVE_CHANGE = 0.25
+
+
+@dataclass
+class HardwareReadings:
+    sbu_temperature: Optional[float] = None  # °C
+    input_current: Optional[float] = None  # A
+
+
+class BandwidthController:
+    """Chooses rsync's --bwlimit in KiB/s (0 means unlimited).
+
+    The base limit comes from the time windows in bwlimit_windows, e.g.
+    [{"start": "07:00", "end": "22:00", "kib_per_second": 20480}], outside of all windows the transfer is unlimited.
+    Every bwlimit_adjust_interval seconds, the load of the nas (per core, measured over ssh) and the temperature and
+    input current of the BaSe (measured by the SBU) are compared with their thresholds. Every exceeded threshold
+    multiplies the limit by bwlimit_reduction_factor. If the transfer is unlimited, the reduction is applied to the
+    current transfer rate. The limit never gets lower than bwlimit_minimum_kib_per_second.
+    """
+
+    def __init__(self, config: Config, hardware_readings: Optional[Callable[[], HardwareReadings]] = None) -> None:
+        self._config = config
+        self._hardware_readings = hardware_readings
+        self._limit = self._window_limit()
+        self._next_adjustment = monotonic() + self._config.bwlimit_adjust_interval
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def adjust(self, bytes_per_second: float) -> bool:
+        """reevaluates the limit once per bwlimit_adjust_interval
+
+        :param bytes_per_second: current transfer rate
+        :return: whether the limit has changed, so that rsync has to be restarted. The limit is kept if the load of the
+                 nas cannot be measured.
+        """
+        if monotonic() < self._next_adjustment:
+            return False
+        self._next_adjustment = monotonic() + self._config.bwlimit_adjust_interval
+        try:
+            limit = self._measured_limit(bytes_per_second)
+        except RemoteCommandError as e:
+            LOG.warning(f"cannot measure the load of the nas, keeping the limit of {self._limit} KiB/s: {e}")
+            return False
+        if not self._differs_significantly(limit):
+            return False
+        LOG.info(f"changing the bandwidth limit from {self._limit} to {limit} KiB/s (0 means unlimited)")
+        self._limit = limit
+        return True
+
+    def _measured_limit(self, bytes_per_second: float) -> int:
+        limit = self._window_limit()
+        reasons = [reason for reason in [self._nas_busy(), self._base_stressed()] if reason]
+        if not reasons:
+            return limit
+        LOG.info(f"reducing the bandwidth: {', '.join(reasons)}")
+        if limit == UNLIMITED:
+            limit = int(bytes_per_second / KIB)
+        reduced = limit * self._config.bwlimit_reduction_factor ** len(reasons)
+        return max(int(reduced), int(self._config.bwlimit_minimum_kib_per_second))
+
+    def _window_limit(self, now: Optional[datetime] = None) -> int:
+        current_time = (now or datetime.now()).time()
+        for window in self._config.bwlimit_windows:
+            if _within(current_time, time.fromisoformat(window["start"]), time.fromisoformat(window["end"])):
+                return int(window["kib_per_second"])
+        return UNLIMITED
+
+    def _nas_busy(self) -> str:
+        """:raises RemoteCommandError: if the load of the nas cannot be measured"""
+        load = Nas().load()
+        if load > self._config.bwlimit_nas_load_threshold:
+            return f"nas load is {load:.2f} per core"
+        return ""
+
+    def _base_stressed(self) -> str:
+        if self._hardware_readings is None:
+            return ""
+        readings = self._hardware_readings()
+        if readings.sbu_temperature is not None and (
+            readings.sbu_temperature > self._config.bwlimit_sbu_temperature_threshold
+        ):
+            return f"temperature is {readings.sbu_temperature:.1f} °C"
+        if readings.input_current is not None and readings.input_current > self._config.bwlimit_input_current_threshold:
+            return f"input current is {readings.input_current:.2f} A"
+        return ""
+
+    def _differs_significantly(self, limit: int) -> bool:
+        if limit == self._limit:
+            return False
+        if UNLIMITED in (limit, self._limit):
+            return True
+        return abs(limit - self._limit) / self._limit >= MINIMUM_RELATIVE_CHANGE
+
+
+def _within(current_time: time, start: time, end: time) -> bool:
+    """windows with start > end span midnight, start == end means the whole day"""
+    if start == end:
+        return True
+    if start < end:
+        return start <= current_time < end
+    return current_time >= start or current_time < end
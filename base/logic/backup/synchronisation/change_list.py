@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+from time import time
+from typing import IO, Iterable, List
+
+# Every item of the dry run is printed with a marker and its operation, so that the messages and the --stats of rsync
+# aren't taken for paths. With %o in the format, rsync prints deletions in it as well instead of "deleting %n".
+OUT_FORMAT = "BaSe-item:%o:%n"
+ITEM_MARKER = b"BaSe-item:"
+
+
+@dataclass
+class ChangeList:
+    """The paths (relative to the source) that the dry run of rsync found to be new, changed or deleted. Handed to the
+    actual transfer with --files-from, so the source doesn't have to be scanned a second time."""
+
+    paths: List[bytes]
+    creation_time: float = field(default_factory=time)
+
+    @property
+    def age(self) -> float:
+        return time() - self.creation_time
+
+    def write(self, file: IO[bytes]) -> None:
+        file.writelines(path + b"\n" for path in self.paths)
+
+
+def parse_change_list(lines: Iterable[bytes]) -> ChangeList:
+    """collects the paths of a dry run with --out-format=OUT_FORMAT, e.g.
+    BaSe-item:recv:photos/2021/IMG_0001.jpg
+    BaSe-item:del.:photos/2020/IMG_0815.jpg
+    """
+    paths = []
+    for line in lines:
+        if line.startswith(ITEM_MARKER):
+            _, _, path = line[len(ITEM_MARKER) :].partition(b":")
+            if path:
+                paths.append(path)
+    return ChangeList(paths)
@@ -1,25 +1,112 @@
+import shlex
 from pathlib import Path
+from typing import Optional, Sequence
 
 from base.common.config import get_config
+from base.logic.backup.synchronisation.change_list import OUT_FORMAT
+from base.logic.backup.synchronisation.transport_profile import TransportProfile
 
 
 class RsyncCommand:
-    def __init__(self) -> None:
+    def __init__(self, transport_profile: Optional[TransportProfile] = None, multiplexing: bool = True) -> None:
+        """
+        :param transport_profile:   overrides the persisted profile, e.g. to try a candidate while tuning
+        :param multiplexing:        False opens a connection of its own instead of reusing the master's, whose cipher
+                                    has been negotiated already
+        """
         self._sync_config = get_config("sync.json")
         self._nas_config = get_config("nas.json")
+        self._transport_profile = transport_profile
+        self._multiplexing = multiplexing
 
-    def compose(self, local_target_location: Path, source_location: Path, dry: bool = False) -> str:
-        cmd = "rsync -avH --outbuf=N --info=progress2 --stats --delete"  # stats are important for the bu increment size
+    def compose(
+        self,
+        local_target_location: Path,
+        source_location: Path,
+        dry: bool = False,
+        link_dest: Optional[Path] = None,
+        exclude: Sequence[str] = (),
+        files_from: Optional[Path] = None,
+        bwlimit: int = 0,
+    ) -> str:
+        cmd = "rsync -avH --outbuf=N --info=progress2 --stats"  # stats are important for the bu increment size
+        cmd += " " + self._delete(files_from)
+        cmd += " " + self._link_dest(link_dest)
+        cmd += " " + self._partial_dir(dry)
+        cmd += " " + self._bwlimit(bwlimit)
+        cmd += " " + self._transport()
+        cmd += " " + self._exclude(exclude)
         cmd += " " + self._protocol_specific(local_target_location, source_location)
         cmd += " " + self._dry_run(dry)
         return cmd
 
+    def compose_list_directory(self, source_location: Path) -> str:
+        """lists the content of the source location without descending into its subdirectories"""
+        return f"rsync --list-only {self._source_with_remote_shell(source_location)}/"
+
     def _protocol_specific(self, local_target_location: Path, source_location: Path) -> str:
+        return f"{self._source_with_remote_shell(source_location)}/. {local_target_location}"
+
+    def _source_with_remote_shell(self, source_location: Path) -> str:
         if self._sync_config.protocol == "smb":
-            return f"{source_location.as_posix()}/. {local_target_location}"
+            return source_location.as_posix()
         else:
-            return f'-e "ssh -i {self._sync_config.ssh_keyfile_path}" {self._nas_config.ssh_user}@{self._nas_config.ssh_host}:{source_location.as_posix()}/. {local_target_location}'
+            return f'-e "ssh -i {self._sync_config.ssh_keyfile_path}{self._ssh_multiplexing()}{self._profile().ssh_options()}" {self._nas_config.ssh_user}@{self._nas_config.ssh_host}:{source_location.as_posix()}'
+
+    def _profile(self) -> TransportProfile:
+        """The profile found by the TransportTuner. It only applies to ssh, an smb share is copied locally."""
+        if self._transport_profile is None:
+            if self._sync_config.protocol == "ssh" and self._sync_config.transport_profile:
+                self._transport_profile = TransportProfile.load(self._sync_config.transport_profile)
+            else:
+                self._transport_profile = TransportProfile()
+        return self._transport_profile
+
+    def _transport(self) -> str:
+        return self._profile().rsync_options()
+
+    def _ssh_multiplexing(self) -> str:
+        """The first ssh started by rsync (usually the one of the dry run) becomes the master and stays in the background
+        for ssh_control_persist seconds. All later ones reuse its connection through the socket at ssh_control_path,
+        so there is a single handshake per backup."""
+        if not self._multiplexing:
+            return " -o ControlPath=none"
+        if not self._sync_config.ssh_control_path:
+            return ""
+        return (
+            f" -o ControlMaster=auto -o ControlPath={self._sync_config.ssh_control_path}"
+            f" -o ControlPersist={self._sync_config.ssh_control_persist}"
+        )
 
     @staticmethod
     def _dry_run(dry: bool) -> str:
-        return "--dry-run" if dry else ""
+        """lists the path of every item, so the output can be reused as change list (see parse_change_list)"""
+        return f"--dry-run --out-format={OUT_FORMAT}" if dry else ""
+
+    @staticmethod
+    def _delete(files_from: Optional[Path]) -> str:
+        """--delete needs a recursive transfer. When only the paths of a change list are transferred, the deleted ones
+        are in the list as well and are removed by --delete-missing-args"""
+        if files_from is None:
+            return "--delete"
+        return f"--files-from={shlex.quote(files_from.as_posix())} --delete-missing-args"
+
+    def _partial_dir(self, dry: bool) -> str:
+        """Keeps partially transferred files, so that an interrupted transfer of a large file is resumed. A relative
+        partial dir is protected from --delete by rsync itself."""
+        if dry or not self._sync_config.partial_dir:
+            return ""
+        return f"--partial-dir={shlex.quote(self._sync_config.partial_dir)}"
+
+    @staticmethod
+    def _bwlimit(bwlimit: int) -> str:
+        """in KiB/s, 0 means unlimited"""
+        return f"--bwlimit={bwlimit}" if bwlimit > 0 else ""
+
+    @staticmethod
+    def _link_dest(link_dest: Optional[Path]) -> str:
+        return f"--link-dest={link_dest.absolute()}" if link_dest is not None else ""
+
+    @staticmethod
+    def _exclude(exclude: Sequence[str]) -> str:
+        return " ".join(f"--exclude={shlex.quote(pattern)}" for pattern in exclude)
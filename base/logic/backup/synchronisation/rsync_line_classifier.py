@@ -0,0 +1,54 @@
+import re
+from enum import Enum
+from typing import AnyStr, Callable, Dict, Generic, Match, Optional, Pattern, Set, Tuple
+
+from base.logic.backup.synchronisation.rsync_patterns import Patterns
+
+
+class LineType(Enum):
+    IGNORED = "ignored"
+    FILE_STATS = "file_stats"
+    END_STATS_A = "end_stats_a"
+    END_STATS_B = "end_stats_b"
+    STATS_ENTRY = "stats_entry"
+    DIR_NOT_FOUND = "dir_not_found"
+    PATH = "path"
+
+
+class RsyncLineClassifier(Generic[AnyStr]):
+    """Classifies lines of rsync output in a single pass.
+
+    The patterns of all line types are combined into one alternation, so every line is matched exactly once and the
+    regex engine rejects the alternatives that don't fit at their first characters. Works on str as well as on undecoded
+    bytes.
+    """
+
+    def __init__(self, encode: Callable[[str], AnyStr]) -> None:
+        self._ignored: Set[AnyStr] = {
+            encode("receiving incremental file list"),
+            encode("sending incremental file list"),
+        }
+        alternatives = [
+            (Patterns.file_stats, LineType.FILE_STATS),
+            (Patterns.end_stats_a, LineType.END_STATS_A),
+            (Patterns.end_stats_b, LineType.END_STATS_B),
+            (Patterns.stats_entry, LineType.STATS_ENTRY),
+            (Patterns.dir_not_found, LineType.DIR_NOT_FOUND),
+            (Patterns.path, LineType.PATH),
+        ]
+        self._pattern: Pattern[AnyStr] = re.compile(
+            encode("|".join(f"(?P<{line_type.value}>{pattern.pattern})" for pattern, line_type in alternatives))
+        )
+        self._line_types: Dict[Optional[str], LineType] = {line_type.value: line_type for _, line_type in alternatives}
+
+    def classify(self, line: AnyStr) -> Tuple[LineType, Optional[Match[AnyStr]]]:
+        if not line or line in self._ignored:
+            return LineType.IGNORED, None
+        match = self._pattern.fullmatch(line)
+        if match is None:  # e.g. a path containing a null character
+            return LineType.IGNORED, None
+        return self._line_types[match.lastgroup], match
+
+
+str_classifier: RsyncLineClassifier[str] = RsyncLineClassifier(str)
+bytes_classifier: RsyncLineClassifier[bytes] = RsyncLineClassifier(str.encode)
@@ -6,16 +6,23 @@ class Patterns:
     _number = r"\d{1,3}(,\d{3})*"
     _decimal = _number + r"\.\d{2}"
     _percentage = r"([0-9]|[1-9][0-9]|100)%"
-    _speed = r"\d{1,3}\.\d{2}(k|M|G|T)?B/s"
-    _time = r"\d+:\d{2}:\d{2}"
-    _rest = r"(\s+\(xfr#\d+,\sto-chk=\d+/\d+\))?"
+    _speed = r"(?P<speed>\d+\.\d{2})(?P<unit>k|M|G|T)?B/s"
+    _time = r"(?P<hours>\d+):(?P<minutes>\d{2}):(?P<seconds>\d{2})"
+    _rest = r"(\s+\(xfr#(?P<transferred>\d+),\s(ir|to)-chk=(?P<remaining>\d+)/\d+\))?"
     _path = r"[^\0]+"
 
     path = re.compile(_path)
-    file_stats = re.compile(_spaces + _number + _spaces + _percentage + _spaces + _speed + _spaces + _time + _rest)
+    file_stats = re.compile(
+        f"{_spaces}(?P<bytes>{_number}){_spaces}(?P<percentage>{_percentage}){_spaces}{_speed}{_spaces}{_time}{_rest}"
+    )
     percentage = re.compile(_percentage)
     end_stats_a = re.compile(
-        r"sent " + _number + r" bytes {2}received " + _number + r" bytes {2}" + _decimal + r" bytes/sec"
+        f"sent {_number} bytes  received {_number} bytes  (?P<bytes_per_second>{_decimal}) bytes/sec"
+    )
+    end_stats_b = re.compile(f"total size is {_number}  speedup is (?P<speedup>{_decimal})")
+    stats_entry = re.compile(
+        r"(?P<key>Number of files|Number of created files|Number of deleted files|Number of regular files transferred"
+        r"|Total file size|Total transferred file size|Literal data|Matched data|Total bytes sent|Total bytes received)"
+        r": (?P<value>" + _number + r")( bytes)?( \(.*\))?"
     )
-    end_stats_b = re.compile(r"total size is " + _number + r" {2}speedup is " + _decimal)
-    dir_not_found = re.compile(r'rsync: link_stat "' + _path + r'" failed: No such file or directory (2)')
+    dir_not_found = re.compile(r'rsync: (\[\w+\] )?link_stat "' + _path + r'" failed: No such file or directory \(2\)')
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+import shlex
+import signal
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
+from pathlib import Path
+from queue import Empty, Queue
+from subprocess import PIPE, Popen, run
+from threading import Lock, Thread
+from types import TracebackType
+from typing import Dict, Generator, List, Optional, Tuple, Type
+
+from base.common.logger import LoggerFactory
+from base.logic.backup.synchronisation.bandwidth_controller import BandwidthController
+from base.logic.backup.synchronisation.rsync_command import RsyncCommand
+from base.logic.backup.synchronisation.sync import RSYNC_SUCCESS_CODES, Sync, parse_line_to_status, read_lines
+from base.logic.backup.synchronisation.sync_status import SyncStatus, SyncSummary
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+@dataclass
+class Shard:
+    source: Path
+    target: Path
+    link_dest: Optional[Path] = None
+    exclude: List[str] = field(default_factory=list)
+
+
+class ShardedSync(Sync):
+    """Synchronises every top-level directory of the source with its own rsync process. A pool of workers runs
+    "sync_workers" of these processes at a time. Everything else on the top level (files and directories that cannot be
+    sharded) is synchronised by a root shard that excludes the sharded directories.
+
+    --delete works as with a single process: Each shard deletes within its directory, the root shard deletes on the top
+    level. Excluded directories are protected from deletion by the root shard, directories that vanished from the source
+    are not excluded and therefore get deleted.
+    Note: hardlinks between files in different shards are not preserved. The change list of the dry run isn't used,
+    every shard scans its part of the source. The bandwidth limit at the start is split evenly between the workers and
+    isn't adjusted during the synchronisation.
+    """
+
+    def __init__(self, local_target_location: Path, source_location: Path) -> None:
+        super().__init__(local_target_location, source_location)
+        self._processes: List[Popen] = []
+        self._processes_lock = Lock()
+        self._terminated = False
+        self._workers: List[Thread] = []
+        self._status_queue: Queue[Tuple[int, SyncStatus, bool]] = Queue()
+
+    def __enter__(self) -> Generator[SyncStatus, None, None]:
+        self._bandwidth = BandwidthController(self._sync_config, self._hardware_readings)
+        shards = self._shards()
+        LOG.debug(f"syncing {len(shards)} shards with {self._sync_config.sync_workers} workers")
+        shard_queue: Queue[Tuple[int, Shard]] = Queue()
+        for index, shard in enumerate(shards):
+            shard_queue.put((index, shard))
+        for _ in range(min(self._sync_config.sync_workers, len(shards))):
+            worker = Thread(target=self._work_on, args=(shard_queue,), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self._aggregated_output_generator(len(shards))
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        exc_traceback: Optional[TracebackType],
+    ) -> None:
+        for worker in self._workers:
+            worker.join()
+
+    def _shards(self) -> List[Shard]:
+        directories = [
+            directory for directory in self._list_top_level_directories() if shlex.quote(directory) == directory
+        ]
+        root_shard = Shard(
+            source=self._source,
+            target=self._target,
+            link_dest=self._link_dest,
+            exclude=[f"/{directory}/" for directory in directories],
+        )
+        return [root_shard] + [
+            Shard(
+                source=self._source / directory,
+                target=self._target / directory,
+                link_dest=self._link_dest / directory if self._link_dest is not None else None,
+            )
+            for directory in directories
+        ]
+
+    def _list_top_level_directories(self) -> List[str]:
+        command = RsyncCommand().compose_list_directory(self._source)
+        LOG.debug(f"listing top level directories with: {command}")
+        process = run(command, shell=True, stdout=PIPE, stderr=PIPE)
+        if process.returncode != 0:
+            error = process.stderr.decode(errors="replace").strip()
+            LOG.warning(f"cannot list source directory, syncing without shards: {error}")
+            return []
+        return parse_directory_listing([os.fsdecode(line) for line in process.stdout.splitlines()])
+
+    def _work_on(self, shard_queue: Queue[Tuple[int, Shard]]) -> None:
+        """every shard ends with a finished status, otherwise the output generator would wait for it forever"""
+        while True:
+            try:
+                index, shard = shard_queue.get_nowait()
+            except Empty:
+                return
+            status = SyncStatus()
+            try:
+                status = self._sync_shard(index, shard)
+            except Exception as e:
+                LOG.error(f"syncing shard {index} ({shard.source}) failed: {e}")
+                status.error = True
+            finally:
+                status.finished = True
+                self._status_queue.put((index, status, True))
+
+    def _sync_shard(self, index: int, shard: Shard) -> SyncStatus:
+        command = self._command_for(shard)
+        status = SyncStatus()
+        with self._processes_lock:
+            if self._terminated:
+                return status
+            LOG.debug(f"syncing shard {index} with command: {command}")
+            process = self._start_process(command)
+            self._processes.append(process)
+        assert process.stdout is not None
+        for line in read_lines(process.stdout):
+            status = parse_line_to_status(line, status)
+            self._status_queue.put((index, replace(status), False))
+        process.wait()
+        if process.returncode not in RSYNC_SUCCESS_CODES:
+            LOG.error(f"rsync of shard {index} ({shard.source}) exited with code {process.returncode}")
+            status.error = True
+        return status
+
+    def _command_for(self, shard: Shard) -> str:
+        limit = self._bandwidth.limit if self._bandwidth is not None else 0
+        bwlimit = max(limit // self._sync_config.sync_workers, 1) if limit else 0
+        return RsyncCommand().compose(
+            shard.target, shard.source, link_dest=shard.link_dest, exclude=shard.exclude, bwlimit=bwlimit
+        )
+
+    def _aggregated_output_generator(self, amount_shards: int) -> Generator[SyncStatus, None, None]:
+        shard_states: Dict[int, SyncStatus] = {}
+        finished_shards = 0
+        while finished_shards < amount_shards:
+            index, shard_status, shard_finished = self._status_queue.get()
+            shard_states[index] = shard_status
+            finished_shards += shard_finished
+            self._status = aggregate_status(shard_states, shard_status.path, amount_shards, finished_shards)
+            yield self._status
+
+    def terminate(self) -> None:
+        with self._processes_lock:
+            self._terminated = True
+            for process in self._processes:
+                LOG.debug(f"terminating process ID {process.pid}")
+                try:
+                    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    @property
+    def pid(self) -> int:
+        """of the first rsync process
+
+        :raises RuntimeError: if no shard has been started yet
+        """
+        with self._processes_lock:
+            if not self._processes:
+                raise RuntimeError("no rsync process has been started yet")
+            return self._processes[0].pid
+
+
+def aggregate_status(
+    shard_states: Dict[int, SyncStatus], current_path: Path, amount_shards: int, finished_shards: int
+) -> SyncStatus:
+    states = shard_states.values()
+    summaries = [status.summary for status in states if status.summary is not None]
+    return SyncStatus(
+        path=current_path,
+        progress=sum(1.0 if status.finished else status.progress for status in states) / amount_shards,
+        finished=finished_shards == amount_shards,
+        error=any(status.error for status in states),
+        bytes_transferred=sum(status.bytes_transferred for status in states),
+        bytes_per_second=sum(status.bytes_per_second for status in states if not status.finished),
+        average_bytes_per_second=sum(status.average_bytes_per_second for status in states),
+        files_transferred=sum(status.files_transferred for status in states),
+        files_remaining=sum(status.files_remaining for status in states),
+        eta=max((status.eta for status in states), default=timedelta()),
+        summary=sum(summaries, SyncSummary()) if summaries else None,
+    )
+
+
+def parse_directory_listing(lines: List[str]) -> List[str]:
+    """extracts the directory names from the output of 'rsync --list-only', e.g.
+    drwxr-xr-x          4,096 2022/01/15 12:00:00 some directory
+    """
+    directories = []
+    for line in lines:
+        fields = line.split(maxsplit=4)
+        if len(fields) == 5 and fields[0].startswith("d") and fields[4] != ".":
+            directories.append(fields[4])
+    return directories
@@ -3,19 +3,34 @@ from __future__ import annotations
 import os
 import re
 import signal
+from datetime import timedelta
 from pathlib import Path
+from selectors import EVENT_READ, DefaultSelector
 from subprocess import PIPE, STDOUT, Popen
+from tempfile import NamedTemporaryFile
+from time import time
 from types import TracebackType
-from typing import Generator, List, Optional, Type
+from typing import IO, Callable, Generator, List, Match, Optional, Type, Union
 
 from base.common.config import get_config
 from base.common.logger import LoggerFactory
+from base.logic.backup.synchronisation.bandwidth_controller import BandwidthController, HardwareReadings
+from base.logic.backup.synchronisation.change_list import ChangeList
 from base.logic.backup.synchronisation.rsync_command import RsyncCommand
-from base.logic.backup.synchronisation.rsync_patterns import Patterns
-from base.logic.backup.synchronisation.sync_status import SyncStatus
+from base.logic.backup.synchronisation.rsync_line_classifier import LineType, bytes_classifier, str_classifier
+from base.logic.backup.synchronisation.sync_status import SyncStatus, SyncSummary
 
 LOG = LoggerFactory.get_logger(__name__)
 
+READ_CHUNK_SIZE = 64 * 1024
+# rsync terminates progress lines with a carriage return. A "\r" at the very end of the buffer is kept, since it might
+# be the first half of a "\r\n" that is split between two chunks.
+LINE_END = re.compile(rb"\r\n|\r(?!\Z)|\n")
+# 24: some source files vanished during the transfer
+RSYNC_SUCCESS_CODES = (0, 24)
+# rsync prints transfer rates in binary units
+SPEED_UNITS = {"k": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
 
 class Sync:
     def __init__(self, local_target_location: Path, source_location: Path) -> None:
@@ -25,27 +40,69 @@ class Sync:
         self._status: SyncStatus = SyncStatus()
         self._source = source_location
         self._target = local_target_location
+        self._link_dest: Optional[Path] = None
+        self._change_list: Optional[ChangeList] = None
+        self._files_from: Optional[Path] = None
+        self._terminated = False
+        self._hardware_readings: Optional[Callable[[], HardwareReadings]] = None
+        self._bandwidth: Optional[BandwidthController] = None
 
     def update_target(self, new_target: Path) -> None:
         self._target = new_target
 
+    def update_link_dest(self, link_dest: Optional[Path]) -> None:
+        self._link_dest = link_dest
+
+    def update_change_list(self, change_list: Optional[ChangeList]) -> None:
+        self._change_list = change_list
+
+    def update_hardware_readings(self, hardware_readings: Optional[Callable[[], HardwareReadings]]) -> None:
+        self._hardware_readings = hardware_readings
+
     def __enter__(self) -> Generator[SyncStatus, None, None]:
+        self._bandwidth = BandwidthController(self._sync_config, self._hardware_readings)
+        self._files_from = self._write_change_list()
         rsync_command: str = self._get_command()
         LOG.debug(f"syncing with command: {rsync_command}")
         # Fixme: we're having an outdated version of "target" here ...
-        self._process = Popen(
+        self._process = self._start_process(rsync_command)
+        return self._output_generator()
+
+    @staticmethod
+    def _start_process(rsync_command: str) -> Popen:
+        return Popen(
             rsync_command,
             bufsize=0,
-            universal_newlines=True,
             stdout=PIPE,
             stderr=STDOUT,
             shell=True,
             preexec_fn=os.setsid,
         )
-        return self._output_generator()
 
     def _get_command(self) -> str:
-        return RsyncCommand().compose(self._target, self._source)
+        return RsyncCommand().compose(
+            self._target,
+            self._source,
+            link_dest=self._link_dest,
+            files_from=self._files_from,
+            bwlimit=self._bandwidth.limit if self._bandwidth is not None else 0,
+        )
+
+    def _write_change_list(self) -> Optional[Path]:
+        if self._change_list is None:
+            return None
+        if self._change_list.age > self._sync_config.change_list_max_age:
+            LOG.info(f"change list is {self._change_list.age:.0f}s old, scanning the whole source instead")
+            return None
+        with NamedTemporaryFile(prefix="base_change_list_", delete=False) as file:
+            self._change_list.write(file)
+        LOG.info(f"transferring the {len(self._change_list.paths)} paths of the change list in {file.name}")
+        return Path(file.name)
+
+    def _remove_change_list(self) -> None:
+        if self._files_from is not None:
+            self._files_from.unlink(missing_ok=True)
+            self._files_from = None
 
     def __exit__(
         self,
@@ -55,56 +112,148 @@ class Sync:
     ) -> None:
         if isinstance(self._process, Popen):
             self._process.wait()  # Fixme: put timeout of "1" back in?
+            self._stop_process()  # what is left of its process group, without marking the sync as terminated
+        self._remove_change_list()
+
+    def _output_generator(self) -> Generator[SyncStatus, None, None]:
+        yield from self._transfer()
+        if self._files_from is not None and not self._succeeded():
+            # e.g. the source changed in a way the change list can't express since the dry run
+            LOG.warning("transfer of the change list failed, falling back to scanning the whole source")
+            self._remove_change_list()
+            self._status = SyncStatus()
+            self._process = self._start_process(self._get_command())
+            yield from self._transfer()
+
+    def _transfer(self) -> Generator[SyncStatus, None, None]:
+        """rsync cannot change its --bwlimit while running, so it is restarted with the new limit. Thanks to the
+        partial dir and the files transferred so far, it continues where it has been stopped."""
+        while (yield from self._process_output()) and not self._terminated:
+            assert self._bandwidth is not None
+            LOG.info(f"restarting the synchronisation with a bandwidth limit of {self._bandwidth.limit} KiB/s")
+            self._process = self._start_process(self._get_command())
+
+    def _process_output(self) -> Generator[SyncStatus, None, bool]:
+        """:return: whether rsync has been stopped to apply a new bandwidth limit"""
+        assert isinstance(self._process, Popen)
+        assert self._process.stdout is not None
+        for line in read_lines(self._process.stdout):
+            self._status = parse_line_to_status(line, self._status)
+            yield self._status
+            if self._bandwidth_changed():
+                self._stop_process()
+                return True
+        return False
+
+    def _bandwidth_changed(self) -> bool:
+        if self._bandwidth is None or self._status.finished or self._terminated:
+            return False
+        return self._bandwidth.adjust(self._status.bytes_per_second)
+
+    def _stop_process(self) -> None:
+        """stops rsync for a restart or after it has finished, in contrast to terminate()"""
+        assert isinstance(self._process, Popen)
         try:
-            self.terminate()
+            os.killpg(os.getpgid(self._process.pid), signal.SIGTERM)
         except ProcessLookupError:
             pass
+        self._process.wait()
 
-    def _output_generator(self) -> Generator[SyncStatus, None, None]:
+    def _succeeded(self) -> bool:
         assert isinstance(self._process, Popen)
-        while self._process.stdout is not None:
-            line = self._process.stdout.readline()
-            # LOG.debug(f"line: {line}")
-            code = self._process.poll()
-
-            if not line:
-                if code is None:
-                    continue
-                else:
-                    break
-
-            self._status = parse_line_to_status(line.rstrip(), self._status)
-            yield self._status
+        return self._terminated or self._process.wait() in RSYNC_SUCCESS_CODES
 
     def terminate(self) -> None:
+        self._terminated = True
         assert isinstance(self._process, Popen)
         LOG.debug(f"terminating process ID {self._process.pid}")
         os.killpg(os.getpgid(self._process.pid), signal.SIGTERM)
 
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
     @property
     def pid(self) -> int:
         assert isinstance(self._process, Popen)
         return self._process.pid
 
 
-def parse_line_to_status(line: str, status: SyncStatus) -> SyncStatus:
-    if not line:
-        pass
-    elif line == "receiving incremental file list":
-        pass
-    elif re.fullmatch(Patterns.file_stats, line):
-        match = re.search(Patterns.percentage, line)
-        assert isinstance(match, re.Match)
-        status.progress = float(match[0][:-1]) / 100
-    elif re.fullmatch(Patterns.end_stats_a, line):
+def read_lines(stream: IO[bytes], chunk_size: int = READ_CHUNK_SIZE) -> Generator[bytes, None, None]:
+    """yields the lines of a pipe (without trailing whitespace) until the writing end is closed.
+
+    The generator sleeps in select() until data arrives and reads whatever is available in chunks of up to chunk_size
+    bytes, so quiet phases of the transfer don't cost any CPU time.
+    """
+    os.set_blocking(stream.fileno(), False)
+    remainder = b""
+    with DefaultSelector() as selector:
+        selector.register(stream, EVENT_READ)
+        while True:
+            selector.select()
+            try:
+                chunk = os.read(stream.fileno(), chunk_size)
+            except BlockingIOError:
+                continue
+            if not chunk:
+                break
+            *lines, remainder = LINE_END.split(remainder + chunk)
+            for line in lines:
+                yield line.rstrip()
+    if remainder:
+        yield remainder.rstrip()
+
+
+def parse_line_to_status(line: Union[str, bytes], status: SyncStatus) -> SyncStatus:
+    line_type, match = bytes_classifier.classify(line) if isinstance(line, bytes) else str_classifier.classify(line)
+    if line_type == LineType.FILE_STATS:
+        assert match is not None
+        _parse_file_stats(match, status)
+    elif line_type == LineType.STATS_ENTRY:
+        assert match is not None
+        status.summary = status.summary or SyncSummary()
+        setattr(status.summary, _text(match["key"]).lower().replace(" ", "_"), _integer(match["value"]))
+    elif line_type == LineType.END_STATS_A:
+        assert match is not None
         status.path = Path()
-    elif re.fullmatch(Patterns.end_stats_b, line):
+        status.summary = status.summary or SyncSummary()
+        status.summary.bytes_per_second = _decimal(match["bytes_per_second"])
+    elif line_type == LineType.END_STATS_B:
+        assert match is not None
         status.finished = True
-    elif re.fullmatch(Patterns.path, line):
-        status.path = Path(line)
-    elif re.fullmatch(Patterns.dir_not_found, line):
+        status.summary = status.summary or SyncSummary()
+        status.summary.speedup = _decimal(match["speedup"])
+    elif line_type == LineType.PATH:
+        status.path = Path(os.fsdecode(line))
+    elif line_type == LineType.DIR_NOT_FOUND:
         status.finished = True
         status.error = True
-    else:
-        pass
     return status
+
+
+def _parse_file_stats(match: Union[Match[str], Match[bytes]], status: SyncStatus) -> None:
+    """e.g. "      2,080,114  42%   39.13MB/s    0:00:01 (xfr#1, to-chk=119/126)". The time is the estimated time left,
+    once the transfer is complete it's the time the transfer took."""
+    status.progress = float(match["percentage"][:-1]) / 100
+    status.bytes_transferred = _integer(match["bytes"])
+    status.bytes_per_second = float(match["speed"]) * (SPEED_UNITS[_text(match["unit"])] if match["unit"] else 1)
+    elapsed = time() - status.start_time
+    status.average_bytes_per_second = status.bytes_transferred / elapsed if elapsed > 0 else 0.0
+    time_left = timedelta(hours=int(match["hours"]), minutes=int(match["minutes"]), seconds=int(match["seconds"]))
+    status.eta = time_left if status.progress < 1 else timedelta()
+    if match["transferred"] is not None:
+        status.files_transferred = int(match["transferred"])
+        status.files_remaining = int(match["remaining"])
+
+
+def _text(value: Union[str, bytes]) -> str:
+    return os.fsdecode(value)
+
+
+def _integer(value: Union[str, bytes]) -> int:
+    """parses numbers with thousands separators, e.g. 271,491,600"""
+    return int(_text(value).replace(",", ""))
+
+
+def _decimal(value: Union[str, bytes]) -> float:
+    return float(_text(value).replace(",", ""))
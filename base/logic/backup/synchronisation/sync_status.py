@@ -1,5 +1,37 @@
-from dataclasses import dataclass
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+from datetime import timedelta
 from pathlib import Path
+from time import time
+from typing import Optional
+
+
+@dataclass
+class SyncSummary:
+    """the statistics rsync prints at the end of a transfer (--stats)"""
+
+    number_of_files: int = 0
+    number_of_created_files: int = 0
+    number_of_deleted_files: int = 0
+    number_of_regular_files_transferred: int = 0
+    total_file_size: int = 0
+    total_transferred_file_size: int = 0
+    literal_data: int = 0
+    matched_data: int = 0
+    total_bytes_sent: int = 0
+    total_bytes_received: int = 0
+    bytes_per_second: float = 0.0
+    speedup: float = 0.0
+
+    def __add__(self, other: SyncSummary) -> SyncSummary:
+        """combines the summaries of transfers that ran in parallel"""
+        total = SyncSummary(
+            **{summand.name: getattr(self, summand.name) + getattr(other, summand.name) for summand in fields(self)}
+        )
+        total_bytes = total.total_bytes_sent + total.total_bytes_received
+        total.speedup = total.total_file_size / total_bytes if total_bytes else 0.0
+        return total
 
 
 @dataclass
@@ -8,3 +40,11 @@ class SyncStatus:
     progress: float = 0.0
     finished: bool = False
     error: bool = False
+    bytes_transferred: int = 0
+    bytes_per_second: float = 0.0  # as reported by rsync for the last second
+    average_bytes_per_second: float = 0.0
+    files_transferred: int = 0
+    files_remaining: int = 0
+    eta: timedelta = timedelta()
+    summary: Optional[SyncSummary] = None
+    start_time: float = field(default_factory=time, compare=False, repr=False)
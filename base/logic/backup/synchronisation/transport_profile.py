@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from base.common.logger import LoggerFactory
+
+LOG = LoggerFactory.get_logger(__name__)
+
+
+@dataclass
+class TransportProfile:
+    """how rsync talks to the nas over ssh, the defaults are those of ssh and rsync themselves"""
+
+    cipher: str = ""  # ssh -c, e.g. aes128-gcm@openssh.com
+    compress_level: int = 0  # rsync --compress-level, 0 disables the compression
+    compress_choice: str = ""  # rsync --compress-choice, e.g. zstd
+    whole_file: bool = False  # rsync --whole-file, skips the delta algorithm
+    host: Optional[str] = None  # the nas the profile has been tuned against
+    bytes_per_second: Optional[float] = None  # measured by the tuner
+    tuned: Optional[str] = None  # isoformat
+
+    def ssh_options(self) -> str:
+        return f" -c {self.cipher}" if self.cipher else ""
+
+    def rsync_options(self) -> str:
+        options = []
+        if self.compress_level > 0:
+            options.append(f"--compress --compress-level={self.compress_level}")
+            if self.compress_choice:
+                options.append(f"--compress-choice={self.compress_choice}")
+        if self.whole_file:
+            options.append("--whole-file")
+        return " ".join(options)
+
+    def describe(self) -> str:
+        compression = f"{self.compress_choice or 'default'}:{self.compress_level}" if self.compress_level else "off"
+        return f"cipher {self.cipher or 'default'}, compression {compression}, whole file {self.whole_file}"
+
+    @classmethod
+    def load(cls, path: Path) -> TransportProfile:
+        """the defaults if no profile has been tuned yet or the file is invalid"""
+        try:
+            return cls(**json.loads(Path(path).read_text()))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            LOG.warning(f"ignoring the invalid transport profile {path}: {e}")
+        return cls()
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        temporary = path.with_name(path.name + ".tmp")
+        try:
+            temporary.write_text(json.dumps(asdict(self)))
+            os.replace(temporary, path)
+        except OSError as e:
+            LOG.warning(f"cannot write the transport profile {path}: {e}")
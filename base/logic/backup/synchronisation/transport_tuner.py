@@ -0,0 +1,199 @@
+import os
+import shlex
+import shutil
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from subprocess import DEVNULL, PIPE, Popen, TimeoutExpired
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import monotonic
+from typing import Iterable, Optional
+
+from paramiko import SSHException
+
+from base.common.config import Config, get_config
+from base.common.exceptions import RemoteCommandError
+from base.common.logger import LoggerFactory
+from base.common.ssh_interface import SSHInterface
+from base.logic.backup.synchronisation.rsync_command import RsyncCommand
+from base.logic.backup.synchronisation.transport_profile import TransportProfile
+
+LOG = LoggerFactory.get_logger(__name__)
+
+REMOTE_SAMPLE_DIRECTORY = Path("/tmp/base_transport_sample")
+SAMPLE_FILE_NAME = "sample"
+MIB = 1024 * 1024
+# every n-th block of the local copy is changed, so that the delta algorithm has something to find
+CHANGED_BLOCK_INTERVAL = 10
+BLOCK_SIZE = 128 * 1024
+
+
+class TransportTuner:
+    """Finds the fastest way for rsync to transfer data from the nas and persists it as TransportProfile.
+
+    A sample of transport_tuning_sample_mib MiB is cut from the files of the backup source on the nas, so that its
+    compressibility is that of the actual data. The local copy of the sample has every tenth block changed, like a file
+    that has been modified since the last backup. Then the sample is transferred with every candidate in turn: first
+    the ssh ciphers in transport_tuning_ciphers, then the compressions in transport_tuning_compressions (e.g.
+    {"choice": "zstd", "level": 3}), then --whole-file. Each stage keeps the fastest candidate, so the number of
+    transfers grows with the sum instead of the product of the candidates. Candidates that fail, e.g. because ssh or
+    rsync on either side doesn't support them, are skipped.
+    The profile is tuned again every transport_tuning_interval_days days (0 disables the tuning) and whenever the nas
+    changes.
+    """
+
+    def __init__(self, local_directory: Path, source: Path) -> None:
+        """
+        :param local_directory: where the sample is transferred to, should be on the backup hdd
+        :param source: the backup source on the nas
+        """
+        self._sync_config: Config = get_config("sync.json")
+        self._nas_config: Config = get_config("nas.json")
+        self._local_directory = Path(local_directory)
+        self._source = Path(source)
+        self._abort = Event()
+        self._process: Optional[Popen] = None
+
+    @property
+    def profile_file(self) -> Path:
+        return Path(self._sync_config.transport_profile)
+
+    def due(self) -> bool:
+        if not self._sync_config.transport_profile or self._sync_config.transport_tuning_interval_days <= 0:
+            return False
+        profile = TransportProfile.load(self.profile_file)
+        if profile.tuned is None or profile.host != self._nas_config.ssh_host:
+            return True
+        age = datetime.now() - datetime.fromisoformat(profile.tuned)
+        return age > timedelta(days=self._sync_config.transport_tuning_interval_days)
+
+    def tune_if_due(self) -> None:
+        if not self.due():
+            return
+        try:
+            self.tune()
+        except (OSError, RemoteCommandError) as e:
+            LOG.warning(f"tuning the transport failed, keeping the previous profile: {e}")
+
+    def terminate(self) -> None:
+        LOG.info("aborting the tuning of the transport")
+        self._abort.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+
+    def tune(self) -> Optional[TransportProfile]:
+        """:return: the fastest profile, None if the tuning has been aborted or no candidate worked"""
+        LOG.info("tuning the transport to the nas")
+        self._create_remote_sample()
+        try:
+            with TemporaryDirectory(prefix=".transport_tuning_", dir=self._local_directory) as directory:
+                best = self._search(Path(directory))
+        finally:
+            self._remove_remote_sample()
+        if best is None or self._abort.is_set():
+            return None
+        best.host = self._nas_config.ssh_host
+        best.tuned = datetime.now().isoformat()
+        LOG.info(f"fastest transport: {best.describe()} at {best.bytes_per_second:.0f} bytes/s")
+        best.save(self.profile_file)
+        return best
+
+    def _search(self, directory: Path) -> Optional[TransportProfile]:
+        basis = directory / "basis"
+        if self._trial(TransportProfile(), basis) is None:  # also warms up the page cache of the nas
+            return None
+        self._modify(basis / SAMPLE_FILE_NAME)
+        best: Optional[TransportProfile] = None
+        for stage in [self._ciphers, self._compressions, self._whole_file]:
+            fastest = best if best is not None else TransportProfile()
+            for candidate in stage(fastest):
+                if self._abort.is_set():
+                    return None
+                candidate.bytes_per_second = self._trial(candidate, directory / "trial", basis)
+                LOG.info(f"transport candidate {candidate.describe()}: {candidate.bytes_per_second} bytes/s")
+                if candidate.bytes_per_second is not None and (
+                    best is None or best.bytes_per_second is None or candidate.bytes_per_second > best.bytes_per_second
+                ):
+                    best = candidate
+        return best
+
+    def _ciphers(self, profile: TransportProfile) -> Iterable[TransportProfile]:
+        return [replace(profile, cipher=cipher) for cipher in self._sync_config.transport_tuning_ciphers]
+
+    def _compressions(self, profile: TransportProfile) -> Iterable[TransportProfile]:
+        candidates = [replace(profile, compress_level=0, compress_choice="")]
+        for compression in self._sync_config.transport_tuning_compressions:
+            candidates.append(
+                replace(profile, compress_level=int(compression["level"]), compress_choice=compression["choice"])
+            )
+        return candidates
+
+    @staticmethod
+    def _whole_file(profile: TransportProfile) -> Iterable[TransportProfile]:
+        return [replace(profile, whole_file=False), replace(profile, whole_file=True)]
+
+    def _trial(self, profile: TransportProfile, target: Path, basis: Optional[Path] = None) -> Optional[float]:
+        """:return: bytes per second, None if the transfer failed"""
+        shutil.rmtree(target, ignore_errors=True)
+        if basis is not None:
+            shutil.copytree(basis, target, copy_function=shutil.copy2)
+        # a connection of its own, a master of the dry run would ignore the cipher of the candidate
+        command = RsyncCommand(profile, multiplexing=False).compose(target, REMOTE_SAMPLE_DIRECTORY)
+        start = monotonic()
+        if not self._run(command):
+            return None
+        duration = monotonic() - start
+        return (target / SAMPLE_FILE_NAME).stat().st_size / max(duration, 1e-6)
+
+    def _run(self, command: str) -> bool:
+        self._process = Popen(command, stdout=DEVNULL, stderr=PIPE, shell=True, universal_newlines=True)
+        try:
+            _, error = self._process.communicate(timeout=self._sync_config.transport_tuning_trial_timeout)
+        except TimeoutExpired:
+            self._process.kill()
+            self._process.communicate()
+            LOG.debug(f"transport trial timed out: {command}")
+            return False
+        if self._process.returncode != 0:
+            LOG.debug(f"transport trial failed with {self._process.returncode}: {command}: {error.strip()}")
+            return False
+        return True
+
+    @staticmethod
+    def _modify(sample: Path) -> None:
+        """changes every CHANGED_BLOCK_INTERVAL-th block and backdates the file, so that rsync doesn't skip it"""
+        with open(sample, "r+b") as file:
+            size = os.fstat(file.fileno()).st_size
+            for offset in range(0, size, BLOCK_SIZE * CHANGED_BLOCK_INTERVAL):
+                file.seek(offset)
+                block = file.read(BLOCK_SIZE)
+                file.seek(offset)
+                file.write(bytes(byte ^ 0xFF for byte in block))
+        os.utime(sample, (0, 0))
+
+    def _create_remote_sample(self) -> None:
+        sample = shlex.quote((REMOTE_SAMPLE_DIRECTORY / SAMPLE_FILE_NAME).as_posix())
+        size = int(self._sync_config.transport_tuning_sample_mib * MIB)
+        self._run_remotely(
+            f"mkdir -p {shlex.quote(REMOTE_SAMPLE_DIRECTORY.as_posix())} && "
+            f"find {shlex.quote(self._source.as_posix())} -type f -size +0 -print0 2>/dev/null "
+            f"| xargs -0 cat 2>/dev/null | head -c {size} > {sample}"
+        )
+
+    def _remove_remote_sample(self) -> None:
+        try:
+            self._run_remotely(f"rm -rf {shlex.quote(REMOTE_SAMPLE_DIRECTORY.as_posix())}")
+        except RemoteCommandError as e:
+            LOG.warning(f"cannot remove the transport sample from the nas: {e}")
+
+    def _run_remotely(self, command: str) -> None:
+        """:raises RemoteCommandError: if the nas cannot be reached or the command fails"""
+        with SSHInterface() as sshi:
+            response = sshi.connect(self._nas_config.ssh_host, self._nas_config.ssh_user)
+            if response != "Established":
+                raise RemoteCommandError(f"cannot connect to the nas: {response}")
+            try:
+                sshi.run_and_raise(command)
+            except (RuntimeError, SSHException, OSError) as e:
+                raise RemoteCommandError(e) from e
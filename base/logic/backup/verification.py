@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from threading import Event
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from base.common.config import Config, get_config
+from base.common.logger import LoggerFactory
+from base.logic.backup.checksum_manifest import ChecksumManifest, ManifestEntry
+from base.logic.backup.file_hash import RateLimiter, hash_file, regular_files
+
+LOG = LoggerFactory.get_logger(__name__)
+
+CURSOR_FILE_NAME = ".verification_cursor.json"
+MAX_EXAMPLES = 20
+
+
+class VerificationMode(Enum):
+    OFF = "off"
+    MANIFEST = "manifest"  # reread the backup and compare with its checksum manifest
+    SOURCE = "source"  # compare the backup with the source, which has to be mounted locally (smb)
+
+
+@dataclass
+class VerificationResult:
+    mode: str = VerificationMode.OFF.value
+    files_checked: int = 0
+    missing: int = 0
+    mismatched: int = 0
+    extra: int = 0
+    complete: bool = False  # False if aborted or the time budget ran out
+    examples: List[str] = field(default_factory=list)  # e.g. "missing: photos/IMG_0001.jpg"
+
+    @property
+    def ok(self) -> bool:
+        return self.missing == self.mismatched == self.extra == 0
+
+    def add_finding(self, kind: str, path: str) -> None:
+        setattr(self, kind, getattr(self, kind) + 1)
+        if len(self.examples) < MAX_EXAMPLES:
+            self.examples.append(f"{kind}: {path}")
+
+
+class Verification:
+    """Checks a completed backup after the synchronisation, while the backup hdd is still docked.
+
+    Files are reread by a pool of readers (verification_workers) that share a rate limit
+    (verification_bytes_per_second, 0 means unlimited). The verification stops after verification_max_duration
+    seconds (0 means no limit), so it extends the time the backup hdd is awake by a bounded amount only. Files of the
+    source that changed after the synchronisation (different mtime) aren't counted as mismatched.
+
+    Against the manifest, the files hardlinked from the previous backup (whose inodes are in its manifest) are checked
+    first, starting after the path where the previous verification stopped (cursor on the backup hdd), so that a limited
+    time budget rotates through all of them over several backups. The files transferred in this backup follow. They
+    have been hashed for the manifest moments ago, mostly from the page cache, so rereading them reveals little.
+    """
+
+    def __init__(self, backup: Path, local_source: Optional[Path]) -> None:
+        self._config: Config = get_config("backup.json")
+        self._backup = backup
+        self._local_source = local_source
+        self._mode = VerificationMode(self._config.verification)
+        self._rate_limiter = RateLimiter(self._config.verification_bytes_per_second)
+        self._abort = Event()
+        self._deadline: Optional[float] = None
+
+    def terminate(self) -> None:
+        LOG.info("aborting verification")
+        self._abort.set()
+
+    def run(self) -> VerificationResult:
+        if self._config.verification_max_duration > 0:
+            self._deadline = monotonic() + self._config.verification_max_duration
+        mode = self._mode
+        if mode == VerificationMode.SOURCE and self._local_source is None:
+            LOG.warning("the source isn't mounted locally, verifying against the checksum manifest instead")
+            mode = VerificationMode.MANIFEST
+        result = VerificationResult(mode=mode.value)
+        try:
+            if mode == VerificationMode.MANIFEST:
+                self._verify_against_manifest(result)
+            elif mode == VerificationMode.SOURCE:
+                assert self._local_source is not None
+                self._verify_against_source(self._local_source, result)
+        except OSError as e:
+            LOG.error(f"verification of {self._backup} failed: {e}")
+            result.complete = False
+        message = (
+            f"verification of {self._backup} against the {result.mode}: {result.files_checked} files checked, "
+            f"{result.missing} missing, {result.mismatched} mismatched, {result.extra} extra"
+            f"{'' if result.complete else ' (incomplete)'}"
+        )
+        if result.ok:
+            LOG.info(message)
+        else:
+            LOG.warning(message)
+        return result
+
+    @property
+    def cursor_file(self) -> Path:
+        return self._backup.parent / CURSOR_FILE_NAME
+
+    def _verify_against_manifest(self, result: VerificationResult) -> None:
+        manifest = ChecksumManifest(self._backup.parent)
+        expected: Dict[str, ManifestEntry] = {entry.path: entry for entry in manifest.entries(self._backup)}
+        present = _relative_paths(self._backup)
+        common = self._compare_trees(set(expected), present, result)
+        unchanged, transferred = self._split_unchanged(common, expected, manifest.previous_manifest_of(self._backup))
+        unchanged = _rotated(unchanged, self._load_cursor())
+
+        def matches(path: str) -> bool:
+            entry = expected[path]
+            file = self._backup / path
+            return os.lstat(file).st_size == entry.size and hash_file(file, self._rate_limiter) == entry.digest
+
+        self._check(unchanged + transferred, matches, result)
+        checked_unchanged = min(result.files_checked, len(unchanged))
+        if checked_unchanged > 0:
+            self._save_cursor(unchanged[checked_unchanged - 1])
+
+    @staticmethod
+    def _split_unchanged(
+        paths: List[str], expected: Dict[str, ManifestEntry], previous_manifest: Optional[Path]
+    ) -> Tuple[List[str], List[str]]:
+        """:return: the paths hardlinked from the previous backup and the ones transferred in this backup. Without the
+        previous manifest, all paths count as hardlinked, so the cursor rotates through all of them."""
+        if previous_manifest is None:
+            return paths, []
+        try:
+            with gzip.open(previous_manifest, "rt") as file:
+                previous_inodes = {ManifestEntry.from_json(line).inode for line in file}
+        except (OSError, ValueError, KeyError) as e:
+            LOG.warning(f"cannot read the previous manifest {previous_manifest}: {e}")
+            return paths, []
+        unchanged = [path for path in paths if expected[path].inode in previous_inodes]
+        transferred = [path for path in paths if expected[path].inode not in previous_inodes]
+        return unchanged, transferred
+
+    def _load_cursor(self) -> Optional[str]:
+        """:return: the last path checked by the previous verification"""
+        try:
+            return str(json.loads(self.cursor_file.read_text())["path"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            LOG.warning(f"verification cursor {self.cursor_file} is corrupt, starting over: {e}")
+            return None
+
+    def _save_cursor(self, path: str) -> None:
+        temporary = self.cursor_file.with_name(CURSOR_FILE_NAME + ".tmp")
+        try:
+            temporary.write_text(json.dumps({"path": path}))
+            os.replace(temporary, self.cursor_file)
+        except OSError as e:
+            LOG.warning(f"cannot write the verification cursor {self.cursor_file}: {e}")
+
+    def _verify_against_source(self, source: Path, result: VerificationResult) -> None:
+        common = self._compare_trees(_relative_paths(source), _relative_paths(self._backup), result)
+
+        def matches(path: str) -> bool:
+            source_stat = os.lstat(source / path)
+            backup_stat = os.lstat(self._backup / path)
+            if source_stat.st_mtime_ns != backup_stat.st_mtime_ns:
+                return True  # changed after the synchronisation
+            if source_stat.st_size != backup_stat.st_size:
+                return False
+            digest = hash_file(self._backup / path, self._rate_limiter)
+            return digest is not None and digest == hash_file(source / path, self._rate_limiter)
+
+        self._check(common, matches, result)
+
+    @staticmethod
+    def _compare_trees(expected: Set[str], present: Set[str], result: VerificationResult) -> List[str]:
+        for path in sorted(expected - present):
+            result.add_finding("missing", path)
+        for path in sorted(present - expected):
+            result.add_finding("extra", path)
+        return sorted(expected & present)
+
+    def _check(self, paths: List[str], matches: Callable[[str], bool], result: VerificationResult) -> None:
+        def check(path: str) -> bool:
+            try:
+                return matches(path)
+            except OSError:
+                return False
+
+        batch_size = 16 * self._config.verification_workers
+        with ThreadPoolExecutor(max_workers=self._config.verification_workers) as executor:
+            for start in range(0, len(paths), batch_size):
+                if self._abort.is_set() or (self._deadline is not None and monotonic() > self._deadline):
+                    LOG.warning(f"verification stopped after {result.files_checked} of {len(paths)} files")
+                    return
+                batch = paths[start : start + batch_size]
+                for path, ok in zip(batch, executor.map(check, batch)):
+                    result.files_checked += 1
+                    if not ok:
+                        result.add_finding("mismatched", path)
+        result.complete = True
+
+
+def _rotated(paths: List[str], cursor: Optional[str]) -> List[str]:
+    """the sorted paths starting after the cursor and wrapping around"""
+    if cursor is None:
+        return paths
+    start = next((index for index, path in enumerate(paths) if path > cursor), 0)
+    return paths[start:] + paths[:start]
+
+
+def _relative_paths(directory: Path) -> Set[str]:
+    return {os.fsdecode(path.relative_to(directory)) for path in regular_files(directory)}
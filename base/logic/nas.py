@@ -1,24 +1,95 @@
+import json
+import os
 from configparser import ConfigParser, ParsingError
 from pathlib import Path
+from typing import Dict, Optional
+
+from paramiko import SSHException
 
 from base.common.config import get_config
-from base.common.exceptions import NasSmbConfError
+from base.common.exceptions import NasSmbConfError, RemoteCommandError
+from base.common.logger import LoggerFactory
 from base.common.ssh_interface import SSHInterface
 
+LOG = LoggerFactory.get_logger(__name__)
+
+SMB_CONF = "/etc/samba/smb.conf"
+
 
 class Nas:
     def __init__(self) -> None:
         self._config = get_config("nas.json")
 
     def root_of_share(self, share_name: str = "Backup") -> Path:
+        """The roots of all shares are cached on the sd card (share_root_cache) along with the modification time and
+        size of smb.conf. As long as these don't change, smb.conf isn't downloaded again."""
         with SSHInterface() as sshi:
             sshi.connect(self._config.ssh_host, self._config.ssh_user)
-            smb_conf = self._get_smb_conf(sshi)
-            return self._extract_root_of_share(smb_conf, share_name)
+            signature = self._smb_conf_signature(sshi)
+            share_roots = self._cached_share_roots(signature)
+            if share_roots is None:
+                share_roots = self._share_roots(self._get_smb_conf(sshi))
+                self._cache_share_roots(signature, share_roots)
+        return self._extract_root_of_share(share_roots, share_name)
+
+    def load(self) -> float:
+        """load average of the last minute divided by the number of cores
+
+        :raises RemoteCommandError: if the load cannot be determined
+        """
+        with SSHInterface() as sshi:
+            response = sshi.connect(self._config.ssh_host, self._config.ssh_user)
+            if response != "Established":
+                raise RemoteCommandError(f"cannot connect to the nas: {response}")
+            try:
+                output = sshi.run_and_raise("cat /proc/loadavg && nproc")
+            except (RuntimeError, SSHException, OSError) as e:
+                raise RemoteCommandError(e) from e
+        try:
+            load_average, *_, cores = output.split()
+            return float(load_average) / int(cores)
+        except ValueError as e:
+            raise RemoteCommandError(f"unexpected output of the nas: {output}") from e
+
+    @staticmethod
+    def _smb_conf_signature(sshi: SSHInterface) -> Optional[str]:
+        """modification time and size of smb.conf, None if it cannot be determined"""
+        try:
+            return sshi.run_and_raise(f"stat -c '%Y %s' {SMB_CONF}").strip() or None
+        except (RuntimeError, SSHException) as e:
+            LOG.debug(f"cannot stat {SMB_CONF}: {e}")
+            return None
+
+    def _cached_share_roots(self, signature: Optional[str]) -> Optional[Dict[str, str]]:
+        if signature is None:
+            return None
+        try:
+            with open(self._config.share_root_cache, "r") as file:
+                cache = json.load(file)
+            if cache["host"] == self._config.ssh_host and cache["signature"] == signature:
+                return dict(cache["share_roots"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            LOG.warning(f"ignoring the invalid share root cache {self._config.share_root_cache}: {e}")
+        return None
+
+    def _cache_share_roots(self, signature: Optional[str], share_roots: Dict[str, str]) -> None:
+        if signature is None:
+            return
+        cache = Path(self._config.share_root_cache)
+        temporary = cache.with_name(cache.name + ".tmp")
+        try:
+            temporary.write_text(
+                json.dumps({"host": self._config.ssh_host, "signature": signature, "share_roots": share_roots})
+            )
+            os.replace(temporary, cache)
+        except OSError as e:
+            LOG.warning(f"cannot write the share root cache {cache}: {e}")
 
     def _get_smb_conf(self, sshi: SSHInterface) -> ConfigParser:
         try:
-            smb_conf_str = sshi.run_and_raise(f"cat /etc/samba/smb.conf")
+            smb_conf_str = sshi.run_and_raise(f"cat {SMB_CONF}")
         except RuntimeError as e:
             raise NasSmbConfError from e
 
@@ -34,8 +105,12 @@ class Nas:
         return parser
 
     @staticmethod
-    def _extract_root_of_share(smb_conf: ConfigParser, share_name: str) -> Path:
+    def _share_roots(smb_conf: ConfigParser) -> Dict[str, str]:
+        return {name: section["path"] for name, section in smb_conf.items() if "path" in section}
+
+    @staticmethod
+    def _extract_root_of_share(share_roots: Dict[str, str], share_name: str) -> Path:
         try:
-            return Path(smb_conf[share_name]["path"])
+            return Path(share_roots[share_name])
         except KeyError as e:
             raise NasSmbConfError("/etc/samba/smb.conf on NAS does not seem to exist. Is samba installed?") from e
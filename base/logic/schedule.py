@@ -15,6 +15,7 @@ class Schedule:
     valid_days_of_week = set(range(7))
     shutdown_request = Signal()
     backup_request = Signal()
+    scrub_request = Signal()
 
     def __init__(self) -> None:
         self._scheduler: sched.scheduler = sched.scheduler(time, sleep)
@@ -23,6 +24,7 @@ class Schedule:
         self._backup_job: Optional[sched.Event] = None
         self._postponed_backup_job: Optional[sched.Event] = None
         self._shutdown_job: Optional[sched.Event] = None
+        self._scrub_job: Optional[sched.Event] = None
 
     @property
     def queue(self) -> List:
@@ -45,6 +47,16 @@ class Schedule:
         LOG.info(f"Scheduled next backup on {tc.next_backup_timestring(self._schedule)}")
         self._backup_job = self._scheduler.enterabs(due, 2, self._invoke_backup)
 
+    def on_schedule_scrub(self, **kwargs):  # type: ignore
+        """requests a scrub session every scrub_interval_minutes, a value of 0 turns scrubbing off"""
+        interval = self._config.scrub_interval_minutes * 60
+        if interval > 0 and (self._scrub_job is None or self._scrub_job not in self._scheduler.queue):
+            self._scrub_job = self._scheduler.enter(interval, 3, self._invoke_scrub)
+
+    def _invoke_scrub(self) -> None:
+        self.scrub_request.emit()
+        self.on_schedule_scrub()
+
     def on_postpone_backup(self, seconds, **kwargs):  # type: ignore
         LOG.info(f"Backup shall be postponed by {seconds} seconds")
         if self._postponed_backup_job is None or self._postponed_backup_job not in self._scheduler.queue:
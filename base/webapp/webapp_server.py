@@ -67,7 +67,7 @@ class WebappServer(Thread):
                 # Todo: äöü etc are displayed strangely
                 self.display_text.emit(text=payload)
             elif message.startswith("backup_index"):
-                await websocket.send(json.dumps(BackupBrowser().index))
+                await websocket.send(json.dumps(BackupBrowser(from_sd_copy=True).index_with_sizes))
             elif message.startswith("logfile_index"):
                 await websocket.send(json.dumps(list_logfiles(newest_first=True)))
             elif message.startswith("request_logfile"):
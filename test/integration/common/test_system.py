@@ -25,12 +25,32 @@ def test_obtain_size_of_next_backup_increment_smb(temp_source_sink_dirs: Tuple[P
     assert size_of_next_increment == bytesize_of_each_file * (amount_files_in_src - amount_preexisting_files_in_sink)
 
 
+def test_transfer_change_list_of_dry_run_smb(temp_source_sink_dirs: Tuple[Path, Path], tmp_path: Path) -> None:
+    patch_multiple_configs(RsyncCommand, {"sync.json": {"protocol": "smb"}, "nas.json": {}})
+    src, sink = temp_source_sink_dirs
+    prepare_source_sink_dirs(
+        src, sink, amount_files_in_src=3, bytesize_of_each_file=1024, amount_preexisting_files_in_sink=1
+    )
+    (sink / "deleted_in_source").touch()
+    _, change_list = System.dry_run_next_backup(source_location=Path(src), local_target_location=Path(sink))
+    files_from = tmp_path / "change_list"
+    with open(files_from, "wb") as file:
+        change_list.write(file)
+    Popen(RsyncCommand().compose(sink, src, files_from=files_from), shell=True).wait()
+    assert {file.name for file in sink.iterdir()} == {file.name for file in src.iterdir()}
+
+
 def test_obtain_size_of_next_backup_increment_ssh(temp_source_sink_dirs: Tuple[Path, Path]) -> None:
     user = getuser()
     patch_multiple_configs(
         RsyncCommand,
         {
-            "sync.json": {"ssh_keyfile_path": f"/home/{user}/.ssh/id_rsa", "protocol": "ssh"},
+            "sync.json": {
+                "ssh_keyfile_path": f"/home/{user}/.ssh/id_rsa",
+                "protocol": "ssh",
+                "ssh_control_path": "",
+                "transport_profile": "",
+            },
             "nas.json": {"ssh_host": "127.0.0.1", "ssh_user": user},
         },
     )
@@ -45,14 +65,12 @@ def test_obtain_size_of_next_backup_increment_ssh(temp_source_sink_dirs: Tuple[P
             amount_files_in_src - amount_preexisting_files_in_sink
         )
     except AssertionError as e:
-        print(
-            f"""!!! This test needs preparation !!!
+        print(f"""!!! This test needs preparation !!!
 Make sure the following applies to your machine:
 - rsync is installed
 - you ran 'ssh-copy-id -i ~/.ssh/id_rsa.pub {user}>@127.0.0.1'
   - you can test this by running 'ssh {user}@127.0.0.1' You shouldn't be asked for password and see your own commandline afterwards
-"""
-        )
+""")
         raise e
 
 
@@ -67,19 +85,6 @@ def test_get_bytesize_of_directories(temp_source_sink_dirs: Tuple[Path, Path]) -
     assert sizes[src] == size_overhead_by_directory_structure + bytesize_of_each_file * amount_files_in_src
 
 
-@pytest.mark.parametrize("amount_preexisting_files_in_sink", [0, 1, 2])
-def test_cp_newst_bu_hardlinks(temp_source_sink_dirs: Tuple[Path, Path], amount_preexisting_files_in_sink: int) -> None:
-    src, sink = temp_source_sink_dirs
-    bytesize_of_each_file = 1024
-    amount_files_in_src = 2
-    prepare_source_sink_dirs(src, sink, amount_files_in_src, bytesize_of_each_file, amount_preexisting_files_in_sink)
-    System.copy_newest_backup_with_hardlinks(recent_backup=src, new_backup=sink)
-    size_overhead_by_directory_struct = 4096
-    sizes = get_bytesize_of_directories(src.parent)
-    assert sizes[src] == size_overhead_by_directory_struct + amount_files_in_src * bytesize_of_each_file
-    assert sizes[sink] == size_overhead_by_directory_struct + amount_preexisting_files_in_sink * bytesize_of_each_file
-
-
 def get_bytesize_of_directories(directory: Path) -> Dict[Path, int]:
     # this function is not used in the production code, but necessary for testing.
     # It has some complexity and therefore has to be tested like any function production code.
@@ -32,6 +32,7 @@ from base.hardware.sbu.uart_finder import get_sbu_uart_interface
 from base.logic.backup.backup import Backup
 from base.logic.backup.backup_browser import BackupBrowser
 from base.logic.backup.backup_conductor import BackupConductor
+from base.logic.backup.backup_preparator import BackupPreparator
 from base.logic.backup.protocol import Protocol
 from base.logic.backup.source import BackupSource
 from base.logic.backup.synchronisation.rsync_command import RsyncCommand
@@ -63,6 +64,7 @@ def patch_configs_for_backup_conductor_tests(backup_env: BackupTestEnvironmentOu
     patch_config(Nas, backup_env.nas_config)
     patch_multiple_configs(NetworkShare, {"sync.json": backup_env.sync_config, "nas.json": backup_env.nas_config})
     patch_config(BackupBrowser, backup_env.sync_config)
+    patch_config(BackupPreparator, backup_env.sync_config)
 
 
 @pytest.mark.parametrize("protocol", [Protocol.SSH, Protocol.SMB])
@@ -7,7 +7,7 @@ from test.utils.backup_environment.virtual_backup_environment import (
     temp_source_sink_dirs,
 )
 from test.utils.patch_config import patch_config, patch_multiple_configs
-from typing import Generator, Tuple
+from typing import Generator, Optional, Tuple
 
 import pytest
 
@@ -20,6 +20,7 @@ from base.logic.backup.protocol import Protocol
 class Backup:
     source: Path = Path()
     target: Path = Path()
+    link_dest: Optional[Path] = None
 
     def set_process_step(self, process_step: BackupProcessStep) -> None:
         new_name = self.target.with_suffix(process_step.suffix)
@@ -68,6 +69,7 @@ def test_backup_preparator(protocol: Protocol) -> None:
             {"nas.json": backup_env_configs.nas_config, "sync.json": backup_env_configs.sync_config},
         )
         patch_config(base.logic.backup.backup_browser.BackupBrowser, backup_env_configs.sync_config)
+        patch_config(BackupPreparator, backup_env_configs.sync_config)
         backup = Backup()
         backup.source = virtual_backup_env.source
         backup.target = Path(backup_env_configs.sync_config["local_backup_target_location"]) / "new_backup"
@@ -96,6 +98,7 @@ def test_backup_preparator_with_deletion_of_old_bu(protocol: Protocol) -> None:
             {"nas.json": backup_env.nas_config, "sync.json": backup_env.sync_config},
         )
         patch_config(base.logic.backup.backup_browser.BackupBrowser, backup_env.sync_config)
+        patch_config(BackupPreparator, backup_env.sync_config)
         backup = Backup()
         backup.source = virtual_backup_env.source
         backup.target = Path(backup_env.sync_config["local_backup_target_location"]) / "new_backup"
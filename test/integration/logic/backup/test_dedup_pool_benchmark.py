@@ -0,0 +1,68 @@
+from pathlib import Path
+from test.integration.logic.backup.test_snapshot_strategy_benchmark import patch_configs, run_backup
+from test.utils.backup_environment.virtual_backup_environment import (
+    BackupTestEnvironment,
+    BackupTestEnvironmentInput,
+    prepare_source_sink_dirs,
+)
+from test.utils.patch_config import patch_config
+from time import time
+
+import pytest
+
+from base.common.disk_space import DiskSpace
+from base.logic.backup.dedup_pool import DedupPool
+from base.logic.backup.protocol import Protocol
+
+"""Measures the space an incremental backup takes after a directory with AMOUNT_MOVED_FILES has been renamed in the
+source, with and without the deduplication pool. Runs on the structure provided by virtual_backup_environment.py"""
+
+AMOUNT_MOVED_FILES = 100
+BYTESIZE_OF_EACH_FILE = 64 * 1024
+
+
+def used_bytes_after_move(protocol: Protocol, use_dedup_pool: bool) -> int:
+    backup_environment_configuration = BackupTestEnvironmentInput(
+        protocol=protocol,
+        amount_files_in_source=0,
+        bytesize_of_each_sourcefile=0,
+        use_virtual_drive_for_sink=True,
+        amount_old_backups=0,
+        bytesize_of_each_old_backup=0,
+    )
+    with BackupTestEnvironment(backup_environment_configuration) as virtual_backup_env:
+        backup_env = virtual_backup_env.create()
+        patch_configs(backup_env)
+        patch_config(DedupPool, {"dedup_pool_workers": 2, "dedup_pool_min_file_size": 1024})
+        sink = Path(backup_env.sync_config["local_backup_target_location"])
+        photos = virtual_backup_env.source / "photos"
+        photos.mkdir()
+        prepare_source_sink_dirs(
+            src=photos, sink=sink, amount_files_in_src=AMOUNT_MOVED_FILES, bytesize_of_each_file=BYTESIZE_OF_EACH_FILE
+        )
+        initial_backup = run_backup(virtual_backup_env.source, sink / "backup_2022_01_16-12_00_00")
+        if use_dedup_pool:
+            DedupPool(sink).deduplicate(initial_backup.target)
+        photos.rename(virtual_backup_env.source / "pictures")
+        DiskSpace.invalidate()
+        used_before = DiskSpace.usage(sink).used_bytes
+        incremental_backup = run_backup(virtual_backup_env.source, sink / "backup_2022_01_17-12_00_00")
+        if use_dedup_pool:
+            time_start = time()
+            status = DedupPool(sink).deduplicate(incremental_backup.target)
+            print(f"deduplicated {status.files_hashed} files in {time() - time_start:.3f}s: {status}")
+            assert status.files_linked == AMOUNT_MOVED_FILES
+        DiskSpace.invalidate()
+        return DiskSpace.usage(sink).used_bytes - used_before
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("protocol", [Protocol.SSH, Protocol.SMB])
+def test_benchmark_dedup_pool(protocol: Protocol) -> None:
+    without_pool = used_bytes_after_move(protocol, use_dedup_pool=False)
+    with_pool = used_bytes_after_move(protocol, use_dedup_pool=True)
+    print(
+        f"{protocol.value}: renaming a directory of {AMOUNT_MOVED_FILES * BYTESIZE_OF_EACH_FILE} bytes costs "
+        f"{without_pool} bytes without and {with_pool} bytes with the deduplication pool"
+    )
+    assert with_pool < AMOUNT_MOVED_FILES * BYTESIZE_OF_EACH_FILE <= without_pool
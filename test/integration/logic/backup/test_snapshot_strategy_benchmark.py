@@ -0,0 +1,115 @@
+import os
+from pathlib import Path
+from test.utils.backup_environment.virtual_backup_environment import (
+    BackupTestEnvironment,
+    BackupTestEnvironmentInput,
+    BackupTestEnvironmentOutput,
+    prepare_source_sink_dirs,
+)
+from test.utils.patch_config import patch_config, patch_multiple_configs
+from time import time
+from typing import Dict, Optional
+
+import pytest
+
+import base.logic.backup.synchronisation.rsync_command
+from base.common.constants import BackupDirectorySuffix, BackupProcessStep
+from base.logic.backup.backup_browser import BackupBrowser
+from base.logic.backup.backup_preparator import BackupPreparator
+from base.logic.backup.hardlink_snapshot import HardlinkSnapshot
+from base.logic.backup.protocol import Protocol
+from base.logic.backup.snapshot_strategy import SnapshotStrategy
+from base.logic.backup.synchronisation.change_list import ChangeList
+from base.logic.backup.synchronisation.sync import Sync
+
+"""Compares the two-pass flow (hardlink copy of the newest backup + rsync) with the single-pass flow (rsync with
+--link-dest) on an incremental backup. Both run on the structure provided by virtual_backup_environment.py"""
+
+AMOUNT_FILES_IN_SOURCE = 1000
+AMOUNT_CHANGED_FILES = 10
+
+
+class Backup:
+    source: Path = Path()
+    target: Path = Path()
+    link_dest: Optional[Path] = None
+    change_list: Optional[ChangeList] = None
+    estimated_backup_size: int = 0
+
+    def set_process_step(self, process_step: BackupProcessStep) -> None:
+        new_name = self.target.with_suffix(process_step.suffix)
+        self.target = self.target.rename(new_name)
+
+
+def patch_configs(backup_env: BackupTestEnvironmentOutput) -> None:
+    patch_multiple_configs(
+        base.logic.backup.synchronisation.rsync_command.RsyncCommand,
+        {"nas.json": backup_env.nas_config, "sync.json": backup_env.sync_config},
+    )
+    patch_multiple_configs(Sync, {"nas.json": backup_env.nas_config, "sync.json": backup_env.sync_config})
+    patch_config(BackupBrowser, backup_env.sync_config)
+    patch_config(BackupPreparator, backup_env.sync_config)
+    patch_config(HardlinkSnapshot, {"hardlink_snapshot_workers": 4, "hardlink_snapshot_report_interval": 10})
+
+
+def run_backup(source: Path, target: Path) -> Backup:
+    backup = Backup()
+    backup.source = source
+    backup.target = target.with_suffix(BackupDirectorySuffix.while_copying.suffix)
+    BackupPreparator(backup=backup).prepare()  # type: ignore
+    sync = Sync(backup.target, backup.source)
+    sync.update_link_dest(backup.link_dest)
+    sync.update_change_list(backup.change_list)
+    with sync as output_generator:
+        for _ in output_generator:
+            pass
+    backup.set_process_step(BackupDirectorySuffix.finished)
+    return backup
+
+
+def timed_incremental_backup(protocol: Protocol, snapshot_strategy: SnapshotStrategy) -> float:
+    backup_environment_configuration = BackupTestEnvironmentInput(
+        protocol=protocol,
+        amount_files_in_source=AMOUNT_FILES_IN_SOURCE,
+        bytesize_of_each_sourcefile=1024,
+        use_virtual_drive_for_sink=True,
+        amount_old_backups=0,
+        bytesize_of_each_old_backup=0,
+        snapshot_strategy=snapshot_strategy,
+    )
+    with BackupTestEnvironment(backup_environment_configuration) as virtual_backup_env:
+        backup_env = virtual_backup_env.create()
+        patch_configs(backup_env)
+        sink = Path(backup_env.sync_config["local_backup_target_location"])
+        initial_backup = run_backup(virtual_backup_env.source, sink / "backup_2022_01_16-12_00_00")
+        prepare_source_sink_dirs(
+            src=virtual_backup_env.source,
+            sink=sink,
+            amount_files_in_src=AMOUNT_CHANGED_FILES,
+            filename_prefix="changed",
+        )
+        time_start = time()
+        incremental_backup = run_backup(virtual_backup_env.source, sink / "backup_2022_01_17-12_00_00")
+        duration = time() - time_start
+        files_in_source = {file.name for file in virtual_backup_env.source.iterdir()}
+        assert {file.name for file in incremental_backup.target.iterdir()} == files_in_source
+        assert (
+            os.stat(incremental_backup.target / "testfile0").st_ino
+            == os.stat(initial_backup.target / "testfile0").st_ino
+        )
+        assert os.stat(incremental_backup.target / "changed0").st_nlink == 1
+    return duration
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("protocol", [Protocol.SSH, Protocol.SMB])
+def test_benchmark_snapshot_strategies(protocol: Protocol) -> None:
+    durations: Dict[SnapshotStrategy, float] = {
+        snapshot_strategy: timed_incremental_backup(protocol, snapshot_strategy)
+        for snapshot_strategy in SnapshotStrategy
+    }
+    for snapshot_strategy, duration in durations.items():
+        print(
+            f"{protocol.value}, {snapshot_strategy.value}: {duration:.3f}s for an increment of {AMOUNT_CHANGED_FILES} "
+            f"files on top of {AMOUNT_FILES_IN_SOURCE} files"
+        )
@@ -14,8 +14,10 @@ from base.common.exceptions import ConfigValidationError
 @pytest.fixture()
 def config_path(tmpdir: path.local) -> Generator[Path, None, None]:
     config_path = Path(tmpdir)
+    base_path = BoundConfig.base_path
     BoundConfig.set_config_base_path(config_path)
     yield config_path
+    BoundConfig.set_config_base_path(base_path)
 
 
 def write_test_file(content: Dict[str, Any], file_path: Path) -> None:
@@ -149,3 +151,11 @@ def test_bound_config_reload_all(config_path: Path, mocker: MockFixture) -> None
     BoundConfig.reload_all()
     assert patched_reload.call_count == len(configs)
     assert patched_validate.call_count == len(configs)
+
+
+def test_bound_config_is_shared(config_path: Path) -> None:
+    config_file_name = "test_json"
+    write_test_file(content={"key": "value"}, file_path=config_path / config_file_name)
+    config = BoundConfig(config_file_name)
+    assert BoundConfig(config_file_name) is config
+    assert config.key == "value"
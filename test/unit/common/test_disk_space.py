@@ -0,0 +1,70 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.common.disk_space import DiskSpace, DiskUsage
+from base.common.exceptions import BackupSizeRetrievalError
+from base.common.system import System
+
+
+@pytest.fixture(autouse=True)
+def empty_cache() -> Generator[None, None, None]:
+    DiskSpace.invalidate()
+    yield
+    DiskSpace.invalidate()
+
+
+STATVFS = os.statvfs_result((4096, 4096, 1000, 300, 250, 500, 100, 90, 0, 255))
+
+
+def test_usage(tmp_path: Path, mocker: MockFixture) -> None:
+    mocker.patch("os.statvfs", return_value=STATVFS)
+    assert DiskSpace.usage(tmp_path) == DiskUsage(
+        total_bytes=1000 * 4096, free_bytes=250 * 4096, used_bytes=700 * 4096, free_inodes=90
+    )
+    assert DiskSpace.usage(tmp_path).percent_used == 74
+
+
+def test_usage_of_real_file_system(tmp_path: Path) -> None:
+    usage = DiskSpace.usage(tmp_path)
+    assert usage.total_bytes == shutil.disk_usage(tmp_path).total
+    assert 0 <= usage.percent_used <= 100
+
+
+@pytest.mark.parametrize(
+    "used_bytes, free_bytes, percent_used", [(0, 100, 0), (50, 50, 50), (1, 199, 1), (100, 0, 100), (0, 0, 0)]
+)
+def test_percent_used(used_bytes: int, free_bytes: int, percent_used: int) -> None:
+    assert DiskUsage(200, free_bytes, used_bytes, 0).percent_used == percent_used
+
+
+def test_usage_is_cached(tmp_path: Path, mocker: MockFixture) -> None:
+    statvfs = mocker.spy(os, "statvfs")
+    DiskSpace.usage(tmp_path)
+    DiskSpace.usage(tmp_path)
+    assert statvfs.call_count == 1
+    DiskSpace.invalidate()
+    DiskSpace.usage(tmp_path)
+    assert statvfs.call_count == 2
+
+
+def test_cache_expires(tmp_path: Path, mocker: MockFixture) -> None:
+    mocker.patch.object(DiskSpace, "ttl", 0)
+    statvfs = mocker.spy(os, "statvfs")
+    DiskSpace.usage(tmp_path)
+    DiskSpace.usage(tmp_path)
+    assert statvfs.call_count == 2
+
+
+def test_free_space(tmp_path: Path, mocker: MockFixture) -> None:
+    mocker.patch("os.statvfs", return_value=STATVFS)
+    assert System.free_space(tmp_path) == 250 * 4096
+
+
+def test_free_space_of_inaccessible_path(tmp_path: Path) -> None:
+    with pytest.raises(BackupSizeRetrievalError):
+        System.free_space(tmp_path / "does_not_exist")
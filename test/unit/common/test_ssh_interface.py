@@ -0,0 +1,52 @@
+from typing import Generator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.common.ssh_interface import SSHInterface
+
+
+@pytest.fixture
+def transport(mocker: MockFixture) -> Generator[MagicMock, None, None]:
+    transport = MagicMock()
+    transport.is_active.return_value = True
+    mocker.patch("paramiko.SSHClient.get_transport", return_value=transport)
+    yield transport
+    SSHInterface.close_all()
+
+
+def test_connection_is_reused(mocker: MockFixture, transport: MagicMock) -> None:
+    mocked_connect = mocker.patch("paramiko.SSHClient.connect")
+    mocked_close = mocker.patch("paramiko.SSHClient.close")
+    for _ in range(3):
+        with SSHInterface() as sshi:
+            assert sshi.connect("host", "user") == "Established"
+    assert mocked_connect.call_count == 1
+    assert mocked_close.call_count == 0
+    transport.set_keepalive.assert_called_once()
+    with SSHInterface() as sshi:
+        sshi.connect("other_host", "user")
+    assert mocked_connect.call_count == 2
+    SSHInterface.close_all()
+    assert mocked_close.call_count == 2
+
+
+def test_lost_connection_is_replaced(mocker: MockFixture, transport: MagicMock) -> None:
+    mocked_connect = mocker.patch("paramiko.SSHClient.connect")
+    mocker.patch("paramiko.SSHClient.close")
+    with SSHInterface() as sshi:
+        sshi.connect("host", "user")
+    transport.is_active.return_value = False
+    with SSHInterface() as sshi:
+        sshi.connect("host", "user")
+    assert mocked_connect.call_count == 2
+
+
+def test_failed_connection_is_not_pooled(mocker: MockFixture, transport: MagicMock) -> None:
+    mocker.patch("paramiko.SSHClient.connect", side_effect=TimeoutError("timed out"))
+    mocked_close = mocker.patch("paramiko.SSHClient.close")
+    with SSHInterface() as sshi:
+        assert sshi.connect("host", "user") != "Established"
+    assert mocked_close.call_count == 1
+    assert SSHInterface._pool == {}
@@ -13,10 +13,6 @@ def test_size_of_next_backup_increment() -> None:
     ...
 
 
-def test_copy_newest_backup_with_hardlinks() -> None:
-    ...
-
-
 @pytest.mark.parametrize(
     "str_in_stderr, exception, log_message",
     [
@@ -0,0 +1,144 @@
+import sys
+from importlib import import_module
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from typing import Generator, Optional, Set
+
+import pytest
+from pytest_mock import MockFixture
+
+sys.modules["RPi"] = import_module("test.fake_libs.RPi_mock")
+
+from base.common.constants import BAUD_RATE
+from base.common.exceptions import SbuNoResponseError
+from base.hardware.sbu.baud_rate import load_baud_rate, negotiate_baud_rate, save_baud_rate
+from base.hardware.sbu.commands import SbuCommands
+from base.hardware.sbu.message import SbuMessage
+from base.hardware.sbu.serial_interface import SerialInterface
+from base.hardware.sbu.session import SbuSession
+
+CANDIDATES = [115200, 57600, 38400, 19200]
+
+
+class FakeBaudRateSbu:
+    """the SerialInterface to an SBU that switches to the rates in supported, but can't keep up with the ones in
+    unreliable and returns to the previous rate. Without supported, it doesn't know the BD message at all."""
+
+    def __init__(
+        self,
+        sbu_baud_rate: int = BAUD_RATE,
+        supported: Optional[Set[int]] = None,
+        unreliable: Optional[Set[int]] = None,
+    ) -> None:
+        self.sbu_baud_rate = sbu_baud_rate
+        self.baud_rate = BAUD_RATE
+        self._supported = supported
+        self._unreliable = unreliable or set()
+
+    def connect(self, port: Path, baud_rate: int) -> "FakeBaudRateSbu":
+        self.baud_rate = baud_rate
+        return self
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def write_to_sbu(self, message: SbuMessage) -> None:
+        if not self.echo():
+            raise SbuNoResponseError(f"waiting for ACK:{message.code} timed out")
+
+    def echo(self) -> bool:
+        return self.baud_rate == self.sbu_baud_rate
+
+    def change_baud_rate(self, baud_rate: int) -> None:
+        self.baud_rate = baud_rate
+
+    def propose_baud_rate(self, baud_rate: int) -> bool:
+        if self._supported is None or not self.echo():
+            raise SbuNoResponseError("waiting for ACK:BD timed out")
+        accepted = baud_rate in self._supported
+        if accepted and baud_rate not in self._unreliable:
+            self.sbu_baud_rate = baud_rate
+        return accepted
+
+
+@pytest.mark.parametrize(
+    "sbu, expected",
+    [
+        (FakeBaudRateSbu(supported={115200, 57600}), 115200),
+        (FakeBaudRateSbu(supported={57600, 19200}), 57600),
+        (FakeBaudRateSbu(supported={115200, 57600}, unreliable={115200}), 57600),
+        (FakeBaudRateSbu(supported=set()), BAUD_RATE),
+        (FakeBaudRateSbu(), BAUD_RATE),
+    ],
+)
+def test_negotiate_baud_rate(sbu: FakeBaudRateSbu, expected: int) -> None:
+    assert negotiate_baud_rate(sbu, CANDIDATES) == expected  # type: ignore
+    assert sbu.baud_rate == sbu.sbu_baud_rate == expected
+
+
+def test_load_and_save_baud_rate(tmp_path: Path) -> None:
+    baud_rate_file = tmp_path / "sbu_baud_rate.json"
+    assert load_baud_rate(baud_rate_file) == BAUD_RATE
+    save_baud_rate(baud_rate_file, 57600)
+    assert load_baud_rate(baud_rate_file) == 57600
+    baud_rate_file.write_text("{")
+    assert load_baud_rate(baud_rate_file) == BAUD_RATE
+
+
+@pytest.mark.parametrize(
+    "response, accepted", [("BD:115200", True), ("BD:0", False), ("BD:57600", False), ("BD:1152000", False)]
+)
+def test_propose_baud_rate(mocker: MockFixture, response: str, accepted: bool) -> None:
+    mocker.patch("base.hardware.sbu.serial_interface.SerialInterface.__init__", return_value=None)
+    patched_query = mocker.patch(
+        "base.hardware.sbu.serial_interface.SerialInterface.query_from_sbu", return_value=response
+    )
+    assert SerialInterface(Path()).propose_baud_rate(115200) == accepted
+    assert patched_query.call_args.kwargs["message"].binary == b"BD:115200\n"
+
+
+@pytest.fixture
+def baud_rate_file(tmp_path: Path) -> Generator[Path, None, None]:
+    baud_rate_file = tmp_path / "sbu_baud_rate.json"
+    patch_config(
+        SbuSession,
+        {
+            "session_idle_timeout": 0,
+            "binary_framing": False,
+            "binary_framing_window": 1,
+            "baud_rate_negotiation": True,
+            "baud_rates": CANDIDATES,
+            "baud_rate_file": str(baud_rate_file),
+            "wait_for_channel_free_timeout": 1,
+            "serial_connection_timeout": 1,
+            "sbu_response_timeout": 1,
+        },
+    )
+    yield baud_rate_file
+
+
+def request(sbu: FakeBaudRateSbu, mocker: MockFixture) -> SbuSession:
+    mocker.patch("base.hardware.sbu.session.SerialInterface", side_effect=sbu.connect)
+    sbu_session = SbuSession(port=Path("/dev/ttyS1"))
+    sbu_session.start()
+    try:
+        sbu_session.submit(SbuMessage(SbuCommands.write_to_display_line1, "hello")).result(1)
+    finally:
+        sbu_session.close(timeout=1)
+    return sbu_session
+
+
+def test_session_persists_the_negotiated_baud_rate(baud_rate_file: Path, mocker: MockFixture) -> None:
+    sbu = FakeBaudRateSbu(supported={57600})
+    assert request(sbu, mocker).baud_rate == 57600
+    assert load_baud_rate(baud_rate_file) == 57600
+    assert request(sbu, mocker).baud_rate == 57600  # after a reboot of the BaSe
+
+
+def test_session_falls_back_if_the_sbu_has_been_reset(baud_rate_file: Path, mocker: MockFixture) -> None:
+    save_baud_rate(baud_rate_file, 115200)
+    assert request(FakeBaudRateSbu(), mocker).baud_rate == BAUD_RATE
+    assert load_baud_rate(baud_rate_file) == BAUD_RATE
@@ -0,0 +1,28 @@
+import pytest
+
+from base.hardware.sbu.framing import MAX_PAYLOAD_LENGTH, Frame, FrameDecoder
+
+
+def test_round_trip() -> None:
+    frames = [Frame(sequence=0, payload=b"D1:Hello"), Frame(sequence=255, payload=b""), Frame(1, b"CC:1234", flags=1)]
+    assert FrameDecoder().feed(b"".join(frame.encode() for frame in frames)) == frames
+
+
+def test_frames_split_across_reads() -> None:
+    decoder = FrameDecoder()
+    encoded = Frame(sequence=7, payload=b"3V:1008").encode()
+    assert decoder.feed(encoded[:3]) == []
+    assert decoder.feed(encoded[3:-1]) == []
+    assert decoder.feed(encoded[-1:]) == [Frame(sequence=7, payload=b"3V:1008")]
+
+
+def test_garbage_and_corrupt_frames_are_skipped() -> None:
+    corrupt = bytearray(Frame(sequence=1, payload=b"TP:25").encode())
+    corrupt[-3] ^= 0xFF
+    valid = Frame(sequence=2, payload=b"TP:26")
+    assert FrameDecoder().feed(b"\0Ready\n" + bytes(corrupt) + valid.encode()) == [valid]
+
+
+def test_payload_too_long() -> None:
+    with pytest.raises(ValueError):
+        Frame(sequence=0, payload=b"x" * (MAX_PAYLOAD_LENGTH + 1)).encode()
@@ -2,6 +2,7 @@ import logging
 import sys
 from importlib import import_module
 from pathlib import Path
+from test.utils.patch_config import patch_config
 from typing import Optional, Type, Union
 
 import pytest
@@ -16,6 +17,23 @@ from base.common.exceptions import ComponentOffError, SbuCommunicationTimeout, S
 from base.hardware.sbu.commands import SbuCommands
 from base.hardware.sbu.communicator import SbuCommunicator
 from base.hardware.sbu.serial_interface import SerialInterface
+from base.hardware.sbu.session import SbuSession
+
+
+def patch_session_config() -> None:
+    patch_config(
+        SbuSession,
+        {
+            "session_idle_timeout": 0,
+            "binary_framing": False,
+            "binary_framing_window": 1,
+            "baud_rate_negotiation": False,
+            "baud_rate_file": "",
+            "wait_for_channel_free_timeout": 1,
+            "serial_connection_timeout": 1,
+            "sbu_response_timeout": 1,
+        },
+    )
 
 
 @pytest.mark.parametrize(
@@ -59,6 +77,7 @@ def test_write(
 
     # the following mocks the SerialInterface context manager
     SerialInterface._config = Config({"wait_for_channel_free_timeout": 1, "serial_connection_timeout": 1})
+    patch_session_config()
     mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._wait_for_channel_free")
     mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._connect_serial_communication_path")
     mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._establish_serial_connection_or_raise")
@@ -100,6 +119,7 @@ def test_query(
 
     # the following mocks the SerialInterface context manager
     SerialInterface._config = Config({"wait_for_channel_free_timeout": 1, "serial_connection_timeout": 1})
+    patch_session_config()
     mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._wait_for_channel_free")
     mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._connect_serial_communication_path")
     mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._establish_serial_connection_or_raise")
@@ -114,3 +134,17 @@ def test_query(
         response_from_sbu = SbuCommunicator().query(command, payload)
         assert response_from_sbu == response
     assert patched_query_from_sbu.call_count == 1
+
+
+def test_session_is_shared(mocker: MockFixture) -> None:
+    mocker.patch("base.hardware.sbu.communicator.SbuCommunicator._get_uart_interface", return_value=Path())
+    SbuCommunicator.close_session()
+    patched_session = mocker.patch("base.hardware.sbu.communicator.SbuSession")
+    patched_session.return_value.closed = False
+    assert SbuCommunicator()._get_session() is SbuCommunicator()._get_session()
+    assert patched_session.call_count == 1
+    SbuCommunicator.close_session()
+    patched_session.return_value.close.assert_called_once()
+    SbuCommunicator()._get_session()
+    assert patched_session.call_count == 2
+    SbuCommunicator.close_session()
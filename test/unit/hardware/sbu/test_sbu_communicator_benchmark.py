@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from statistics import median
+from test.unit.hardware.sbu.test_virtual_sbu import configure
+from test.utils.virtual_sbu import VirtualSbu, VirtualSbuTiming
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.hardware.sbu.commands import SbuCommand, SbuCommands
+from base.hardware.sbu.communicator import SbuCommunicator
+
+"""Measures the latency per command and the throughput of concurrent requests of the SbuCommunicator, the SbuSession
+and the SerialInterface talking to the VirtualSbu, which transfers the bytes as slowly as the UART would."""
+
+REPETITIONS = 10
+THREADS = 4
+REQUESTS_PER_THREAD = 10
+FIRMWARE_TIMING = VirtualSbuTiming(acknowledge_delay=0.0005, response_delay=0.001, ready_delay=0.0005)
+
+COMMANDS: List[Tuple[SbuCommand, str, bool]] = [  # command, payload, query
+    (SbuCommands.test, "", True),
+    (SbuCommands.measure_current, "", True),
+    (SbuCommands.measure_temperature, "", True),
+    (SbuCommands.request_wakeup_reason, "", True),
+    (SbuCommands.set_seconds_to_next_bu, "3200", True),
+    (SbuCommands.write_to_display_line1, "benchmark", False),
+]
+
+CONFIGURATIONS: Dict[str, Dict[str, Any]] = {
+    "text, 9600 baud": {"binary_framing": False},
+    "binary, 9600 baud": {"binary_framing": True},
+    "binary, negotiated baud rate": {"binary_framing": True, "baud_rate_negotiation": True},
+}
+
+
+def request(communicator: SbuCommunicator, command: SbuCommand, payload: str, query: bool) -> None:
+    if query:
+        communicator.query(command, payload)
+    else:
+        communicator.write(command, payload)
+
+
+def latencies(communicator: SbuCommunicator) -> Dict[str, float]:
+    """:return: the median latency in seconds per message code"""
+    results = {}
+    for command, payload, query in COMMANDS:
+        durations = []
+        for _ in range(REPETITIONS):
+            time_start = perf_counter()
+            request(communicator, command, payload, query)
+            durations.append(perf_counter() - time_start)
+        results[command.message_code] = median(durations)
+    return results
+
+
+def throughput(communicator: SbuCommunicator) -> float:
+    """:return: requests per second, with THREADS callers at once"""
+
+    def measure() -> None:
+        for _ in range(REQUESTS_PER_THREAD):
+            communicator.query(SbuCommands.measure_current)
+
+    time_start = perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        for future in [executor.submit(measure) for _ in range(THREADS)]:
+            future.result()
+    return THREADS * REQUESTS_PER_THREAD / (perf_counter() - time_start)
+
+
+def benchmark(
+    configuration: Dict[str, Any], baud_rate_file: Path, mocker: MockFixture
+) -> Tuple[Dict[str, float], float]:
+    configure(baud_rate_file=str(baud_rate_file), **configuration)
+    with VirtualSbu(timing=FIRMWARE_TIMING, baud_rates=[115200, 57600, 19200]) as virtual_sbu:
+        mocker.patch.object(SbuCommunicator, "_sbu_uart_interface", virtual_sbu.port)
+        communicator = SbuCommunicator()
+        try:
+            communicator.query(SbuCommands.test)  # opens the port and negotiates
+            return latencies(communicator), throughput(communicator)
+        finally:
+            SbuCommunicator.close_session()
+
+
+@pytest.mark.slow
+def test_benchmark_sbu_communicator(tmp_path: Path, mocker: MockFixture) -> None:
+    results = {
+        name: benchmark(configuration, tmp_path / f"sbu_baud_rate_{index}.json", mocker)
+        for index, (name, configuration) in enumerate(CONFIGURATIONS.items())
+    }
+    for name, (latency, requests_per_second) in results.items():
+        per_command = ", ".join(f"{code} {seconds * 1000:.1f}ms" for code, seconds in latency.items())
+        print(f"{name}: {per_command}; {requests_per_second:.1f} requests/s from {THREADS} threads")
+    _, binary, negotiated = (results[name][0] for name in CONFIGURATIONS)
+    assert median(negotiated.values()) < median(binary.values())
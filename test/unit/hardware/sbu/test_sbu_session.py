@@ -0,0 +1,173 @@
+import sys
+from importlib import import_module
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from threading import Event
+from typing import Generator, List
+
+import pytest
+from pytest_mock import MockFixture
+
+sys.modules["RPi"] = import_module("test.fake_libs.RPi_mock")
+
+from base.common.exceptions import SbuNoResponseError, SbuNotAvailableError
+from base.hardware.sbu.commands import SbuCommands
+from base.hardware.sbu.framing import FLAG_NAK, Frame
+from base.hardware.sbu.message import SbuMessage
+from base.hardware.sbu.session import SbuSession
+
+
+def session(idle_timeout: float = 0, binary_framing: bool = False) -> SbuSession:
+    patch_config(
+        SbuSession,
+        {
+            "session_idle_timeout": idle_timeout,
+            "binary_framing": binary_framing,
+            "binary_framing_window": 4,
+            "baud_rate_negotiation": False,
+            "baud_rate_file": "",
+            "wait_for_channel_free_timeout": 1,
+            "serial_connection_timeout": 1,
+            "sbu_response_timeout": 1,
+        },
+    )
+    return SbuSession(port=Path("/dev/ttyS1"))
+
+
+@pytest.fixture
+def sbu_session(mocker: MockFixture) -> Generator[SbuSession, None, None]:
+    mocker.patch("base.hardware.sbu.session.SerialInterface.__init__", return_value=None)
+    sbu_session = session()
+    sbu_session.start()
+    yield sbu_session
+    sbu_session.close(timeout=1)
+
+
+def test_port_stays_open(sbu_session: SbuSession, mocker: MockFixture) -> None:
+    patched_open = mocker.patch("base.hardware.sbu.session.SerialInterface.open")
+    patched_close = mocker.patch("base.hardware.sbu.session.SerialInterface.close")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.query_from_sbu", return_value="CC:123")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.write_to_sbu")
+    assert sbu_session.submit(SbuMessage(SbuCommands.measure_current), query=True).result(1) == "CC:123"
+    assert sbu_session.submit(SbuMessage(SbuCommands.write_to_display_line1, "hello")).result(1) == ""
+    assert sbu_session.submit(SbuMessage(SbuCommands.measure_current), query=True).result(1) == "CC:123"
+    assert patched_open.call_count == 1
+    sbu_session.close(timeout=1)
+    assert patched_close.call_count == 1
+    with pytest.raises(SbuNotAvailableError):
+        sbu_session.submit(SbuMessage(SbuCommands.measure_current))
+
+
+def test_priorities(sbu_session: SbuSession, mocker: MockFixture) -> None:
+    handled: List[str] = []
+    busy = Event()
+    unblock = Event()
+
+    def write_to_sbu(message: SbuMessage) -> None:
+        if not handled:
+            busy.set()
+            unblock.wait(1)
+        handled.append(message.code)
+
+    mocker.patch("base.hardware.sbu.session.SerialInterface.open")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.close")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.write_to_sbu", side_effect=write_to_sbu)
+    blocking = sbu_session.submit(SbuMessage(SbuCommands.write_to_display_line1))
+    assert busy.wait(1)
+    futures = [
+        sbu_session.submit(SbuMessage(command))
+        for command in [
+            SbuCommands.measure_temperature,
+            SbuCommands.write_to_display_line2,
+            SbuCommands.request_shutdown,
+        ]
+    ]
+    unblock.set()
+    for future in [blocking, *futures]:
+        future.result(1)
+    assert handled == ["D1", "SR", "D2", "TP"]
+
+
+def test_error_reopens_the_port(sbu_session: SbuSession, mocker: MockFixture) -> None:
+    patched_open = mocker.patch("base.hardware.sbu.session.SerialInterface.open")
+    patched_close = mocker.patch("base.hardware.sbu.session.SerialInterface.close")
+    mocker.patch(
+        "base.hardware.sbu.session.SerialInterface.query_from_sbu", side_effect=[SbuNoResponseError("timeout"), "Echo"]
+    )
+    with pytest.raises(SbuNoResponseError):
+        sbu_session.submit(SbuMessage(SbuCommands.test), query=True).result(1)
+    assert patched_close.call_count == 1
+    assert sbu_session.submit(SbuMessage(SbuCommands.test), query=True).result(1) == "Echo"
+    assert patched_open.call_count == 2
+
+
+def test_idle_session_closes_the_port(mocker: MockFixture) -> None:
+    mocker.patch("base.hardware.sbu.session.SerialInterface.__init__", return_value=None)
+    mocker.patch("base.hardware.sbu.session.SerialInterface.open")
+    closed = Event()
+    mocker.patch("base.hardware.sbu.session.SerialInterface.close", side_effect=lambda: closed.set())
+    mocker.patch("base.hardware.sbu.session.SerialInterface.write_to_sbu")
+    sbu_session = session(idle_timeout=0.01)
+    sbu_session.start()
+    sbu_session.submit(SbuMessage(SbuCommands.write_to_display_line1)).result(1)
+    assert closed.wait(1)
+    sbu_session.close(timeout=1)
+
+
+class FakeFramedSbu:
+    """answers every frame in reverse order, rejects the first frame of each code in reject_once"""
+
+    def __init__(self, *reject_once: str) -> None:
+        self.received: List[Frame] = []
+        self._unanswered: List[Frame] = []
+        self._reject_once = set(reject_once)
+
+    def send_frame(self, frame: Frame) -> None:
+        self.received.append(frame)
+        self._unanswered.append(frame)
+
+    def receive(self) -> bytes:
+        response = b""
+        for frame in reversed(self._unanswered):
+            code = frame.payload.split(b":")[0].decode()
+            if code in self._reject_once:
+                self._reject_once.remove(code)
+                response += Frame(sequence=frame.sequence, flags=FLAG_NAK).encode()
+            else:
+                response += Frame(sequence=frame.sequence, payload=code.encode() + b":42").encode()
+        self._unanswered.clear()
+        return response
+
+
+@pytest.fixture
+def binary_session(mocker: MockFixture) -> Generator[SbuSession, None, None]:
+    mocker.patch("base.hardware.sbu.session.SerialInterface.__init__", return_value=None)
+    mocker.patch("base.hardware.sbu.session.SerialInterface.open")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.close")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.negotiate_binary_framing", return_value=True)
+    sbu_session = session(binary_framing=True)
+    yield sbu_session
+    sbu_session.close(timeout=1)
+
+
+def test_binary_framing_pipelines_requests(binary_session: SbuSession, mocker: MockFixture) -> None:
+    fake_sbu = FakeFramedSbu("CC")
+    mocker.patch("base.hardware.sbu.session.SerialInterface.send_frame", side_effect=fake_sbu.send_frame)
+    mocker.patch("base.hardware.sbu.session.SerialInterface.receive", side_effect=fake_sbu.receive)
+    commands = [SbuCommands.measure_current, SbuCommands.measure_vcc3v, SbuCommands.measure_temperature]
+    futures = [binary_session.submit(SbuMessage(command), query=True) for command in commands]
+    display = binary_session.submit(SbuMessage(SbuCommands.write_to_display_line1, "hello"))
+    binary_session.start()
+    assert [future.result(1) for future in futures] == ["CC:42", "3V:42", "TP:42"]
+    assert display.result(1) == ""
+    assert binary_session.binary_framing
+    assert [frame.payload for frame in fake_sbu.received] == [b"D1:hello", b"CC:", b"3V:", b"TP:", b"CC:"]
+
+
+def test_text_protocol_is_kept_if_binary_framing_is_refused(binary_session: SbuSession, mocker: MockFixture) -> None:
+    mocker.patch("base.hardware.sbu.session.SerialInterface.negotiate_binary_framing", return_value=False)
+    patched_query = mocker.patch("base.hardware.sbu.session.SerialInterface.query_from_sbu", return_value="CC:42")
+    binary_session.start()
+    assert binary_session.submit(SbuMessage(SbuCommands.measure_current), query=True).result(1) == "CC:42"
+    assert not binary_session.binary_framing
+    assert patched_query.call_count == 1
@@ -0,0 +1,61 @@
+import sys
+from importlib import import_module
+from test.utils.patch_config import patch_config
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+
+sys.modules["RPi"] = import_module("test.fake_libs.RPi_mock")
+
+from base.common.exceptions import SbuNoResponseError
+from base.hardware.sbu.telemetry import INPUT_CURRENT, SBU_TEMPERATURE, VCC3V, SbuTelemetry
+
+
+@pytest.fixture
+def sbu() -> MagicMock:
+    sbu = MagicMock()
+    sbu.measure_base_input_current.return_value = 0.5
+    sbu.measure_vcc3v_voltage.return_value = 3.3
+    sbu.measure_sbu_temperature.return_value = 40.0
+    return sbu
+
+
+def telemetry(sbu: MagicMock, interval: float = 0, max_age: float = 15) -> SbuTelemetry:
+    patch_config(SbuTelemetry, {"telemetry_interval": interval, "telemetry_max_age": max_age})
+    return SbuTelemetry(sbu)
+
+
+def test_values_are_served_from_the_cache(sbu: MagicMock) -> None:
+    sbu_telemetry = telemetry(sbu)
+    sbu_telemetry.sample()
+    sbu.measure_base_input_current.return_value = 1.0
+    assert [sbu_telemetry.get(quantity) for quantity in [INPUT_CURRENT, VCC3V, SBU_TEMPERATURE]] == [0.5, 3.3, 40.0]
+    assert sbu.measure_base_input_current.call_count == 1
+
+
+def test_outdated_values_are_measured_again(sbu: MagicMock, mocker: MockFixture) -> None:
+    sbu_telemetry = telemetry(sbu, max_age=15)
+    assert sbu_telemetry.get(INPUT_CURRENT) == 0.5
+    sbu.measure_base_input_current.return_value = 1.0
+    mocker.patch("base.hardware.sbu.telemetry.monotonic", return_value=10**9)
+    assert sbu_telemetry.get(INPUT_CURRENT) == 1.0
+    assert sbu.measure_base_input_current.call_count == 2
+
+
+def test_failed_measurement_keeps_the_previous_value(sbu: MagicMock) -> None:
+    sbu_telemetry = telemetry(sbu)
+    sbu_telemetry.sample()
+    sbu.measure_sbu_temperature.side_effect = SbuNoResponseError("no response")
+    sbu_telemetry.sample()
+    assert sbu_telemetry.get(SBU_TEMPERATURE) == 40.0
+    assert sbu_telemetry.get(INPUT_CURRENT) == 0.5
+
+
+def test_sampling_in_the_background(sbu: MagicMock) -> None:
+    sbu_telemetry = telemetry(sbu, interval=0.01)
+    sbu_telemetry.start()
+    sbu_telemetry.terminate()
+    sbu_telemetry.join(1)
+    assert not sbu_telemetry.is_alive()
+    assert sbu.measure_vcc3v_voltage.call_count >= 1
@@ -268,3 +268,25 @@ def test_wait_for_sbu_ready(serial_interface: SerialInterface, mocker: MockFixtu
         interface._wait_for_sbu_ready()
         assert patched_wait_for_response.called_once_with("Ready")
         assert patched_flush_sbu_channel.called_once_with()
+
+
+def test_failed_open_releases_the_channel(serial_interface: SerialInterface, mocker: MockFixture) -> None:
+    mocker.patch("base.hardware.sbu.serial_interface.SerialInterface._wait_for_channel_free")
+    mocker.patch(
+        "base.hardware.sbu.serial_interface.SerialInterface._establish_serial_connection_or_raise",
+        side_effect=SerialInterfaceError,
+    )
+    with pytest.raises(SerialInterfaceError):
+        serial_interface.open()
+    assert not SerialInterface._channel_busy
+
+
+@pytest.mark.parametrize("response, accepted", [("Echo:BIN1", True), ("Echo", False)])
+def test_negotiate_binary_framing(
+    serial_interface: SerialInterface, mocker: MockFixture, response: str, accepted: bool
+) -> None:
+    patched_query = mocker.patch(
+        "base.hardware.sbu.serial_interface.SerialInterface.query_from_sbu", return_value=response
+    )
+    assert serial_interface.negotiate_binary_framing() == accepted
+    assert patched_query.call_args.kwargs["message"].binary == b"Test:BIN1\n"
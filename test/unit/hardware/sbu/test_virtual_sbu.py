@@ -0,0 +1,119 @@
+import sys
+from importlib import import_module
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from test.utils.virtual_sbu import VirtualSbu, VirtualSbuFaults
+from typing import Any, Dict, Generator
+
+import pytest
+from pytest_mock import MockFixture
+
+sys.modules["RPi"] = import_module("test.fake_libs.RPi_mock")
+
+from base.common.config import Config
+from base.common.exceptions import SbuCommunicationTimeout, SbuNoResponseError
+from base.hardware.sbu.commands import SbuCommands
+from base.hardware.sbu.communicator import SbuCommunicator
+from base.hardware.sbu.message import SbuMessage
+from base.hardware.sbu.sbu import SBU, WakeupReason
+from base.hardware.sbu.serial_interface import SerialInterface
+from base.hardware.sbu.session import SbuSession
+from base.hardware.sbu.uart_finder import _test_uart_interfaces_for_echo
+
+SBU_CONFIG = {
+    "wait_for_channel_free_timeout": 1,
+    "serial_connection_timeout": 0.2,
+    "sbu_response_timeout": 0.2,
+    "session_idle_timeout": 0,
+    "binary_framing": False,
+    "binary_framing_window": 4,
+    "baud_rate_negotiation": False,
+    "baud_rates": [115200, 57600],
+    "baud_rate_file": "",
+}
+
+
+def configure(**changes: Any) -> Dict[str, Any]:
+    """for the SerialInterface and the SbuSession, both read sbu.json"""
+    config = dict(SBU_CONFIG, **changes)
+    SerialInterface._config = Config(config)
+    patch_config(SbuSession, config)
+    return config
+
+
+@pytest.fixture
+def virtual_sbu() -> Generator[VirtualSbu, None, None]:
+    configure()
+    with VirtualSbu() as virtual_sbu:
+        yield virtual_sbu
+
+
+def sbu_on(port: Path, mocker: MockFixture) -> SBU:
+    mocker.patch.object(SbuCommunicator, "_sbu_uart_interface", port)
+    return SBU(SbuCommunicator())
+
+
+def test_serial_interface(virtual_sbu: VirtualSbu) -> None:
+    with SerialInterface(port=virtual_sbu.port) as serial_interface:
+        assert serial_interface.query_from_sbu(SbuMessage(SbuCommands.test)) == "Echo"
+        assert serial_interface.query_from_sbu(SbuMessage(SbuCommands.measure_current)) == "CC:512"
+        serial_interface.write_to_sbu(SbuMessage(SbuCommands.write_to_display_line1, "hello"))
+        with pytest.raises(SbuNoResponseError):
+            serial_interface.write_to_sbu(SbuMessage(SbuCommands.set_baud_rate, "115200"))  # unknown to this firmware
+    assert virtual_sbu.state.display[0] == "hello"
+
+
+def test_uart_finder(virtual_sbu: VirtualSbu, mocker: MockFixture) -> None:
+    mocker.patch("base.hardware.sbu.uart_finder.get_config", return_value=Config(SBU_CONFIG))
+    assert _test_uart_interfaces_for_echo((port for port in [virtual_sbu.port])) == virtual_sbu.port
+
+
+@pytest.mark.parametrize("binary_framing", [False, True])
+def test_sbu(virtual_sbu: VirtualSbu, mocker: MockFixture, binary_framing: bool) -> None:
+    configure(binary_framing=binary_framing)
+    sbu = sbu_on(virtual_sbu.port, mocker)
+    try:
+        sbu.send_seconds_to_next_bu(3200)
+        sbu.write_to_display("backup in", "53 minutes")
+        assert sbu.request_wakeup_reason() == WakeupReason.BACKUP_NOW
+        sbu.set_wakeup_reason(WakeupReason.CONFIGURATION.value)
+        assert sbu.request_wakeup_reason() == WakeupReason.CONFIGURATION
+        assert sbu.measure_base_input_current() == pytest.approx(512 * 0.00234)
+        sbu.request_shutdown()
+    finally:
+        SbuCommunicator.close_session()
+    assert virtual_sbu.binary_framing == binary_framing
+    assert virtual_sbu.state.seconds_to_next_bu == 3200
+    assert virtual_sbu.state.display == ["backup in", "53 minutes"]
+    assert virtual_sbu.state.shutdown_requested
+
+
+def test_session_negotiates_the_baud_rate(mocker: MockFixture, tmp_path: Path) -> None:
+    configure(binary_framing=True, baud_rate_negotiation=True, baud_rate_file=str(tmp_path / "sbu_baud_rate.json"))
+    with VirtualSbu(baud_rates=[57600, 19200]) as virtual_sbu:
+        sbu = sbu_on(virtual_sbu.port, mocker)
+        try:
+            assert sbu.measure_sbu_temperature() == 25
+        finally:
+            SbuCommunicator.close_session()
+        assert virtual_sbu.baud_rate == 57600
+        assert virtual_sbu.binary_framing
+
+
+@pytest.mark.parametrize("binary_framing", [False, True])
+def test_session_recovers_from_faults(mocker: MockFixture, binary_framing: bool) -> None:
+    configure(binary_framing=binary_framing)
+    with VirtualSbu(faults=VirtualSbuFaults(drop=0.1, corrupt=0.1, nak=0.1, seed=1)) as virtual_sbu:
+        sbu = sbu_on(virtual_sbu.port, mocker)
+        answered = 0
+        try:
+            for _ in range(20):
+                try:
+                    answered += sbu.measure_vcc3v_voltage() == pytest.approx(3.234)
+                except SbuCommunicationTimeout:
+                    pass
+            virtual_sbu.faults = VirtualSbuFaults()
+            assert sbu.measure_vcc3v_voltage() == pytest.approx(3.234)
+        finally:
+            SbuCommunicator.close_session()
+    assert answered > 0
@@ -1,6 +1,5 @@
 import logging
 from pathlib import Path
-from subprocess import PIPE, Popen, run
 from test.utils.backup_environment.virtual_hard_drive import VirtualHardDrive
 from test.utils.patch_config import patch_config
 from typing import Generator
@@ -50,7 +49,11 @@ def drive(tmp_path: path.local) -> Generator[MockDrive, None, None]:
             read_only=False,
         )
         patch_config(
-            class_=BackupBrowser, config_content={"local_backup_target_location": virtual_hard_drive.mount_point}
+            class_=BackupBrowser,
+            config_content={
+                "local_backup_target_location": virtual_hard_drive.mount_point,
+                "backup_catalog_sd_copy": virtual_hard_drive.mount_point.parent / "backup_catalog.jsonl",
+            },
         )
         mock_drive = MockDrive(
             BackupBrowser(),
@@ -149,15 +152,3 @@ def test_space_used_percent(drive: MockDrive) -> None:
 
 def test_space_used_percent_invalid_mountpoint(drive_invalid_mountpoint: MockDrive) -> None:
     assert drive_invalid_mountpoint.space_used_percent() == 0
-
-
-def test_get_string_from_df_output(drive: MockDrive) -> None:
-    string_to_verify = "somestring"
-    p = Popen(["echo", string_to_verify], stdout=PIPE)
-    result = drive._get_string_from_df_output(p.stdout)
-    assert result.strip() == string_to_verify
-
-
-@pytest.mark.parametrize("test_in, test_out", [("Use%\n3%\n", 3), ("SomeInvalidStuff", 0), ("", 0)])
-def test_remove_heading_from_df_output(drive: MockDrive, test_in: str, test_out: str) -> None:
-    assert drive._remove_heading_from_df_output(test_in) == test_out
@@ -0,0 +1,121 @@
+from datetime import datetime
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from typing import Generator, Tuple
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.backup_browser import BackupBrowser
+from base.logic.backup.backup_catalog import CATALOG_FILE_NAME, BackupCatalog, CatalogEntry
+from base.logic.backup.synchronisation.sync_status import SyncSummary
+
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> Generator[Tuple[BackupCatalog, Path], None, None]:
+    backup_hdd = tmp_path / "backup_hdd"
+    backup_hdd.mkdir()
+    for name in ["backup_2022_01_15-12_00_00", "backup_2022_01_16-12_00_00.in_preparation", "lost+found"]:
+        (backup_hdd / name).mkdir()
+    yield BackupCatalog(backup_hdd, tmp_path / "sd" / "backup_catalog.jsonl"), backup_hdd
+
+
+def test_entry_round_trip() -> None:
+    entry = CatalogEntry(
+        name="backup_2022_01_15-12_00_00",
+        start_time=datetime(2022, 1, 15, 12),
+        end_time=datetime(2022, 1, 15, 12, 30),
+        bytes_transferred=1024,
+        files_transferred=2,
+        stats=SyncSummary(number_of_files=3, total_file_size=4096),
+    )
+    assert CatalogEntry.from_json(entry.to_json()) == entry
+
+
+def test_entries_reconcile_missing_catalog(catalog: Tuple[BackupCatalog, Path]) -> None:
+    backup_catalog, backup_hdd = catalog
+    entries = backup_catalog.entries()
+    assert [entry.directory_name for entry in entries] == [
+        "backup_2022_01_15-12_00_00",
+        "backup_2022_01_16-12_00_00.in_preparation",
+    ]
+    assert (backup_hdd / CATALOG_FILE_NAME).exists()
+    assert backup_catalog.sd_copy_entries() == entries
+
+
+def test_update_and_remove(catalog: Tuple[BackupCatalog, Path]) -> None:
+    backup_catalog, _ = catalog
+    backup_catalog.update("backup_2022_01_16-12_00_00", suffix="", bytes_transferred=42)
+    backup_catalog.update("backup_2022_01_17-12_00_00", suffix=".in_preparation")
+    entries = {entry.name: entry for entry in backup_catalog.entries()}
+    assert entries["backup_2022_01_16-12_00_00"].directory_name == "backup_2022_01_16-12_00_00"
+    assert entries["backup_2022_01_16-12_00_00"].bytes_transferred == 42
+    assert "backup_2022_01_17-12_00_00" in entries
+    backup_catalog.remove("backup_2022_01_15-12_00_00")
+    assert "backup_2022_01_15-12_00_00" not in {entry.name for entry in backup_catalog.entries()}
+
+
+def test_reconcile_keeps_recorded_details(catalog: Tuple[BackupCatalog, Path]) -> None:
+    backup_catalog, backup_hdd = catalog
+    backup_catalog.update("backup_2022_01_16-12_00_00", bytes_transferred=42)
+    backup_catalog.update("backup_2022_01_14-12_00_00")  # not present on the backup hdd
+    (backup_hdd / "backup_2022_01_16-12_00_00.in_preparation").rename(backup_hdd / "backup_2022_01_16-12_00_00")
+    entries = {entry.name: entry for entry in backup_catalog.reconcile()}
+    assert set(entries) == {"backup_2022_01_15-12_00_00", "backup_2022_01_16-12_00_00"}
+    assert entries["backup_2022_01_16-12_00_00"].suffix == ""
+    assert entries["backup_2022_01_16-12_00_00"].bytes_transferred == 42
+
+
+def test_corrupt_catalog_is_rebuilt(catalog: Tuple[BackupCatalog, Path]) -> None:
+    backup_catalog, backup_hdd = catalog
+    (backup_hdd / CATALOG_FILE_NAME).write_text('{"name": "backup_2022_01_15-12_00_00", "suff')
+    assert len(backup_catalog.entries()) == 2
+
+
+def test_corrupt_lines_are_dropped(catalog: Tuple[BackupCatalog, Path]) -> None:
+    backup_catalog, backup_hdd = catalog
+    backup_catalog.update("backup_2022_01_15-12_00_00", bytes_transferred=42)
+    backup_catalog.update("backup_2022_01_16-12_00_00", bytes_transferred=43)
+    catalog_file = backup_hdd / CATALOG_FILE_NAME
+    content = catalog_file.read_text()
+    catalog_file.write_text(content + '{"name": "backup_2022_01_17-12_00_00", "suff\n')
+    entries = {entry.name: entry for entry in backup_catalog.entries()}
+    assert entries["backup_2022_01_15-12_00_00"].bytes_transferred == 42
+    assert entries["backup_2022_01_16-12_00_00"].bytes_transferred == 43
+    assert (backup_hdd / (CATALOG_FILE_NAME + ".corrupt")).read_text().startswith(content)
+
+
+def test_corrupt_catalog_falls_back_to_sd_copy(catalog: Tuple[BackupCatalog, Path]) -> None:
+    backup_catalog, backup_hdd = catalog
+    backup_catalog.update("backup_2022_01_15-12_00_00", bytes_transferred=42)
+    (backup_hdd / CATALOG_FILE_NAME).write_bytes(b"\xff\xfe not a catalog")
+    entries = {entry.name: entry for entry in backup_catalog.entries()}
+    assert entries["backup_2022_01_15-12_00_00"].bytes_transferred == 42
+
+
+def test_unreadable_catalog_is_not_overwritten(catalog: Tuple[BackupCatalog, Path], mocker: MockFixture) -> None:
+    backup_catalog, backup_hdd = catalog
+    backup_catalog.update("backup_2022_01_15-12_00_00", bytes_transferred=42)
+    content = (backup_hdd / CATALOG_FILE_NAME).read_text()
+    mocker.patch.object(BackupCatalog, "_read", side_effect=OSError(5, "Input/output error"))
+    with pytest.raises(OSError):
+        backup_catalog.reconcile()
+    assert (backup_hdd / CATALOG_FILE_NAME).read_text() == content
+
+
+def test_backup_browser_reads_catalog(catalog: Tuple[BackupCatalog, Path], tmp_path: Path) -> None:
+    _, backup_hdd = catalog
+    patch_config(
+        BackupBrowser,
+        {
+            "local_backup_target_location": backup_hdd,
+            "backup_catalog_sd_copy": tmp_path / "sd" / "backup_catalog.jsonl",
+        },
+    )
+    backup_browser = BackupBrowser()
+    assert backup_browser.index == [
+        str(backup_hdd / "backup_2022_01_16-12_00_00.in_preparation"),
+        str(backup_hdd / "backup_2022_01_15-12_00_00"),
+    ]
+    (backup_hdd / "backup_2022_01_15-12_00_00").rmdir()
+    assert BackupBrowser(from_sd_copy=True).index == backup_browser.index
@@ -0,0 +1,33 @@
+from pathlib import Path
+from test.utils.patch_config import patch_config, patch_multiple_configs
+from typing import List
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.backup_conductor import BackupConductor
+from base.logic.backup.scrubber import Scrubber
+
+
+@pytest.mark.parametrize(
+    "scrub_after_backup, completed, events",
+    [(True, True, ["scrub", "disengage"]), (True, False, ["disengage"]), (False, True, ["disengage"])],
+)
+def test_scrub_session_after_backup(
+    mocker: MockFixture, tmp_path: Path, scrub_after_backup: bool, completed: bool, events: List[str]
+) -> None:
+    """the scrub session runs while the backup hdd is still docked"""
+    patch_multiple_configs(BackupConductor, {"backup.json": {"scrub_after_backup": scrub_after_backup}})
+    patch_config(Scrubber, {"scrub_bytes_per_second": 0, "scrub_bytes_per_session": 1024})
+    mocker.patch("base.logic.backup.backup_conductor.Nas")
+    mocker.patch("base.logic.backup.backup_conductor.NetworkShare")
+    mocker.patch.object(BackupConductor, "_mark_backup_target_as_finished")
+    happened: List[str] = []
+    mocker.patch.object(Scrubber, "scrub", side_effect=lambda: happened.append("scrub"))
+    mocker.patch.object(BackupConductor, "_return_to_default_state", side_effect=lambda: happened.append("disengage"))
+    backup_conductor = BackupConductor(lambda: False)
+    backup_conductor._backup = mocker.MagicMock(completed=completed, target=tmp_path / "backup_2022_01_16-12_00_00")
+    backup_conductor._catalog = mocker.MagicMock()
+    backup_conductor.on_backup_finished()
+    assert happened == events
+    assert backup_conductor._scrubber is None
@@ -1,17 +1,26 @@
 from pathlib import Path
-from subprocess import Popen
 from test.utils.backup_environment.virtual_backup_environment import prepare_source_sink_dirs, temp_source_sink_dirs
-from typing import Generator, Optional, Tuple
+from test.utils.patch_config import patch_config
+from typing import Generator, List, Optional, Tuple
 
 import pytest
 from pytest_mock import MockFixture
 
+from base.logic.backup.backup_browser import BackupBrowser
 from base.logic.backup.backup_preparator import BackupPreparator
+from base.logic.backup.checkpoint import BackupCheckpoint, BackupPhase
+from base.logic.backup.hardlink_snapshot import HardlinkSnapshot
+from base.logic.backup.snapshot_strategy import SnapshotStrategy
+from base.logic.backup.space_planner import DeletionPlan
+from base.logic.backup.synchronisation.change_list import ChangeList
 
 
 class Backup:
     source: Path = Path()
     target: Path = Path()
+    link_dest: Optional[Path] = None
+    change_list: Optional[ChangeList] = None
+    estimated_backup_size: int = 0
 
     def set_process_step(*args, **kwargs) -> None:  # type: ignore
         pass
@@ -19,6 +28,8 @@ class Backup:
 
 @pytest.fixture
 def backup_preparator_naked() -> Generator[BackupPreparator, None, None]:
+    patch_config(HardlinkSnapshot, {"hardlink_snapshot_workers": 2, "hardlink_snapshot_report_interval": 1})
+    patch_config(BackupPreparator, {"snapshot_strategy": "hardlink_copy"})
     yield BackupPreparator(Backup())  # type: ignore
 
 
@@ -26,21 +37,24 @@ def backup_preparator_naked() -> Generator[BackupPreparator, None, None]:
 def backup_preparator(temp_source_sink_dirs: Tuple[Path, Path]) -> Generator[BackupPreparator, None, None]:
     b = Backup()
     b.source, b.target = temp_source_sink_dirs
+    patch_config(BackupPreparator, {"snapshot_strategy": "hardlink_copy"})
     yield BackupPreparator(b)  # type: ignore
 
 
-def test_running_sleep_func(backup_preparator_naked: BackupPreparator) -> None:
-    backup_preparator_naked._copy_process = Popen("sleep 0.2".split())
-    assert backup_preparator_naked.running
-    backup_preparator_naked._copy_process.wait()
+def test_running(backup_preparator_naked: BackupPreparator) -> None:
+    assert not backup_preparator_naked.running
+    backup_preparator_naked._hardlink_snapshot = HardlinkSnapshot(Path(), Path())
     assert not backup_preparator_naked.running
+    backup_preparator_naked._hardlink_snapshot._running = True
+    assert backup_preparator_naked.running
 
 
-def test_terminate_sleep_func(backup_preparator_naked: BackupPreparator) -> None:
-    backup_preparator_naked._copy_process = Popen("sleep 3600".split())
-    assert backup_preparator_naked.running
+def test_terminate(backup_preparator_naked: BackupPreparator) -> None:
+    backup_preparator_naked.terminate()  # nothing to terminate yet
+    backup_preparator_naked._hardlink_snapshot = HardlinkSnapshot(Path(), Path())
+    assert not backup_preparator_naked.aborted
     backup_preparator_naked.terminate()
-    assert not backup_preparator_naked.running
+    assert backup_preparator_naked.aborted
 
 
 @pytest.mark.parametrize("newest_valid_bu", [Path(), None])
@@ -48,7 +62,9 @@ def test_prepare(backup_preparator: BackupPreparator, mocker: MockFixture, newes
     prepare_source_sink_dirs(
         src=backup_preparator._backup.source, sink=backup_preparator._backup.target, amount_files_in_src=1
     )
-    mocked_mkdir = mocker.patch("pathlib.Path.mkdir")
+    mocked_create_or_resume_target = mocker.patch(
+        "base.logic.backup.backup_preparator.BackupPreparator._create_or_resume_target"
+    )
     mocked_free_space_if_necessary = mocker.patch(
         "base.logic.backup.backup_preparator.BackupPreparator._free_space_if_necessary"
     )
@@ -56,16 +72,163 @@ def test_prepare(backup_preparator: BackupPreparator, mocker: MockFixture, newes
     mocked_newest_valid_backup = mocker.patch(
         "base.logic.backup.backup_browser.BackupBrowser.newest_valid_backup", return_value=newest_valid_bu
     )
-    mocked_copy = mocker.patch("base.common.system.System.copy_newest_backup_with_hardlinks")
-    mocked_wait = mocker.patch("subprocess.Popen.wait")
+    patch_config(HardlinkSnapshot, {"hardlink_snapshot_workers": 2, "hardlink_snapshot_report_interval": 1})
+    mocked_snapshot = mocker.patch("base.logic.backup.hardlink_snapshot.HardlinkSnapshot.run")
     mocked_finish_prep = mocker.patch("base.logic.backup.backup_preparator.BackupPreparator._finish_preparation")
 
     backup_preparator.prepare()
-    assert mocked_mkdir.called_once_with(exist_ok=True)
+    assert mocked_create_or_resume_target.called_once_with()
     assert mocked_free_space_if_necessary.called_once_with()
     assert mocked_read_backups.called_once_with()
     assert mocked_newest_valid_backup.called_once()
     if newest_valid_bu:
-        assert mocked_copy.called_once_with(newest_valid_bu, backup_preparator._backup.target)
-        assert mocked_wait.called_once_with()
+        assert mocked_snapshot.called_once_with()
     assert mocked_finish_prep.called_once_with()
+
+
+@pytest.mark.parametrize(
+    "interrupted_suffix, checkpoint_phase, snapshot_complete",
+    [
+        (".in_preparation", None, False),
+        (".in_preparation", BackupPhase.SNAPSHOT, False),
+        (".unfinished", BackupPhase.SYNCHRONISATION, True),
+    ],
+)
+def test_create_or_resume_target(
+    backup_preparator: BackupPreparator,
+    mocker: MockFixture,
+    interrupted_suffix: str,
+    checkpoint_phase: Optional[BackupPhase],
+    snapshot_complete: bool,
+) -> None:
+    target = backup_preparator._backup.target / "backup_2022_01_17-12_00_00.in_preparation"
+    backup_preparator._backup.target = target
+    interrupted = target.parent / f"backup_2022_01_16-12_00_00{interrupted_suffix}"
+    interrupted.mkdir()
+    checkpoint = BackupCheckpoint(target.parent)
+    if checkpoint_phase is not None:
+        checkpoint.save(interrupted, checkpoint_phase)
+    (interrupted / "already_linked").touch()
+    mocker.patch(
+        "base.logic.backup.backup_browser.BackupBrowser.newest_interrupted_backup",
+        new_callable=mocker.PropertyMock,
+        return_value=interrupted,
+    )
+    mocker.patch("base.logic.backup.backup_browser.BackupBrowser._read_backups")
+    backup_preparator._create_or_resume_target()
+    assert not interrupted.exists()
+    assert (target / "already_linked").exists()
+    assert backup_preparator._snapshot_complete == snapshot_complete
+    assert checkpoint.phase_of(target) == (BackupPhase.SYNCHRONISATION if snapshot_complete else BackupPhase.SNAPSHOT)
+
+
+def test_snapshot_skipped_when_complete(backup_preparator: BackupPreparator, mocker: MockFixture) -> None:
+    mocked_snapshot = mocker.patch("base.logic.backup.hardlink_snapshot.HardlinkSnapshot.run")
+    backup_preparator._snapshot_complete = True
+    backup_preparator._snapshot(Path("/newest/backup"))
+    mocked_snapshot.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "snapshot_strategy, link_dest, hardlink_snapshot_called",
+    [("hardlink_copy", None, True), ("link_dest", Path("/newest/backup"), False)],
+)
+def test_snapshot(
+    backup_preparator: BackupPreparator,
+    mocker: MockFixture,
+    snapshot_strategy: str,
+    link_dest: Optional[Path],
+    hardlink_snapshot_called: bool,
+) -> None:
+    patch_config(HardlinkSnapshot, {"hardlink_snapshot_workers": 2, "hardlink_snapshot_report_interval": 1})
+    mocked_snapshot = mocker.patch("base.logic.backup.hardlink_snapshot.HardlinkSnapshot.run")
+    backup_preparator._snapshot_strategy = SnapshotStrategy(snapshot_strategy)
+    backup_preparator._snapshot(Path("/newest/backup"))
+    assert backup_preparator._backup.link_dest == link_dest
+    assert mocked_snapshot.called == hardlink_snapshot_called
+
+
+@pytest.mark.parametrize(
+    "snapshot_strategy, reuse_change_list, change_list_reused",
+    [("hardlink_copy", True, True), ("hardlink_copy", False, False), ("link_dest", True, False)],
+)
+def test_enough_space_for_next_backup(
+    backup_preparator: BackupPreparator,
+    mocker: MockFixture,
+    snapshot_strategy: str,
+    reuse_change_list: bool,
+    change_list_reused: bool,
+) -> None:
+    change_list = ChangeList([b"new_file"])
+    mocker.patch("base.common.system.System.free_space", return_value=2048)
+    mocked_dry_run = mocker.patch("base.common.system.System.dry_run_next_backup", return_value=(1024, change_list))
+    patch_config(BackupPreparator, {"snapshot_strategy": snapshot_strategy, "reuse_change_list": reuse_change_list})
+    preparator = BackupPreparator(backup_preparator._backup)
+    preparator._backup.link_dest = Path("/newest")
+    assert preparator._enough_space_for_next_backup()
+    mocked_dry_run.assert_called_once_with(
+        preparator._backup.target, preparator._backup.source, link_dest=Path("/newest")
+    )
+    assert preparator._backup.estimated_backup_size == 1024
+    assert (preparator._backup.change_list is change_list) == change_list_reused
+
+
+def test_prepare_does_not_estimate_after_abort(backup_preparator: BackupPreparator, mocker: MockFixture) -> None:
+    mocker.patch("base.logic.backup.backup_preparator.BackupPreparator._create_or_resume_target")
+    mocker.patch("base.logic.backup.backup_browser.BackupBrowser._read_backups")
+    mocker.patch(
+        "base.logic.backup.backup_browser.BackupBrowser.newest_valid_backup",
+        new_callable=mocker.PropertyMock,
+        return_value=Path("/newest"),
+    )
+    mocker.patch("base.logic.backup.backup_preparator.BackupPreparator._snapshot")
+    mocker.patch(
+        "base.logic.backup.backup_preparator.BackupPreparator.aborted",
+        new_callable=mocker.PropertyMock,
+        return_value=True,
+    )
+    mocked_free_space_if_necessary = mocker.patch(
+        "base.logic.backup.backup_preparator.BackupPreparator._free_space_if_necessary"
+    )
+    backup_preparator.prepare()
+    mocked_free_space_if_necessary.assert_not_called()
+
+
+@pytest.mark.parametrize("missing_space, planner_called", [([0], False), ([4096, 0], True)])
+def test_free_space_if_necessary(
+    backup_preparator: BackupPreparator, mocker: MockFixture, missing_space: List[int], planner_called: bool
+) -> None:
+    old_backups = [Path("/backup_hdd/backup_2022_01_15-12_00_00"), Path("/backup_hdd/backup_2022_01_16-12_00_00")]
+    mocked_estimate = mocker.patch(
+        "base.logic.backup.backup_preparator.BackupPreparator._missing_space_for_next_backup", side_effect=missing_space
+    )
+    mocker.patch("base.logic.backup.backup_browser.BackupBrowser._read_backups")
+    mocker.patch("base.logic.backup.backup_preparator.BackupPreparator._deletable_backups", return_value=old_backups)
+    mocked_plan = mocker.patch(
+        "base.logic.backup.space_planner.SpacePlanner.plan",
+        return_value=DeletionPlan(backups=old_backups[:1], bytes_freed=8192),
+    )
+    mocked_delete_backup = mocker.patch("base.logic.backup.backup_browser.BackupBrowser.delete_backup")
+    backup_preparator._free_space_if_necessary()
+    assert mocked_estimate.call_count == len(missing_space)
+    if planner_called:
+        mocked_plan.assert_called_once_with(4096)
+        mocked_delete_backup.assert_called_once_with(old_backups[0])
+    else:
+        mocked_plan.assert_not_called()
+        mocked_delete_backup.assert_not_called()
+
+
+def test_deletable_backups(backup_preparator: BackupPreparator, mocker: MockFixture) -> None:
+    backups = [Path(f"/backup_hdd/backup_2022_01_1{day}-12_00_00") for day in range(5, 9)]
+    backup_preparator._backup.target = backups[3].with_suffix(".in_preparation")
+    mocker.patch(
+        "base.logic.backup.backup_browser.BackupBrowser._read_backups",
+        return_value=list(reversed(backups[:3] + [backup_preparator._backup.target])),
+    )
+    mocker.patch(
+        "base.logic.backup.backup_browser.BackupBrowser.newest_valid_backup",
+        new_callable=mocker.PropertyMock,
+        return_value=backups[2],
+    )
+    assert backup_preparator._deletable_backups(BackupBrowser()) == backups[:2]
@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from base.logic.backup.checkpoint import CHECKPOINT_FILE_NAME, BackupCheckpoint, BackupPhase, Checkpoint
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    checkpoint = BackupCheckpoint(tmp_path)
+    assert checkpoint.load() is None
+    checkpoint.save(tmp_path / "backup_2022_01_16-12_00_00.unfinished", BackupPhase.SYNCHRONISATION)
+    assert checkpoint.load() == Checkpoint(backup="backup_2022_01_16-12_00_00", phase=BackupPhase.SYNCHRONISATION)
+    assert checkpoint.phase_of(tmp_path / "backup_2022_01_16-12_00_00") == BackupPhase.SYNCHRONISATION
+    assert checkpoint.phase_of(tmp_path / "backup_2022_01_17-12_00_00") is None
+    checkpoint.clear()
+    assert checkpoint.load() is None
+    checkpoint.clear()
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path: Path) -> None:
+    (tmp_path / CHECKPOINT_FILE_NAME).write_text('{"backup": "backup_2022_01_16-12_00_00", "phase": "unknown"}')
+    assert BackupCheckpoint(tmp_path).load() is None
@@ -0,0 +1,64 @@
+import os
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from typing import Tuple
+
+import pytest
+
+from base.logic.backup.checksum_manifest import ChecksumManifest, ManifestEntry
+from base.logic.backup.file_hash import hash_file
+
+
+@pytest.fixture
+def backups(tmp_path: Path) -> Tuple[Path, Path]:
+    """the newer backup has "unchanged" hardlinked from the older one, "changed" is a new file"""
+    patch_config(ChecksumManifest, {"manifest_workers": 2})
+    older = tmp_path / "backup_2022_01_15-12_00_00"
+    newer = tmp_path / "backup_2022_01_16-12_00_00"
+    (older / "sub").mkdir(parents=True)
+    (older / "sub" / "unchanged").write_bytes(b"unchanged")
+    (older / "changed").write_bytes(b"old content")
+    (newer / "sub").mkdir(parents=True)
+    os.link(older / "sub" / "unchanged", newer / "sub" / "unchanged")
+    (newer / "changed").write_bytes(b"new content")
+    return older, newer
+
+
+def test_entry_round_trip() -> None:
+    entry = ManifestEntry(path="sub/file", size=1, mtime_ns=2, inode=3, digest="ab")
+    assert ManifestEntry.from_json(entry.to_json()) == entry
+
+
+def test_create(backups: Tuple[Path, Path]) -> None:
+    older, newer = backups
+    manifest = ChecksumManifest(older.parent)
+    status = manifest.create(older)
+    assert (status.files_hashed, status.files_carried_over, status.errors) == (2, 0, 0)
+    status = manifest.create(newer)
+    assert (status.files_hashed, status.files_carried_over, status.errors) == (1, 1, 0)
+    entries = {entry.path: entry for entry in manifest.entries(newer)}
+    assert set(entries) == {"sub/unchanged", "changed"}
+    assert entries["changed"].digest == hash_file(newer / "changed")
+    assert entries["sub/unchanged"].digest == hash_file(older / "sub" / "unchanged")
+    assert entries["changed"].size == len(b"new content")
+
+
+def test_previous_manifest_of(backups: Tuple[Path, Path]) -> None:
+    older, newer = backups
+    manifest = ChecksumManifest(older.parent)
+    assert manifest.previous_manifest_of(newer) is None
+    manifest.create(older)
+    manifest.create(newer)
+    assert manifest.previous_manifest_of(newer) == manifest.path_of(older)
+    assert manifest.previous_manifest_of(older) is None
+    manifest.remove(older)
+    assert not manifest.exists(older)
+
+
+def test_aborted_manifest_is_discarded(backups: Tuple[Path, Path]) -> None:
+    older, _ = backups
+    manifest = ChecksumManifest(older.parent)
+    manifest.terminate()
+    manifest.create(older)
+    assert not manifest.exists(older)
+    assert list(manifest.path_of(older).parent.iterdir()) == []
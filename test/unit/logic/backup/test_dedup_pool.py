@@ -0,0 +1,77 @@
+import os
+import shutil
+from pathlib import Path
+from test.utils.backup_environment.virtual_backup_environment import prepare_source_sink_dirs
+from test.utils.patch_config import patch_config
+from typing import Tuple
+
+import pytest
+
+from base.logic.backup.dedup_pool import POOL_DIRECTORY_NAME, DedupPool
+from base.logic.backup.file_hash import hash_file
+from base.logic.backup.space_planner import SpacePlanner
+
+
+@pytest.fixture
+def moved_directory(tmp_path: Path) -> Tuple[Path, Path]:
+    """two backups with the same files. In the newer one, the directory "photos" has been renamed to "pictures"."""
+    patch_config(DedupPool, {"dedup_pool_workers": 2, "dedup_pool_min_file_size": 1024})
+    older = tmp_path / "backup_2022_01_15-12_00_00"
+    newer = tmp_path / "backup_2022_01_16-12_00_00"
+    (older / "photos").mkdir(parents=True)
+    prepare_source_sink_dirs(src=older / "photos", sink=tmp_path, amount_files_in_src=3, bytesize_of_each_file=8192)
+    (older / "small").write_bytes(b"below the minimum size")
+    newer.mkdir()
+    shutil.copytree(older / "photos", newer / "pictures", copy_function=shutil.copy2)
+    return older, newer
+
+
+def test_hash_file(tmp_path: Path) -> None:
+    (tmp_path / "a").write_bytes(b"content")
+    (tmp_path / "b").write_bytes(b"content")
+    assert hash_file(tmp_path / "a") == hash_file(tmp_path / "b")
+    assert hash_file(tmp_path / "missing") is None
+
+
+def test_deduplicate_moved_directory(moved_directory: Tuple[Path, Path]) -> None:
+    older, newer = moved_directory
+    pool = DedupPool(older.parent)
+    status = pool.deduplicate(older)
+    assert (status.files_hashed, status.files_pooled, status.files_linked) == (3, 3, 0)
+    status = pool.deduplicate(newer)
+    assert (status.files_hashed, status.files_pooled, status.files_linked) == (3, 0, 3)
+    assert status.bytes_saved >= 3 * 8192
+    assert os.stat(newer / "pictures" / "testfile0").st_ino == os.stat(older / "photos" / "testfile0").st_ino
+    assert pool.deduplicate(newer).files_hashed == 0
+
+
+def test_different_metadata_is_not_linked(moved_directory: Tuple[Path, Path]) -> None:
+    older, newer = moved_directory
+    os.utime(newer / "pictures" / "testfile0", ns=(0, 0))
+    pool = DedupPool(older.parent)
+    pool.deduplicate(older)
+    status = pool.deduplicate(newer)
+    assert status.files_linked == 2
+    assert os.stat(newer / "pictures" / "testfile0").st_nlink == 1
+
+
+def test_collect_garbage(moved_directory: Tuple[Path, Path]) -> None:
+    older, newer = moved_directory
+    pool = DedupPool(older.parent)
+    pool.deduplicate(older)
+    pool.deduplicate(newer)
+    shutil.rmtree(older)
+    assert pool.collect_garbage() == 0
+    shutil.rmtree(newer)
+    assert pool.collect_garbage() >= 3 * 8192
+    assert pool.pooled_inodes() == set()
+
+
+def test_space_planner_accounts_for_the_pool(moved_directory: Tuple[Path, Path]) -> None:
+    older, newer = moved_directory
+    pool = DedupPool(older.parent)
+    pool.deduplicate(older)
+    assert (older.parent / POOL_DIRECTORY_NAME).exists()
+    without_pool = SpacePlanner([older]).plan(bytes_needed=1)
+    with_pool = SpacePlanner([older], pool.pooled_inodes()).plan(bytes_needed=1)
+    assert with_pool.bytes_freed - without_pool.bytes_freed >= 3 * 8192
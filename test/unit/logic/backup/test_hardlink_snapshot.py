@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from test.utils.backup_environment.virtual_backup_environment import prepare_source_sink_dirs, temp_source_sink_dirs
+from test.utils.patch_config import patch_config
+from typing import Any, Generator, Tuple
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.hardlink_snapshot import HardlinkSnapshot
+
+
+@pytest.fixture
+def recent_backup(temp_source_sink_dirs: Tuple[Path, Path]) -> Generator[Tuple[Path, Path], None, None]:
+    patch_config(HardlinkSnapshot, {"hardlink_snapshot_workers": 3, "hardlink_snapshot_report_interval": 1})
+    recent, new = temp_source_sink_dirs
+    prepare_source_sink_dirs(src=recent, sink=new, amount_files_in_src=3, bytesize_of_each_file=16)
+    for subdirectory in [recent / "sub", recent / "sub" / "subsub", recent / ".hidden"]:
+        subdirectory.mkdir()
+        prepare_source_sink_dirs(src=subdirectory, sink=new, amount_files_in_src=2, bytesize_of_each_file=16)
+    (recent / "symlink").symlink_to("testfile0")
+    yield recent, new
+
+
+def relative_tree(directory: Path) -> set:
+    return {path.relative_to(directory) for path in directory.rglob("*")}
+
+
+def test_run(recent_backup: Tuple[Path, Path]) -> None:
+    recent, new = recent_backup
+    status = HardlinkSnapshot(recent, new).run()
+    assert relative_tree(recent) == relative_tree(new)
+    assert (
+        os.stat(new / "sub" / "subsub" / "testfile1").st_ino == os.stat(recent / "sub" / "subsub" / "testfile1").st_ino
+    )
+    assert (new / "symlink").is_symlink()
+    assert status.finished
+    assert status.files_linked == 10
+    assert status.directories_created == 3
+    assert status.errors == 0
+
+
+def test_resume(recent_backup: Tuple[Path, Path]) -> None:
+    recent, new = recent_backup
+    (new / "sub").mkdir()
+    os.link(recent / "sub" / "testfile0", new / "sub" / "testfile0")
+    status = HardlinkSnapshot(recent, new).run()
+    assert relative_tree(recent) == relative_tree(new)
+    assert status.files_linked == 9
+    assert status.files_already_present == 1
+    assert status.directories_created == 2
+
+
+def test_terminate(recent_backup: Tuple[Path, Path]) -> None:
+    recent, new = recent_backup
+    snapshot = HardlinkSnapshot(recent, new)
+    snapshot.terminate()
+    status = snapshot.run()
+    assert snapshot.aborted
+    assert not status.finished
+    assert not snapshot.running
+    assert status.files_processed == 0
+
+
+def test_link_error_does_not_abort(recent_backup: Tuple[Path, Path], mocker: MockFixture) -> None:
+    recent, new = recent_backup
+    mocker.patch("os.link", side_effect=PermissionError)
+    status = HardlinkSnapshot(recent, new).run()
+    assert status.finished
+    assert status.errors == 10
+    assert status.directories_created == 3
+
+
+def test_unreadable_directory_is_skipped(recent_backup: Tuple[Path, Path], mocker: MockFixture) -> None:
+    recent, new = recent_backup
+    scandir = os.scandir
+
+    def scandir_or_raise(path: str) -> Any:
+        if path == str(recent / "sub"):
+            raise PermissionError(f"Permission denied: '{path}'")
+        return scandir(path)
+
+    mocker.patch("os.scandir", side_effect=scandir_or_raise)
+    status = HardlinkSnapshot(recent, new).run()
+    assert status.finished
+    assert status.errors == 1
+    assert status.files_linked == 6  # the top level and .hidden
+    assert not (new / "sub" / "subsub").exists()
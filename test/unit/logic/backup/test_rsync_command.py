@@ -7,6 +7,7 @@ from pytest_mock import MockFixture
 
 import base.logic.backup.synchronisation.rsync_command
 from base.logic.backup.synchronisation.rsync_command import RsyncCommand
+from base.logic.backup.synchronisation.transport_profile import TransportProfile
 
 local_target_location = Path("/local/target")
 source_location = Path("/source/")
@@ -17,7 +18,7 @@ def test_compose_rsync_command(mocker: MockFixture, dry: Optional[bool], dry_com
     patch_multiple_configs(
         class_=RsyncCommand,
         config_content={
-            "sync.json": {},
+            "sync.json": {"partial_dir": ".rsync-partial", "protocol": "smb"},
             "nas.json": {},
         },
     )
@@ -50,7 +51,12 @@ def test_compose_rsync_command(mocker: MockFixture, dry: Optional[bool], dry_com
             [f"{source_location}/", str(local_target_location)],
         ),
         (
-            {"protocol": "ssh", "ssh_keyfile_path": "/path/to/keyfile"},
+            {
+                "protocol": "ssh",
+                "ssh_keyfile_path": "/path/to/keyfile",
+                "ssh_control_path": "",
+                "transport_profile": "",
+            },
             {"ssh_host": "myhost", "ssh_user": "myuser"},
             ["-e", f'"ssh -i /path/to/keyfile"', f"myuser@myhost:{source_location}/", f"{local_target_location}"],
         ),
@@ -72,6 +78,131 @@ def test_protocol_specific(sync_cfg: dict, nas_cfg: dict, command: List[str]) ->
     # assert cmd == command
 
 
-@pytest.mark.parametrize("dry, command", [(True, "--dry-run"), (False, "")])
+@pytest.mark.parametrize("dry, command", [(True, "--dry-run --out-format=BaSe-item:%o:%n"), (False, "")])
 def test_dry_run(dry: bool, command: str) -> None:
     assert RsyncCommand._dry_run(dry) == command
+
+
+@pytest.mark.parametrize(
+    "files_from, command",
+    [
+        (None, "--delete"),
+        (Path("/tmp/change list"), "--files-from='/tmp/change list' --delete-missing-args"),
+    ],
+)
+def test_delete(files_from: Optional[Path], command: str) -> None:
+    assert RsyncCommand._delete(files_from) == command
+
+
+@pytest.mark.parametrize(
+    "link_dest, command", [(None, ""), (Path("/local/target/backup_old"), "--link-dest=/local/target/backup_old")]
+)
+def test_link_dest(link_dest: Optional[Path], command: str) -> None:
+    assert RsyncCommand._link_dest(link_dest) == command
+
+
+@pytest.mark.parametrize(
+    "partial_dir, dry, command",
+    [
+        (".rsync-partial", False, "--partial-dir=.rsync-partial"),
+        (".rsync-partial", True, ""),
+        ("", False, ""),
+    ],
+)
+def test_partial_dir(partial_dir: str, dry: bool, command: str) -> None:
+    patch_multiple_configs(
+        class_=RsyncCommand, config_content={"sync.json": {"partial_dir": partial_dir}, "nas.json": {}}
+    )
+    assert RsyncCommand()._partial_dir(dry) == command
+
+
+@pytest.mark.parametrize(
+    "control_path, multiplexing, command",
+    [
+        ("", True, ""),
+        (
+            "/tmp/base_ssh_%r@%h:%p",
+            True,
+            " -o ControlMaster=auto -o ControlPath=/tmp/base_ssh_%r@%h:%p -o ControlPersist=600",
+        ),
+        ("/tmp/base_ssh_%r@%h:%p", False, " -o ControlPath=none"),
+    ],
+)
+def test_ssh_multiplexing(control_path: str, multiplexing: bool, command: str) -> None:
+    patch_multiple_configs(
+        class_=RsyncCommand,
+        config_content={"sync.json": {"ssh_control_path": control_path, "ssh_control_persist": 600}, "nas.json": {}},
+    )
+    assert RsyncCommand(multiplexing=multiplexing)._ssh_multiplexing() == command
+
+
+@pytest.mark.parametrize("bwlimit, command", [(0, ""), (20480, "--bwlimit=20480")])
+def test_bwlimit(bwlimit: int, command: str) -> None:
+    assert RsyncCommand._bwlimit(bwlimit) == command
+
+
+@pytest.mark.parametrize(
+    "exclude, command", [((), ""), (["/photos/", "/my music/"], "--exclude=/photos/ --exclude='/my music/'")]
+)
+def test_exclude(exclude: List[str], command: str) -> None:
+    assert RsyncCommand._exclude(exclude) == command
+
+
+@pytest.mark.parametrize(
+    "sync_cfg, nas_cfg, command",
+    [
+        ({"protocol": "smb"}, {}, f"rsync --list-only {source_location}/"),
+        (
+            {
+                "protocol": "ssh",
+                "ssh_keyfile_path": "/path/to/keyfile",
+                "ssh_control_path": "",
+                "transport_profile": "",
+            },
+            {"ssh_host": "myhost", "ssh_user": "myuser"},
+            f'rsync --list-only -e "ssh -i /path/to/keyfile" myuser@myhost:{source_location}/',
+        ),
+    ],
+)
+def test_compose_list_directory(sync_cfg: dict, nas_cfg: dict, command: str) -> None:
+    patch_multiple_configs(class_=RsyncCommand, config_content={"sync.json": sync_cfg, "nas.json": nas_cfg})
+    assert RsyncCommand().compose_list_directory(source_location) == command
+
+
+@pytest.mark.parametrize(
+    "profile, ssh_options, rsync_options",
+    [
+        (TransportProfile(), "", ""),
+        (
+            TransportProfile(cipher="aes128-gcm@openssh.com", compress_level=3, compress_choice="zstd"),
+            " -c aes128-gcm@openssh.com",
+            "--compress --compress-level=3 --compress-choice=zstd",
+        ),
+        (TransportProfile(compress_level=1, whole_file=True), "", "--compress --compress-level=1 --whole-file"),
+    ],
+)
+def test_transport_profile(profile: TransportProfile, ssh_options: str, rsync_options: str) -> None:
+    assert profile.ssh_options() == ssh_options
+    assert profile.rsync_options() == rsync_options
+
+
+@pytest.mark.parametrize("protocol, applied", [("ssh", True), ("smb", False)])
+def test_persisted_transport_profile(tmp_path: Path, protocol: str, applied: bool) -> None:
+    profile_file = tmp_path / "transport_profile.json"
+    TransportProfile(cipher="chacha20-poly1305@openssh.com", whole_file=True).save(profile_file)
+    patch_multiple_configs(
+        class_=RsyncCommand,
+        config_content={
+            "sync.json": {
+                "protocol": protocol,
+                "ssh_keyfile_path": "/path/to/keyfile",
+                "ssh_control_path": "",
+                "partial_dir": "",
+                "transport_profile": profile_file.as_posix(),
+            },
+            "nas.json": {"ssh_host": "myhost", "ssh_user": "myuser"},
+        },
+    )
+    cmd = RsyncCommand().compose(local_target_location, source_location)
+    assert ("--whole-file" in cmd) == applied
+    assert ("-c chacha20-poly1305@openssh.com" in cmd) == applied
@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from typing import List, Tuple
+
+import pytest
+
+from base.logic.backup.backup_catalog import BackupCatalog, CatalogEntry
+from base.logic.backup.checksum_manifest import ChecksumManifest
+from base.logic.backup.scrubber import CURSOR_FILE_NAME, Scrubber, ScrubCursor, ScrubResult
+
+BACKUPS = ["backup_2022_01_15-12_00_00", "backup_2022_01_16-12_00_00"]
+FILE_SIZE = 100
+
+
+@pytest.fixture
+def backup_hdd(tmp_path: Path) -> Tuple[Path, BackupCatalog]:
+    """two backups with three files each, plus "shared" in the newer one, which is hardlinked from the older one"""
+    patch_config(ChecksumManifest, {"manifest_workers": 2})
+    backup_hdd = tmp_path / "backup_hdd"
+    for name in BACKUPS:
+        backup = backup_hdd / name
+        backup.mkdir(parents=True)
+        for index in range(3):
+            (backup / f"file{index}").write_bytes(bytes([index]) * FILE_SIZE)
+    os.link(backup_hdd / BACKUPS[0] / "file0", backup_hdd / BACKUPS[1] / "shared")
+    for name in BACKUPS:
+        ChecksumManifest(backup_hdd).create(backup_hdd / name)
+    return backup_hdd, BackupCatalog(backup_hdd, tmp_path / "sd" / "backup_catalog.jsonl")
+
+
+def scrubber(backup_hdd: Path, catalog: BackupCatalog, bytes_per_session: int) -> Scrubber:
+    patch_config(Scrubber, {"scrub_bytes_per_session": bytes_per_session, "scrub_bytes_per_second": 0})
+    return Scrubber(backup_hdd, catalog)
+
+
+def scrub_results(catalog: BackupCatalog) -> List[ScrubResult]:
+    return [entry.scrub for entry in catalog.entries() if entry.scrub is not None]
+
+
+def test_complete_pass(backup_hdd: Tuple[Path, BackupCatalog]) -> None:
+    location, catalog = backup_hdd
+    assert scrubber(location, catalog, bytes_per_session=10**6).scrub() is None
+    older, newer = scrub_results(catalog)
+    assert (older.files_checked, older.complete, older.ok) == (3, True, True)
+    assert newer.files_checked == 3  # "shared" has been checked with the older backup
+    assert not (location / CURSOR_FILE_NAME).exists()
+
+
+def test_sessions_continue_at_the_cursor(backup_hdd: Tuple[Path, BackupCatalog]) -> None:
+    location, catalog = backup_hdd
+    assert scrubber(location, catalog, bytes_per_session=2 * FILE_SIZE).scrub() == ScrubCursor(BACKUPS[0], 2)
+    assert [result.complete for result in scrub_results(catalog)] == [False]
+    cursor = scrubber(location, catalog, bytes_per_session=2 * FILE_SIZE).scrub()
+    assert cursor is not None and cursor.backup == BACKUPS[1]
+    older = scrub_results(catalog)[0]
+    assert (older.files_checked, older.complete) == (3, True)
+    assert scrubber(location, catalog, bytes_per_session=2 * FILE_SIZE).scrub() is None
+    assert [result.files_checked for result in scrub_results(catalog)] == [3, 3]
+
+
+def test_findings(backup_hdd: Tuple[Path, BackupCatalog]) -> None:
+    location, catalog = backup_hdd
+    (location / BACKUPS[0] / "file1").write_bytes(b"x" * FILE_SIZE)
+    (location / BACKUPS[0] / "file2").unlink()
+    scrubber(location, catalog, bytes_per_session=10**6).scrub()
+    older, newer = scrub_results(catalog)
+    assert (older.corrupted, older.missing, older.unreadable) == (1, 1, 0)
+    assert sorted(older.examples) == ["corrupted: file1", "missing: file2"]
+    assert newer.ok
+
+
+def test_unfinished_backups_are_not_scrubbed(backup_hdd: Tuple[Path, BackupCatalog]) -> None:
+    location, catalog = backup_hdd
+    (location / BACKUPS[1]).rename(location / (BACKUPS[1] + ".unfinished"))
+    catalog.reconcile()
+    scrubber(location, catalog, bytes_per_session=10**6).scrub()
+    assert len(scrub_results(catalog)) == 1
+
+
+def test_aborted_session_keeps_the_cursor(backup_hdd: Tuple[Path, BackupCatalog]) -> None:
+    location, catalog = backup_hdd
+    session = scrubber(location, catalog, bytes_per_session=10**6)
+    session.terminate()
+    assert session.scrub() == ScrubCursor(BACKUPS[0], 0)
+    assert (location / CURSOR_FILE_NAME).exists()
+
+
+def test_result_in_catalog_entry() -> None:
+    result = ScrubResult(files_checked=2, corrupted=1, complete=True, examples=["corrupted: a"])
+    entry = CatalogEntry(name=BACKUPS[0], scrub=result)
+    assert CatalogEntry.from_json(entry.to_json()) == entry
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from typing import Dict, Tuple
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.backup_browser import BackupBrowser
+from base.logic.backup.backup_catalog import BackupCatalog, CatalogEntry
+from base.logic.backup.snapshot_size_index import SnapshotSizeIndex
+
+
+@pytest.fixture
+def backups(tmp_path: Path) -> Tuple[Path, Path, BackupCatalog]:
+    """two backups. Each has a file of its own, "linked" is hardlinked from the older into the newer one."""
+    older = tmp_path / "backup_2022_01_15-12_00_00"
+    newer = tmp_path / "backup_2022_01_16-12_00_00"
+    for backup in [older, newer]:
+        backup.mkdir()
+        (backup / "own").write_bytes(os.urandom(8192))
+    (older / "linked").write_bytes(os.urandom(16384))
+    os.link(older / "linked", newer / "linked")
+    return older, newer, BackupCatalog(tmp_path, tmp_path / "sd" / "backup_catalog.jsonl")
+
+
+def usage(*paths: Path) -> int:
+    return sum(os.stat(path).st_blocks * 512 for path in paths)
+
+
+def entries(catalog: BackupCatalog) -> Dict[str, CatalogEntry]:
+    return {entry.name: entry for entry in catalog.entries()}
+
+
+def test_rescan(backups: Tuple[Path, Path, BackupCatalog]) -> None:
+    older, _, catalog = backups
+    SnapshotSizeIndex(catalog).rescan(older)
+    entry = entries(catalog)[older.name]
+    assert entry.unique_bytes == usage(older, older / "own")
+    assert entry.shared_bytes == usage(older / "linked")
+
+
+def test_rescan_with_dedup_pool(backups: Tuple[Path, Path, BackupCatalog], tmp_path: Path) -> None:
+    older, _, catalog = backups
+    (tmp_path / ".dedup_pool").mkdir()
+    os.link(older / "own", tmp_path / ".dedup_pool" / "own")
+    stat = os.stat(older / "own")
+    SnapshotSizeIndex(catalog, {(stat.st_dev, stat.st_ino)}).rescan(older)
+    entry = entries(catalog)[older.name]
+    assert entry.unique_bytes == usage(older, older / "own")
+    assert entry.shared_bytes == usage(older / "linked")
+
+
+def test_backup_added_and_deleted(backups: Tuple[Path, Path, BackupCatalog]) -> None:
+    older, newer, catalog = backups
+    size_index = SnapshotSizeIndex(catalog)
+    catalog.update(older.name, unique_bytes=usage(older, older / "own", older / "linked"), shared_bytes=0)
+    size_index.on_backup_added(newer, older)
+    assert entries(catalog)[newer.name].unique_bytes == usage(newer, newer / "own")
+    assert entries(catalog)[newer.name].shared_bytes == usage(newer / "linked")
+    assert entries(catalog)[older.name].unique_bytes == usage(older, older / "own")
+    assert entries(catalog)[older.name].shared_bytes == usage(older / "linked")
+    size_index.on_backup_deleted(newer, [older])
+    assert entries(catalog)[older.name].unique_bytes == usage(older, older / "own", older / "linked")
+    assert entries(catalog)[older.name].shared_bytes == 0
+
+
+def test_index_with_sizes(backups: Tuple[Path, Path, BackupCatalog], tmp_path: Path) -> None:
+    older, newer, catalog = backups
+    SnapshotSizeIndex(catalog).rescan(newer)
+    patch_config(
+        BackupBrowser,
+        {"local_backup_target_location": tmp_path, "backup_catalog_sd_copy": tmp_path / "sd" / "backup_catalog.jsonl"},
+    )
+    assert BackupBrowser(from_sd_copy=True).index_with_sizes == [
+        {"path": str(newer), "unique_bytes": usage(newer, newer / "own"), "shared_bytes": usage(newer / "linked")},
+        {"path": str(older), "unique_bytes": None, "shared_bytes": None},
+    ]
+
+
+def test_pooled_inodes_are_read_once(tmp_path: Path, mocker: MockFixture) -> None:
+    patch_config(
+        BackupBrowser,
+        {"local_backup_target_location": tmp_path, "backup_catalog_sd_copy": tmp_path / "sd" / "backup_catalog.jsonl"},
+    )
+    pooled_inodes = mocker.patch("base.logic.backup.dedup_pool.DedupPool.pooled_inodes", return_value=set())
+    backup_browser = BackupBrowser(from_sd_copy=True)
+    assert backup_browser.size_index is backup_browser.size_index
+    pooled_inodes.assert_called_once_with()
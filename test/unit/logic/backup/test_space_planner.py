@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from base.logic.backup.space_planner import SpacePlanner
+
+FILE_SIZE = 64 * 1024
+
+
+def blocks_of(*paths: Path) -> int:
+    return sum(os.stat(path).st_blocks * 512 for path in paths)
+
+
+@pytest.fixture
+def snapshots(tmp_path: Path) -> List[Path]:
+    """three snapshots, oldest first. Each has one file of its own, "shared" is hardlinked into all of them."""
+    snapshots = [tmp_path / f"backup_2022_01_1{day}-12_00_00" for day in range(5, 8)]
+    for snapshot in snapshots:
+        snapshot.mkdir()
+        (snapshot / "own").write_bytes(os.urandom(FILE_SIZE))
+    (snapshots[0] / "shared").write_bytes(os.urandom(FILE_SIZE))
+    for snapshot in snapshots[1:]:
+        os.link(snapshots[0] / "shared", snapshot / "shared")
+    return snapshots
+
+
+def test_plan_counts_only_unique_bytes(snapshots: List[Path]) -> None:
+    plan = SpacePlanner(snapshots[:2]).plan(bytes_needed=1)
+    assert plan.backups == snapshots[:1]
+    assert plan.bytes_freed == blocks_of(snapshots[0], snapshots[0] / "own")
+    assert plan.sufficient
+
+
+def test_plan_frees_shared_file_with_its_last_link(snapshots: List[Path]) -> None:
+    plan = SpacePlanner(snapshots).plan(bytes_needed=3 * FILE_SIZE + FILE_SIZE // 2)
+    assert plan.backups == snapshots
+    assert plan.bytes_freed == blocks_of(*snapshots, *[snapshot / "own" for snapshot in snapshots]) + blocks_of(
+        snapshots[0] / "shared"
+    )
+    assert plan.sufficient
+
+
+def test_plan_insufficient(snapshots: List[Path]) -> None:
+    plan = SpacePlanner(snapshots[:2]).plan(bytes_needed=10 * FILE_SIZE)
+    assert plan.backups == snapshots[:2]
+    assert not plan.sufficient
+
+
+def test_plan_nothing_needed(snapshots: List[Path]) -> None:
+    plan = SpacePlanner(snapshots).plan(bytes_needed=0)
+    assert plan.backups == []
+    assert plan.sufficient
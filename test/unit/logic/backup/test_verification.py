@@ -0,0 +1,149 @@
+import os
+import shutil
+from pathlib import Path
+from test.utils.patch_config import patch_config
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.backup_catalog import CatalogEntry
+from base.logic.backup.checksum_manifest import ChecksumManifest
+from base.logic.backup.file_hash import RateLimiter
+from base.logic.backup.verification import Verification, VerificationResult
+
+
+def verification_config(**changes: Any) -> Dict[str, Any]:
+    config = {
+        "verification": "manifest",
+        "verification_workers": 2,
+        "verification_bytes_per_second": 0,
+        "verification_max_duration": 0,
+    }
+    config.update(changes)
+    return config
+
+
+@pytest.fixture
+def source_and_backup(tmp_path: Path) -> Tuple[Path, Path]:
+    patch_config(ChecksumManifest, {"manifest_workers": 2})
+    source = tmp_path / "source"
+    backup = tmp_path / "backups" / "backup_2022_01_16-12_00_00"
+    (source / "sub").mkdir(parents=True)
+    for index in range(5):
+        (source / "sub" / f"file{index}").write_bytes(f"content {index}".encode())
+    (source / "top").write_bytes(b"top level file")
+    backup.parent.mkdir()
+    shutil.copytree(source, backup, copy_function=shutil.copy2)
+    ChecksumManifest(backup.parent).create(backup)
+    return source, backup
+
+
+def test_manifest_ok(source_and_backup: Tuple[Path, Path]) -> None:
+    _, backup = source_and_backup
+    patch_config(Verification, verification_config())
+    result = Verification(backup, None).run()
+    assert result.ok
+    assert result.complete
+    assert result.files_checked == 6
+
+
+def test_manifest_findings(source_and_backup: Tuple[Path, Path]) -> None:
+    _, backup = source_and_backup
+    patch_config(Verification, verification_config())
+    (backup / "sub" / "file0").unlink()
+    stat = os.stat(backup / "sub" / "file1")
+    (backup / "sub" / "file1").write_bytes(b"content X")  # same size, different content
+    os.utime(backup / "sub" / "file1", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    (backup / "new").write_bytes(b"not in the manifest")
+    result = Verification(backup, None).run()
+    assert (result.missing, result.mismatched, result.extra) == (1, 1, 1)
+    assert set(result.examples) == {"missing: sub/file0", "mismatched: sub/file1", "extra: new"}
+    assert not result.ok
+
+
+def test_source(source_and_backup: Tuple[Path, Path]) -> None:
+    source, backup = source_and_backup
+    patch_config(Verification, verification_config(verification="source"))
+    (source / "sub" / "file2").write_bytes(b"changed after the synchronisation")
+    stat = os.stat(source / "top")
+    (backup / "top").write_bytes(b"bit rot in file")
+    os.utime(backup / "top", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    result = Verification(backup, source).run()
+    assert result.mode == "source"
+    assert (result.missing, result.mismatched, result.extra) == (0, 1, 0)
+    assert result.examples == ["mismatched: top"]
+
+
+def test_source_falls_back_to_manifest(source_and_backup: Tuple[Path, Path]) -> None:
+    _, backup = source_and_backup
+    patch_config(Verification, verification_config(verification="source"))
+    result = Verification(backup, None).run()
+    assert result.mode == "manifest"
+    assert result.ok
+
+
+def test_aborted_verification_is_incomplete(source_and_backup: Tuple[Path, Path]) -> None:
+    _, backup = source_and_backup
+    patch_config(Verification, verification_config())
+    verification = Verification(backup, None)
+    verification.terminate()
+    result = verification.run()
+    assert not result.complete
+    assert result.files_checked == 0
+
+
+@pytest.fixture
+def second_backup(source_and_backup: Tuple[Path, Path]) -> Path:
+    """hardlinked from the first backup, except for the changed sub/file3"""
+    _, first_backup = source_and_backup
+    backup = first_backup.with_name("backup_2022_01_17-12_00_00")
+    shutil.copytree(first_backup, backup, copy_function=os.link)
+    (backup / "sub" / "file3").unlink()
+    (backup / "sub" / "file3").write_bytes(b"changed content")
+    ChecksumManifest(backup.parent).create(backup)
+    return backup
+
+
+def test_hardlinked_files_are_checked_first(second_backup: Path, mocker: MockFixture) -> None:
+    patch_config(Verification, verification_config())
+    check = mocker.patch("base.logic.backup.verification.Verification._check")
+    Verification(second_backup, None).run()
+    assert check.call_args.args[0] == ["sub/file0", "sub/file1", "sub/file2", "sub/file4", "top", "sub/file3"]
+
+
+def test_cursor_rotates_through_the_unchanged_files(second_backup: Path, mocker: MockFixture) -> None:
+    patch_config(Verification, verification_config())
+    verification = Verification(second_backup, None)
+    verification._save_cursor("sub/file2")
+    check = mocker.patch("base.logic.backup.verification.Verification._check")
+    verification.run()
+    assert check.call_args.args[0] == ["sub/file4", "top", "sub/file0", "sub/file1", "sub/file2", "sub/file3"]
+
+
+def test_cursor_is_saved_where_the_verification_stopped(second_backup: Path, mocker: MockFixture) -> None:
+    def stop_after_three_files(paths: List[str], matches: Callable[[str], bool], result: VerificationResult) -> None:
+        result.files_checked = 3
+
+    patch_config(Verification, verification_config())
+    mocker.patch("base.logic.backup.verification.Verification._check", side_effect=stop_after_three_files)
+    verification = Verification(second_backup, None)
+    verification.run()
+    assert verification._load_cursor() == "sub/file2"
+    verification.run()
+    assert verification._load_cursor() == "sub/file0"
+
+
+def test_result_in_catalog_entry() -> None:
+    result = VerificationResult(mode="manifest", files_checked=3, missing=1, complete=True, examples=["missing: a"])
+    entry = CatalogEntry(name="backup_2022_01_16-12_00_00", verification=result)
+    assert CatalogEntry.from_json(entry.to_json()) == entry
+
+
+def test_rate_limiter(mocker: MockFixture) -> None:
+    mocker.patch("base.logic.backup.file_hash.monotonic", return_value=0.0)
+    sleep = mocker.patch("base.logic.backup.file_hash.sleep")
+    rate_limiter = RateLimiter(bytes_per_second=1000)
+    for _ in range(3):
+        rate_limiter.acquire(200)
+    assert [call.args[0] for call in sleep.call_args_list] == [pytest.approx(0.2), pytest.approx(0.4)]
@@ -0,0 +1,90 @@
+from datetime import datetime
+from test.utils.patch_config import patch_config
+from typing import Any, Optional
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.common.config import Config
+from base.common.exceptions import RemoteCommandError
+from base.logic.backup.synchronisation.bandwidth_controller import BandwidthController, HardwareReadings
+from base.logic.nas import Nas
+
+WINDOWS = [
+    {"start": "07:00", "end": "22:00", "kib_per_second": 20480},
+    {"start": "23:00", "end": "01:00", "kib_per_second": 4096},
+]
+
+
+def controller(readings: Optional[HardwareReadings] = None, **changes: Any) -> BandwidthController:
+    patch_config(Nas, {"ssh_host": "host", "ssh_user": "user"})
+    config = Config(
+        {
+            "bwlimit_windows": WINDOWS,
+            "bwlimit_adjust_interval": 0,
+            "bwlimit_reduction_factor": 0.5,
+            "bwlimit_minimum_kib_per_second": 1024,
+            "bwlimit_nas_load_threshold": 0.8,
+            "bwlimit_sbu_temperature_threshold": 55.0,
+            "bwlimit_input_current_threshold": 2.0,
+            **changes,
+        }
+    )
+    return BandwidthController(config, (lambda: readings) if readings is not None else None)
+
+
+@pytest.mark.parametrize(
+    "hour, minute, limit", [(12, 0, 20480), (7, 0, 20480), (22, 0, 0), (23, 30, 4096), (0, 59, 4096), (3, 0, 0)]
+)
+def test_window_limit(hour: int, minute: int, limit: int) -> None:
+    assert controller()._window_limit(datetime(2022, 1, 16, hour, minute)) == limit
+
+
+def test_adjust_is_not_due(mocker: MockFixture) -> None:
+    nas_load = mocker.patch("base.logic.nas.Nas.load", return_value=4.0)
+    assert not controller(bwlimit_adjust_interval=300).adjust(bytes_per_second=0)
+    nas_load.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "nas_load, readings, limit",
+    [
+        (0.5, HardwareReadings(sbu_temperature=40, input_current=1.0), 20480),
+        (1.5, HardwareReadings(sbu_temperature=40, input_current=1.0), 10240),
+        (1.5, HardwareReadings(sbu_temperature=60, input_current=1.0), 5120),
+        (0.5, HardwareReadings(sbu_temperature=None, input_current=2.5), 10240),
+    ],
+)
+def test_measured_limit(mocker: MockFixture, nas_load: float, readings: HardwareReadings, limit: int) -> None:
+    mocker.patch("base.logic.nas.Nas.load", return_value=nas_load)
+    bandwidth = controller(readings, bwlimit_windows=[{"start": "00:00", "end": "00:00", "kib_per_second": 20480}])
+    assert bandwidth._measured_limit(bytes_per_second=0) == limit
+
+
+def test_unlimited_transfer_is_reduced_from_the_current_rate(mocker: MockFixture) -> None:
+    mocker.patch("base.logic.nas.Nas.load", return_value=1.5)
+    bandwidth = controller(bwlimit_windows=[])
+    assert bandwidth.limit == 0
+    assert bandwidth.adjust(bytes_per_second=8 * 1024 * 1024)
+    assert bandwidth.limit == 4096
+    mocker.patch("base.logic.nas.Nas.load", return_value=0.1)
+    assert bandwidth.adjust(bytes_per_second=4 * 1024 * 1024)
+    assert bandwidth.limit == 0
+
+
+def test_small_changes_dont_restart(mocker: MockFixture) -> None:
+    mocker.patch("base.logic.nas.Nas.load", return_value=1.5)
+    bandwidth = controller(bwlimit_windows=[], bwlimit_reduction_factor=0.9)
+    assert bandwidth.adjust(bytes_per_second=10 * 1024 * 1024)
+    assert bandwidth.limit == 9216
+    assert not bandwidth.adjust(bytes_per_second=9 * 1024 * 1024)
+    assert bandwidth.limit == 9216
+
+
+def test_unreachable_nas_keeps_the_limit(mocker: MockFixture) -> None:
+    mocker.patch("base.logic.nas.Nas.load", return_value=1.5)
+    bandwidth = controller(bwlimit_windows=[])
+    assert bandwidth.adjust(bytes_per_second=8 * 1024 * 1024)
+    mocker.patch("base.logic.nas.Nas.load", side_effect=RemoteCommandError("unreachable"))
+    assert not bandwidth.adjust(bytes_per_second=1024**2)
+    assert bandwidth.limit == 4096
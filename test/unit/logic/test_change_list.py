@@ -0,0 +1,99 @@
+from io import BytesIO
+from pathlib import Path
+from test.utils.patch_config import patch_multiple_configs
+from typing import Generator, List
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.synchronisation.change_list import ChangeList, parse_change_list
+from base.logic.backup.synchronisation.rsync_command import RsyncCommand
+from base.logic.backup.synchronisation.sync import Sync
+
+
+@pytest.fixture
+def sync() -> Generator[Sync, None, None]:
+    patch_multiple_configs(
+        Sync,
+        {
+            "sync.json": {"change_list_max_age": 600, "bwlimit_windows": [], "bwlimit_adjust_interval": 300},
+            "nas.json": {},
+        },
+    )
+    patch_multiple_configs(
+        RsyncCommand, {"sync.json": {"protocol": "smb", "partial_dir": ".rsync-partial"}, "nas.json": {}}
+    )
+    yield Sync(local_target_location=Path("/target"), source_location=Path("/source"))
+
+
+def test_parse_change_list() -> None:
+    dry_run_output = [
+        b"receiving incremental file list",
+        b"created directory /target/x",
+        b"BaSe-item:del.:photos/2020/IMG_0815.jpg",
+        b"BaSe-item:recv:./",
+        b"BaSe-item:recv:photos/2021/IMG_0001.jpg",
+        b"BaSe-item:recv:notes: 2021.txt",
+        b"      1,024 100%    0.00kB/s    0:00:00 (xfr#1, to-chk=0/3)",
+        b"",
+        b"Number of files: 3 (reg: 1, dir: 2)",
+        b"File list size: 0",
+        b"File list generation time: 0.001 seconds",
+        b"Total transferred file size: 1,024 bytes",
+        b"sent 123 bytes  received 456 bytes  1,158.00 bytes/sec",
+        b"total size is 1,024  speedup is 1.77 (DRY RUN)",
+    ]
+    change_list = parse_change_list(dry_run_output)
+    assert change_list.paths == [
+        b"photos/2020/IMG_0815.jpg",
+        b"./",
+        b"photos/2021/IMG_0001.jpg",
+        b"notes: 2021.txt",
+    ]
+
+
+def test_write_change_list() -> None:
+    file = BytesIO()
+    ChangeList([b"a", b"b/c d"]).write(file)
+    assert file.getvalue() == b"a\nb/c d\n"
+
+
+def test_change_list_is_handed_to_rsync(sync: Sync) -> None:
+    sync.update_change_list(ChangeList([b"new_file"]))
+    files_from = sync._write_change_list()
+    assert files_from is not None
+    sync._files_from = files_from
+    assert files_from.read_bytes() == b"new_file\n"
+    assert f"--files-from={files_from}" in sync._get_command()
+    assert "--delete " not in sync._get_command()
+    sync._remove_change_list()
+    assert not files_from.exists()
+
+
+def test_outdated_change_list_is_not_used(sync: Sync) -> None:
+    sync.update_change_list(ChangeList([b"new_file"], creation_time=0))
+    assert sync._write_change_list() is None
+
+
+@pytest.mark.parametrize("exit_code, expected_paths", [(0, [Path("new_file")]), (23, [Path("new_file"), Path("all")])])
+def test_fallback_to_full_scan(sync: Sync, mocker: MockFixture, exit_code: int, expected_paths: List[Path]) -> None:
+    def command() -> str:
+        return "echo new_file; exit " + str(exit_code) if sync._files_from is not None else "echo all"
+
+    mocker.patch("base.logic.backup.synchronisation.sync.Sync._get_command", side_effect=command)
+    sync.update_change_list(ChangeList([b"new_file"]))
+    with sync as output_generator:
+        paths = [status.path for status in output_generator]
+    assert paths == expected_paths
+    assert sync._files_from is None
+
+
+def test_restart_with_new_bandwidth_limit(sync: Sync, mocker: MockFixture) -> None:
+    commands = iter(["echo first; sleep 10; echo never", "echo second"])
+    mocker.patch("base.logic.backup.synchronisation.sync.Sync._get_command", side_effect=lambda: next(commands))
+    mocker.patch(
+        "base.logic.backup.synchronisation.bandwidth_controller.BandwidthController.adjust", side_effect=[True, False]
+    )
+    with sync as output_generator:
+        paths = [status.path for status in output_generator]
+    assert paths == [Path("first"), Path("second")]
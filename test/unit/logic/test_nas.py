@@ -8,14 +8,14 @@ import pytest
 from pytest_mock import MockFixture
 
 import base.logic.nas
-from base.common.exceptions import NasSmbConfError
+from base.common.exceptions import NasSmbConfError, RemoteCommandError
 from base.common.ssh_interface import SSHInterface
 from base.logic.nas import Nas
 
 
 @pytest.fixture
-def nas() -> Generator[Nas, None, None]:
-    patch_config(Nas, {"ssh_host": "host", "ssh_user": "user"})
+def nas(tmp_path: Path) -> Generator[Nas, None, None]:
+    patch_config(Nas, {"ssh_host": "host", "ssh_user": "user", "share_root_cache": tmp_path / "share_roots.json"})
     yield Nas()
 
 
@@ -23,14 +23,39 @@ def test_root_of_share(nas: Nas, mocker: MockFixture) -> None:
     mocked_close = mocker.patch("paramiko.SSHClient.close")
     mocked_sshi_connect = mocker.patch("base.common.ssh_interface.SSHInterface.connect")
     mocked_get_smb_conf = mocker.patch("base.logic.nas.Nas._get_smb_conf", return_value="config_parser")
-    mocked_extract_root_of_share = mocker.patch("base.logic.nas.Nas._extract_root_of_share")
+    mocked_share_roots = mocker.patch("base.logic.nas.Nas._share_roots", return_value={"share_name": "/root"})
+    mocker.patch("base.logic.nas.Nas._smb_conf_signature", return_value=None)
     share_name = "share_name"
-    nas.root_of_share(share_name)
+    assert nas.root_of_share(share_name) == Path("/root")
     sshi = SSHInterface()
     assert mocked_close.assert_called_once
     assert mocked_sshi_connect.called_once_with(nas._config["ssh_host"], nas._config["ssh_user"])
     assert mocked_get_smb_conf.called_once_with(sshi)
-    assert mocked_extract_root_of_share.called_once("config_parser", share_name)
+    mocked_share_roots.assert_called_once_with("config_parser")
+
+
+def test_root_of_share_is_cached(nas: Nas, mocker: MockFixture) -> None:
+    def run_and_raise(command: str) -> str:
+        return "1642334400 512\n" if command.startswith("stat") else "[Backup]\npath=/srv/backup\n[global]\n"
+
+    mocker.patch("paramiko.SSHClient.close")
+    mocker.patch("base.common.ssh_interface.SSHInterface.connect")
+    mocked_run_and_raise = mocker.patch(
+        "base.common.ssh_interface.SSHInterface.run_and_raise", side_effect=run_and_raise
+    )
+    assert nas.root_of_share() == Path("/srv/backup")
+    assert nas.root_of_share() == Path("/srv/backup")
+    commands = [call.args[0] for call in mocked_run_and_raise.call_args_list]
+    assert [command.split()[0] for command in commands] == ["stat", "cat", "stat"]
+    with pytest.raises(NasSmbConfError):
+        nas.root_of_share("InvalidOne")
+
+
+def test_changed_smb_conf_is_downloaded_again(nas: Nas) -> None:
+    nas._cache_share_roots("1642334400 512", {"Backup": "/srv/backup"})
+    assert nas._cached_share_roots("1642334400 512") == {"Backup": "/srv/backup"}
+    assert nas._cached_share_roots("1642334401 512") is None
+    assert nas._cached_share_roots(None) is None
 
 
 def test_get_smb_conf(mocker: MockFixture) -> None:
@@ -63,5 +88,32 @@ def test_extract_root_of_share(share_name: str, error: Optional[Type[NasSmbConfE
     share_path = "/some/path"
     config_parser = ConfigParser()
     config_parser.read_dict({"Backup": {"path": share_path}})
-    root_of_share = Nas._extract_root_of_share(config_parser, share_name)
+    root_of_share = Nas._extract_root_of_share(Nas._share_roots(config_parser), share_name)
     assert root_of_share == Path(share_path)
+
+
+@pytest.mark.parametrize(
+    "output, load", [("2.00 1.50 1.00 1/467 12345\n4\n", 0.5), ("0.40 0.30 0.20 1/90 42\n1\n", 0.4)]
+)
+def test_load(nas: Nas, mocker: MockFixture, output: str, load: float) -> None:
+    mocker.patch("paramiko.SSHClient.close")
+    mocker.patch("base.common.ssh_interface.SSHInterface.connect", return_value="Established")
+    mocker.patch("base.common.ssh_interface.SSHInterface.run_and_raise", return_value=output)
+    assert nas.load() == pytest.approx(load)
+
+
+def test_load_with_unexpected_output(nas: Nas, mocker: MockFixture) -> None:
+    mocker.patch("paramiko.SSHClient.close")
+    mocker.patch("base.common.ssh_interface.SSHInterface.connect", return_value="Established")
+    mocker.patch("base.common.ssh_interface.SSHInterface.run_and_raise", return_value="no loadavg")
+    with pytest.raises(RemoteCommandError):
+        nas.load()
+
+
+def test_load_without_connection(nas: Nas, mocker: MockFixture) -> None:
+    mocker.patch("paramiko.SSHClient.close")
+    mocker.patch("base.common.ssh_interface.SSHInterface.connect", return_value="timed out")
+    run_and_raise = mocker.patch("base.common.ssh_interface.SSHInterface.run_and_raise")
+    with pytest.raises(RemoteCommandError):
+        nas.load()
+    run_and_raise.assert_not_called()
@@ -0,0 +1,99 @@
+import re
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, List, Optional, Pattern, TypeVar
+
+import pytest
+
+from base.logic.backup.synchronisation.rsync_line_classifier import LineType, str_classifier
+from base.logic.backup.synchronisation.rsync_patterns import Patterns
+from base.logic.backup.synchronisation.sync import parse_line_to_status
+from base.logic.backup.synchronisation.sync_status import SyncStatus
+
+RECORDED_OUTPUT = Path("test/utils/rsync_output/verbose_transfer.txt")
+REPETITIONS = 2000
+
+T = TypeVar("T", str, bytes)
+
+
+def parse_line_to_status_with_regex_chain(line: str, status: SyncStatus) -> SyncStatus:
+    """the former parser, which tries the patterns one after the other. Serves as reference."""
+    if not line:
+        pass
+    elif line == "receiving incremental file list":
+        pass
+    elif re.fullmatch(Patterns.file_stats, line):
+        match = re.search(Patterns.percentage, line)
+        assert isinstance(match, re.Match)
+        status.progress = float(match[0][:-1]) / 100
+    elif re.fullmatch(Patterns.end_stats_a, line):
+        status.path = Path()
+    elif re.fullmatch(Patterns.end_stats_b, line):
+        status.finished = True
+    elif re.fullmatch(Patterns.path, line):
+        status.path = Path(line)
+    return status
+
+
+def classify_with_regex_chain(line: str) -> Optional[Pattern]:
+    """the classification part of the former parser"""
+    for pattern in [Patterns.file_stats, Patterns.end_stats_a, Patterns.end_stats_b, Patterns.path]:
+        if re.fullmatch(pattern, line):
+            return pattern
+    return None
+
+
+def recorded_lines() -> List[bytes]:
+    with open(RECORDED_OUTPUT, "rb") as recording:
+        return [line.rstrip(b"\n") for line in recording]
+
+
+def lines_per_second(parse: Callable[[T, SyncStatus], SyncStatus], lines: List[T]) -> float:
+    status = SyncStatus()
+    time_start = perf_counter()
+    for _ in range(REPETITIONS):
+        for line in lines:
+            status = parse(line, status)
+    return len(lines) * REPETITIONS / (perf_counter() - time_start)
+
+
+def lines_classified_per_second(classify: Callable[[str], object], lines: List[str]) -> float:
+    time_start = perf_counter()
+    for _ in range(REPETITIONS):
+        for line in lines:
+            classify(line)
+    return len(lines) * REPETITIONS / (perf_counter() - time_start)
+
+
+def test_classifier_agrees_with_regex_chain() -> None:
+    """apart from the --stats entries, which the regex chain took for paths"""
+    for line in [line.decode() for line in recorded_lines()]:
+        status = parse_line_to_status(line, SyncStatus())
+        reference = parse_line_to_status_with_regex_chain(line, SyncStatus())
+        if str_classifier.classify(line)[0] != LineType.STATS_ENTRY:
+            assert (status.path, status.progress, status.finished) == (
+                reference.path,
+                reference.progress,
+                reference.finished,
+            )
+
+
+@pytest.mark.slow
+def test_benchmark_rsync_output_parser() -> None:
+    byte_lines = recorded_lines()
+    str_lines = [line.decode() for line in byte_lines]
+    classification = {
+        "regex chain": lines_classified_per_second(classify_with_regex_chain, str_lines),
+        "classifier": lines_classified_per_second(str_classifier.classify, str_lines),
+    }
+    parsing = {
+        "regex chain (str)": lines_per_second(parse_line_to_status_with_regex_chain, str_lines),
+        "parse_line_to_status (str)": lines_per_second(parse_line_to_status, str_lines),
+        "parse_line_to_status (bytes)": lines_per_second(parse_line_to_status, byte_lines),
+    }
+    for name, result in classification.items():
+        print(f"classification with {name}: {result:,.0f} lines/s")
+    for name, result in parsing.items():
+        print(f"parsing with {name}: {result:,.0f} lines/s")
+    print("note: parse_line_to_status extracts the transfer metrics as well, the regex chain only the progress")
+    assert classification["classifier"] > classification["regex chain"]
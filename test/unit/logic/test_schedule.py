@@ -136,3 +136,13 @@ def test_backup_seconds(schedule: Schedule, mocker: MockFixture) -> None:
     )
     assert schedule.next_backup_seconds == seconds_to_return
     assert mocked_next_backup.called_once_with(schedule._config)
+
+
+@pytest.mark.parametrize("interval_minutes, entered", [(60, True), (0, False)])
+def test_on_schedule_scrub(schedule: Schedule, mocker: MockFixture, interval_minutes: int, entered: bool) -> None:
+    schedule._config["scrub_interval_minutes"] = interval_minutes
+    mocked_enter = mocker.patch("sched.scheduler.enter", return_value="job")
+    schedule.on_schedule_scrub()
+    assert mocked_enter.called == entered
+    if entered:
+        mocked_enter.assert_called_once_with(interval_minutes * 60, 3, schedule._invoke_scrub)
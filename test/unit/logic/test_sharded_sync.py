@@ -0,0 +1,156 @@
+import os
+from datetime import timedelta
+from pathlib import Path
+from test.utils.patch_config import patch_multiple_configs
+from time import sleep
+from typing import Generator, List, Optional
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.synchronisation.sharded_sync import Shard, ShardedSync, aggregate_status, parse_directory_listing
+from base.logic.backup.synchronisation.sync import Sync
+from base.logic.backup.synchronisation.sync_status import SyncStatus, SyncSummary
+
+
+@pytest.fixture
+def sharded_sync() -> Generator[ShardedSync, None, None]:
+    patch_multiple_configs(
+        Sync, {"sync.json": {"sync_workers": 2, "bwlimit_windows": [], "bwlimit_adjust_interval": 300}, "nas.json": {}}
+    )
+    yield ShardedSync(local_target_location=Path("/target"), source_location=Path("/source"))
+
+
+def test_parse_directory_listing() -> None:
+    listing = [
+        "drwxr-xr-x          4,096 2022/01/15 12:00:00 .",
+        "drwxr-xr-x          4,096 2022/01/15 12:00:00 photos",
+        "drwxr-xr-x          4,096 2022/01/15 12:00:00 my documents",
+        "-rw-r--r--          1,024 2022/01/15 12:00:00 file.txt",
+        "lrwxrwxrwx              5 2022/01/15 12:00:00 link -> photos",
+        "",
+    ]
+    assert parse_directory_listing(listing) == ["photos", "my documents"]
+
+
+@pytest.mark.parametrize("link_dest", [None, Path("/target/backup_old")])
+def test_shards(sharded_sync: ShardedSync, mocker: MockFixture, link_dest: Optional[Path]) -> None:
+    mocker.patch(
+        "base.logic.backup.synchronisation.sharded_sync.ShardedSync._list_top_level_directories",
+        return_value=["photos", "my documents", "music"],
+    )
+    sharded_sync.update_link_dest(link_dest)
+    shards = sharded_sync._shards()
+    assert shards[0] == Shard(Path("/source"), Path("/target"), link_dest, ["/photos/", "/music/"])
+    assert [shard.source for shard in shards[1:]] == [Path("/source/photos"), Path("/source/music")]
+    assert [shard.target for shard in shards[1:]] == [Path("/target/photos"), Path("/target/music")]
+    if link_dest is not None:
+        assert shards[1].link_dest == link_dest / "photos"
+    assert all(not shard.exclude for shard in shards[1:])
+
+
+def test_aggregate_status() -> None:
+    shard_states = {
+        0: SyncStatus(progress=0.5),
+        1: SyncStatus(progress=0.3, finished=True),
+        2: SyncStatus(progress=0.0, error=True),
+    }
+    status = aggregate_status(shard_states, Path("current"), amount_shards=4, finished_shards=1)
+    assert status.progress == pytest.approx((0.5 + 1.0 + 0.0 + 0.0) / 4)
+    assert status.path == Path("current")
+    assert status.error
+    assert not status.finished
+
+
+def test_aggregate_status_metrics() -> None:
+    shard_states = {
+        0: SyncStatus(bytes_transferred=100, bytes_per_second=10.0, files_transferred=2, eta=timedelta(seconds=5)),
+        1: SyncStatus(
+            bytes_transferred=50,
+            bytes_per_second=5.0,
+            files_transferred=1,
+            finished=True,
+            summary=SyncSummary(total_file_size=300, total_bytes_sent=50, total_bytes_received=100, speedup=9.0),
+        ),
+        2: SyncStatus(
+            bytes_transferred=0,
+            files_remaining=4,
+            eta=timedelta(seconds=8),
+            summary=SyncSummary(total_file_size=600, total_bytes_sent=50, total_bytes_received=100, speedup=9.0),
+        ),
+    }
+    status = aggregate_status(shard_states, Path(), amount_shards=3, finished_shards=1)
+    assert status.bytes_transferred == 150
+    assert status.bytes_per_second == 10.0
+    assert status.files_transferred == 3
+    assert status.files_remaining == 4
+    assert status.eta == timedelta(seconds=8)
+    assert status.summary is not None
+    assert status.summary.total_file_size == 900
+    assert status.summary.speedup == 3.0
+
+
+def test_sync_shards(sharded_sync: ShardedSync, mocker: MockFixture) -> None:
+    shards = [Shard(Path(f"/source/{index}"), Path(f"/target/{index}")) for index in range(3)]
+    mocker.patch("base.logic.backup.synchronisation.sharded_sync.ShardedSync._shards", return_value=shards)
+    mocker.patch(
+        "base.logic.backup.synchronisation.sharded_sync.ShardedSync._command_for",
+        side_effect=lambda shard: f"printf '{shard.source}/file\\n      1,024  50%%    1.00MB/s    0:00:01\\n'",
+    )
+    with sharded_sync as output_generator:
+        states: List[SyncStatus] = list(output_generator)
+    assert states[-1].finished
+    assert states[-1].progress == 1.0
+    assert not states[-1].error
+    assert not any(status.finished for status in states[:-1])
+    assert {status.path for status in states} >= {Path(f"/source/{index}/file") for index in range(3)}
+
+
+def test_failing_shard_is_an_error(sharded_sync: ShardedSync, mocker: MockFixture) -> None:
+    mocker.patch(
+        "base.logic.backup.synchronisation.sharded_sync.ShardedSync._shards",
+        return_value=[Shard(Path("/source"), Path("/target"))],
+    )
+    mocker.patch("base.logic.backup.synchronisation.sharded_sync.ShardedSync._command_for", return_value="exit 23")
+    with sharded_sync as output_generator:
+        states = list(output_generator)
+    assert states[-1].error
+
+
+def test_failing_worker_finishes_its_shard(sharded_sync: ShardedSync, mocker: MockFixture) -> None:
+    shards = [Shard(Path(f"/source/{index}"), Path(f"/target/{index}")) for index in range(3)]
+    mocker.patch("base.logic.backup.synchronisation.sharded_sync.ShardedSync._shards", return_value=shards)
+    mocker.patch(
+        "base.logic.backup.synchronisation.sharded_sync.ShardedSync._command_for", side_effect=[OSError, "true", "true"]
+    )
+    with sharded_sync as output_generator:
+        states = list(output_generator)
+    assert states[-1].finished
+    assert states[-1].error
+
+
+def test_list_top_level_directories_with_undecodable_names(sharded_sync: ShardedSync, mocker: MockFixture) -> None:
+    patched_rsync_command = mocker.patch("base.logic.backup.synchronisation.sharded_sync.RsyncCommand")
+    patched_rsync_command.return_value.compose_list_directory.return_value = (
+        "printf 'drwxr-xr-x 4,096 2022/01/15 12:00:00 caf\\351\\ndrwxr-xr-x 4,096 2022/01/15 12:00:00 photos\\n'"
+    )
+    assert sharded_sync._list_top_level_directories() == [os.fsdecode(b"caf\xe9"), "photos"]
+
+
+def test_pid_before_start(sharded_sync: ShardedSync) -> None:
+    with pytest.raises(RuntimeError):
+        sharded_sync.pid
+
+
+def test_terminate(sharded_sync: ShardedSync, mocker: MockFixture) -> None:
+    shards = [Shard(Path(f"/source/{index}"), Path(f"/target/{index}")) for index in range(4)]
+    mocker.patch("base.logic.backup.synchronisation.sharded_sync.ShardedSync._shards", return_value=shards)
+    mocker.patch("base.logic.backup.synchronisation.sharded_sync.ShardedSync._command_for", return_value="sleep 10")
+    with sharded_sync as output_generator:
+        sleep(0.1)
+        sharded_sync.terminate()
+        states = list(output_generator)
+    assert len(sharded_sync._processes) == 2
+    assert all(process.poll() is not None for process in sharded_sync._processes)
+    assert states[-1].finished
+    assert states[-1].error
@@ -0,0 +1,69 @@
+from pathlib import Path
+from subprocess import PIPE, Popen
+from test.utils.patch_config import patch_multiple_configs
+from time import process_time
+from typing import List
+
+import pytest
+
+from base.logic.backup.synchronisation.sync import Sync, read_lines
+from base.logic.backup.synchronisation.sync_status import SyncStatus, SyncSummary
+
+RECORDED_OUTPUT = Path("test/utils/rsync_output/verbose_transfer.txt")
+MEGABYTE = 1024 * 1024
+
+
+def lines_of(command: str, chunk_size: int = 1024) -> List[bytes]:
+    process = Popen(command, shell=True, stdout=PIPE, bufsize=0)
+    assert process.stdout is not None
+    lines = list(read_lines(process.stdout, chunk_size=chunk_size))
+    process.wait()
+    return lines
+
+
+def sync_running(command: str) -> Sync:
+    patch_multiple_configs(Sync, {"sync.json": {}, "nas.json": {}})
+    sync = Sync(local_target_location=Path(), source_location=Path())
+    sync._process = Sync._start_process(command)
+    return sync
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1024])
+def test_read_lines(chunk_size: int) -> None:
+    assert lines_of(r"printf 'file\n  10%%\r  20%%\r\nend  \n\nlast'", chunk_size) == [
+        b"file",
+        b"  10%",
+        b"  20%",
+        b"end",
+        b"",
+        b"last",
+    ]
+
+
+def test_read_lines_on_empty_output() -> None:
+    assert lines_of("true") == []
+
+
+@pytest.mark.slow
+def test_output_generator_does_not_spin_while_rsync_is_quiet() -> None:
+    sync = sync_running("sleep 0.5; echo 'total size is 1,024  speedup is 1.00'")
+    cpu_time_start = process_time()
+    statuses = list(sync._output_generator())
+    assert process_time() - cpu_time_start < 0.05
+    assert statuses == [SyncStatus(finished=True, summary=SyncSummary(speedup=1.0))]
+
+
+@pytest.mark.slow
+def test_cpu_time_per_megabyte_of_rsync_output(tmp_path: Path) -> None:
+    output = tmp_path / "rsync_output.txt"
+    recording = RECORDED_OUTPUT.read_bytes()
+    output.write_bytes(recording * (16 * MEGABYTE // len(recording)))
+    megabytes = output.stat().st_size / MEGABYTE
+    sync = sync_running(f"cat {output}")
+    cpu_time_start = process_time()
+    for status in sync._output_generator():
+        pass
+    cpu_time_per_megabyte = (process_time() - cpu_time_start) / megabytes
+    print(f"{cpu_time_per_megabyte * 1000:.1f}ms CPU time per MB of rsync output")
+    assert status.finished
+    assert cpu_time_per_megabyte < 0.5
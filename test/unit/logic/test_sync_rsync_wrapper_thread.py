@@ -1,5 +1,7 @@
 import logging
 from pathlib import Path
+from test.utils.backup_environment.virtual_backup_environment import UNLIMITED_BANDWIDTH
+from test.utils.patch_config import patch_multiple_configs
 from time import sleep
 from types import TracebackType
 from typing import Generator, Optional, Type
@@ -12,18 +14,20 @@ from signalslot import Signal
 from base.common.config import BoundConfig
 from base.logic.backup.backup import Backup
 from base.logic.backup.synchronisation.sync import Sync
+from base.logic.backup.synchronisation.sync_status import SyncStatus, SyncSummary
 
 
 class SyncMock(Sync):
     def __init__(self) -> None:
         self._pid: int = 1234
+        self._terminated = False
 
     @property
     def pid(self) -> int:
         return self._pid
 
-    def __enter__(self) -> Generator[str, None, None]:  # type: ignore  # TODO: fix SyncMock
-        generator = (i for i in ["first", "second"])
+    def __enter__(self) -> Generator[SyncStatus, None, None]:
+        generator = (SyncStatus(path=Path(i)) for i in ["first", "second"])
         yield from generator
 
     def __exit__(
@@ -44,8 +48,10 @@ class SyncMockLoooongLoop(Sync):
     def pid(self) -> int:
         return self._pid
 
-    def __enter__(self) -> Generator[int, None, None]:  # type: ignore  # TODO: fix SyncMock
-        generator = (i for i in range(100000))  # long enough so the terminate can be called while busy
+    def __enter__(self) -> Generator[SyncStatus, None, None]:
+        generator = (
+            SyncStatus(files_transferred=i) for i in range(100000)
+        )  # long enough so the terminate can be called while busy
         while not self._exit_flag:
             yield next(generator)
             sleep(0.1)
@@ -66,10 +72,19 @@ def on_backup_finished(*args, **kwargs):  # type: ignore
     ...
 
 
+def sync_running(target: Path, command: str) -> Sync:
+    """a real Sync, running the command instead of rsync"""
+    patch_multiple_configs(Sync, {"sync.json": UNLIMITED_BANDWIDTH, "nas.json": {}})
+    sync = Sync(target, target)
+    sync._get_command = lambda: command  # type: ignore
+    return sync
+
+
 @pytest.fixture
 def rsync_wrapper_thread(mocker: MockFixture) -> Generator[Backup, None, None]:
     BoundConfig.set_config_base_path(Path().cwd() / "base/config")
     mocker.patch("signalslot.Signal.emit")
+    mocker.patch("base.logic.backup.synchronisation.transport_tuner.TransportTuner.tune_if_due")
     rswt = Backup(on_backup_finished)
     # monkeypatch.setattr(sync.RsyncWrapperThread, '_ssh_rsync', SshRsyncMock(["first", "second"]))
     rswt._sync = SyncMock()
@@ -80,6 +95,7 @@ def rsync_wrapper_thread(mocker: MockFixture) -> Generator[Backup, None, None]:
 def rsync_wrapper_thread_loooong_loop(mocker: MockFixture) -> Generator[Backup, None, None]:
     BoundConfig.set_config_base_path(Path().cwd() / "base/config")
     mocker.patch("signalslot.Signal.emit")
+    mocker.patch("base.logic.backup.synchronisation.transport_tuner.TransportTuner.tune_if_due")
     rswt = Backup(on_backup_finished)
     rswt._sync = SyncMockLoooongLoop()
     yield rswt
@@ -93,8 +109,50 @@ class TestRsyncWrapperThread:
         assert "first" in caplog.text
         assert "second" in caplog.text
         assert "Backup finished!" in caplog.text
+        assert "speedup is" not in caplog.text
+        assert Signal.emit.called_once_with()
+
+    def test_log_summary(self, rsync_wrapper_thread: Backup, caplog: LogCaptureFixture, mocker: MockFixture) -> None:
+        summary = SyncSummary(total_file_size=2048, total_transferred_file_size=1024, bytes_per_second=512.0)
+        mocker.patch.object(SyncMock, "__enter__", return_value=iter([SyncStatus(finished=True, summary=summary)]))
+        with caplog.at_level(logging.INFO):
+            rsync_wrapper_thread.start()
+            rsync_wrapper_thread.join()
+        assert "transferred 1024 of 2048 bytes (0 files) at 512 bytes/s" in caplog.text
         assert Signal.emit.called_once_with()
 
+    @pytest.mark.parametrize(
+        "output, completed",
+        [
+            ("total size is 1,024  speedup is 1.00", True),
+            ('rsync: link_stat "/mnt/hdd/none" failed: No such file or directory (2)', False),
+            ("", False),
+        ],
+    )
+    def test_completed(
+        self, rsync_wrapper_thread: Backup, mocker: MockFixture, tmp_path: Path, output: str, completed: bool
+    ) -> None:
+        """a sync that failed, e.g. because the source wasn't found, isn't finalised"""
+        rsync_wrapper_thread._sync = sync_running(tmp_path, f"echo '{output}'")
+        post_process = mocker.patch.object(Backup, "_post_process")
+        rsync_wrapper_thread.start()
+        rsync_wrapper_thread.join()
+        assert not rsync_wrapper_thread._sync.terminated
+        assert rsync_wrapper_thread.completed == completed
+        assert post_process.called == completed
+
+    def test_terminated_sync_is_not_completed(self, rsync_wrapper_thread: Backup, tmp_path: Path) -> None:
+        sync = sync_running(tmp_path, "sleep 10; echo 'total size is 1,024  speedup is 1.00'")
+        rsync_wrapper_thread._sync = sync
+        rsync_wrapper_thread.start()
+        for _ in range(500):
+            if sync._process is not None:
+                break
+            sleep(0.01)
+        rsync_wrapper_thread.terminate()
+        rsync_wrapper_thread.join()
+        assert not rsync_wrapper_thread.completed
+
     def test_terminate_rsync_wrapper_thread(self, rsync_wrapper_thread_loooong_loop: Backup) -> None:
         rsync_wrapper_thread_loooong_loop.start()
         assert rsync_wrapper_thread_loooong_loop.running
@@ -102,5 +160,4 @@ class TestRsyncWrapperThread:
         rsync_wrapper_thread_loooong_loop.join()
         assert not rsync_wrapper_thread_loooong_loop.running
 
-    def test_get_pid(self) -> None:
-        ...  # pid cannot be read, since "isinstance(self._ssh_rsync, SshRsync)" will fail
+    def test_get_pid(self) -> None: ...  # pid cannot be read, since "isinstance(self._ssh_rsync, SshRsync)" will fail
@@ -1,8 +1,9 @@
+from datetime import timedelta
 from pathlib import Path
 from subprocess import PIPE, Popen
 from test.utils.patch_config import patch_multiple_configs
-from time import sleep
-from typing import Generator
+from time import sleep, time
+from typing import AnyStr, Callable, Generator
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
@@ -10,7 +11,8 @@ from pytest_mock import MockFixture
 
 from base.common.config import BoundConfig
 from base.logic.backup.synchronisation.rsync_command import RsyncCommand
-from base.logic.backup.synchronisation.sync import Sync
+from base.logic.backup.synchronisation.sync import Sync, parse_line_to_status
+from base.logic.backup.synchronisation.sync_status import SyncStatus, SyncSummary
 
 
 def patch_rsync_command_configs() -> None:
@@ -18,17 +20,27 @@ def patch_rsync_command_configs() -> None:
         RsyncCommand,
         {
             "nas.json": {"ssh_host": "192.168.178.64", "ssh_port": 22, "ssh_user": "root"},
-            "sync.json": {"protocol": "ssh", "ssh_keyfile_path": "/home/base/.ssh/id_rsa"},
+            "sync.json": {
+                "protocol": "ssh",
+                "ssh_keyfile_path": "/home/base/.ssh/id_rsa",
+                "partial_dir": ".rsync-partial",
+                "ssh_control_path": "",
+                "transport_profile": "",
+            },
         },
     )
 
 
+def patch_sync_configs() -> None:
+    patch_multiple_configs(Sync, {"sync.json": {"bwlimit_windows": [], "bwlimit_adjust_interval": 300}, "nas.json": {}})
+
+
 @pytest.fixture
 def sync() -> Generator[Sync, None, None]:
     BoundConfig.set_config_base_path(Path() / "base/config")
     sync = Sync(local_target_location=Path(), source_location=Path())
     stimulus = ["echo", "-e", "Status Line 1\n\nExit"]
-    sync._process = Popen(stimulus, stdout=PIPE, stderr=PIPE, bufsize=0, universal_newlines=True)
+    sync._process = Popen(stimulus, stdout=PIPE, stderr=PIPE, bufsize=0)
     yield sync
 
 
@@ -36,6 +48,7 @@ def sync() -> Generator[Sync, None, None]:
 def sync_process_terminate_mocked(mocker: MockFixture) -> Generator[Sync, None, None]:
     BoundConfig.set_config_base_path(Path() / "base/config")
     patch_rsync_command_configs()
+    patch_sync_configs()
     sync = Sync(local_target_location=Path(), source_location=Path())
     mocker.patch("base.logic.backup.synchronisation.sync.Sync.terminate")
     yield sync
@@ -45,6 +58,7 @@ def sync_process_terminate_mocked(mocker: MockFixture) -> Generator[Sync, None,
 def sync_process(mocker: MockFixture) -> Generator[Sync, None, None]:
     mocker.patch("base.logic.backup.synchronisation.sync.Sync._get_command", return_value="/bin/sleep 0.3")
     BoundConfig.set_config_base_path(Path() / "base/config")
+    patch_sync_configs()
     sync = Sync(local_target_location=Path(), source_location=Path())
     yield sync
 
@@ -53,9 +67,9 @@ class TestSshRsync:
     def test_output_generator(self, sync: Sync, monkeypatch: MonkeyPatch) -> None:
         monkeypatch.setattr("base.logic.backup.synchronisation.sync.parse_line_to_status", lambda line, status: line)
         output_generator = sync._output_generator()
-        assert next(output_generator) == "Status Line 1"
-        assert next(output_generator) == ""
-        assert next(output_generator) == "Exit"
+        assert next(output_generator) == b"Status Line 1"
+        assert next(output_generator) == b""
+        assert next(output_generator) == b"Exit"
         with pytest.raises(StopIteration):
             next(output_generator)
 
@@ -81,5 +95,75 @@ class TestSshRsync:
             sync_process._process.wait(0.1)
             assert sync_process._process.poll() is not None
 
-    def test_parse_line_to_status(self) -> None:
-        ...
+    @pytest.mark.parametrize("encode", [str, str.encode])
+    @pytest.mark.parametrize(
+        "line, expected",
+        [
+            ("", SyncStatus()),
+            ("receiving incremental file list", SyncStatus()),
+            (
+                "sent 2,345 bytes  received 271,503,945 bytes  12,345,678.90 bytes/sec",
+                SyncStatus(path=Path(), summary=SyncSummary(bytes_per_second=12345678.9)),
+            ),
+            ("total size is 271,491,600  speedup is 1.00", SyncStatus(finished=True, summary=SyncSummary(speedup=1.0))),
+            ("Number of files: 126 (reg: 120, dir: 6)", SyncStatus(summary=SyncSummary(number_of_files=126))),
+            ("Total file size: 271,491,600 bytes", SyncStatus(summary=SyncSummary(total_file_size=271491600))),
+            ("Number of files.txt", SyncStatus(path=Path("Number of files.txt"))),
+            ("Total chaos.txt", SyncStatus(path=Path("Total chaos.txt"))),
+            ("photos/2021/IMG_0001.jpg", SyncStatus(path=Path("photos/2021/IMG_0001.jpg"))),
+            ("sent to grandma.txt", SyncStatus(path=Path("sent to grandma.txt"))),
+            ("Steuererklärung.pdf", SyncStatus(path=Path("Steuererklärung.pdf"))),
+            (
+                'rsync: [sender] link_stat "/mnt/hdd/none" failed: No such file or directory (2)',
+                SyncStatus(finished=True, error=True),
+            ),
+            (
+                'rsync: link_stat "/mnt/hdd/none" failed: No such file or directory (2)',
+                SyncStatus(finished=True, error=True),
+            ),
+        ],
+    )
+    def test_parse_line_to_status(self, line: str, expected: SyncStatus, encode: Callable[[str], AnyStr]) -> None:
+        assert parse_line_to_status(encode(line), SyncStatus()) == expected
+
+    @pytest.mark.parametrize("encode", [str, str.encode])
+    def test_parse_file_stats(self, encode: Callable[[str], AnyStr]) -> None:
+        status = SyncStatus(start_time=time() - 10)
+        line = "    104,857,600  42%   39.50MB/s    1:02:03 (xfr#7, ir-chk=119/126)"
+        status = parse_line_to_status(encode(line), status)
+        assert status.progress == 0.42
+        assert status.bytes_transferred == 104857600
+        assert status.bytes_per_second == 39.5 * 1024 * 1024
+        assert status.average_bytes_per_second == pytest.approx(10485760, rel=0.01)
+        assert status.eta == timedelta(hours=1, minutes=2, seconds=3)
+        assert status.files_transferred == 7
+        assert status.files_remaining == 119
+
+    def test_parse_file_stats_of_complete_transfer(self) -> None:
+        status = parse_line_to_status("    512 100%    1023.99kB/s    0:00:05", SyncStatus())
+        assert status.progress == 1.0
+        assert status.bytes_per_second == pytest.approx(1023.99 * 1024)
+        assert status.eta == timedelta()
+
+    def test_parse_stats(self) -> None:
+        status = SyncStatus()
+        with open("test/utils/rsync_output/verbose_transfer.txt", "rb") as recording:
+            for line in recording:
+                status = parse_line_to_status(line.rstrip(), status)
+        assert status.finished
+        assert status.files_transferred == 120
+        assert status.files_remaining == 0
+        assert status.summary == SyncSummary(
+            number_of_files=126,
+            number_of_created_files=126,
+            number_of_deleted_files=0,
+            number_of_regular_files_transferred=120,
+            total_file_size=271491600,
+            total_transferred_file_size=271491600,
+            literal_data=271491600,
+            matched_data=0,
+            total_bytes_sent=2345,
+            total_bytes_received=271503945,
+            bytes_per_second=12345678.9,
+            speedup=1.0,
+        )
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from test.utils.patch_config import patch_multiple_configs
+from typing import Any, Dict, Optional
+
+import pytest
+from pytest_mock import MockFixture
+
+from base.logic.backup.synchronisation.transport_profile import TransportProfile
+from base.logic.backup.synchronisation.transport_tuner import BLOCK_SIZE, TransportTuner
+
+CIPHERS = ["aes128-gcm@openssh.com", "chacha20-poly1305@openssh.com"]
+COMPRESSIONS = [{"choice": "lz4", "level": 1}, {"choice": "zstd", "level": 3}]
+
+
+def tuner(tmp_path: Path, **changes: Any) -> TransportTuner:
+    sync_config: Dict[str, Any] = {
+        "transport_profile": (tmp_path / "transport_profile.json").as_posix(),
+        "transport_tuning_interval_days": 7,
+        "transport_tuning_sample_mib": 1,
+        "transport_tuning_trial_timeout": 10,
+        "transport_tuning_ciphers": CIPHERS,
+        "transport_tuning_compressions": COMPRESSIONS,
+        **changes,
+    }
+    patch_multiple_configs(TransportTuner, {"sync.json": sync_config, "nas.json": {"ssh_host": "nas", "ssh_user": "u"}})
+    return TransportTuner(tmp_path, Path("/source"))
+
+
+def fake_trial(profile: TransportProfile, target: Path, basis: Optional[Path] = None) -> Optional[float]:
+    """chacha20 and zstd are fast, lz4 isn't supported by the nas, the delta algorithm pays off"""
+    if profile.compress_choice == "lz4":
+        return None
+    speed = 100.0
+    speed += 50 if profile.cipher == CIPHERS[1] else 0
+    speed += 30 if profile.compress_choice == "zstd" else 0
+    speed -= 20 if profile.whole_file else 0
+    return speed
+
+
+@pytest.fixture
+def trials(mocker: MockFixture) -> Any:
+    mocker.patch("base.logic.backup.synchronisation.transport_tuner.TransportTuner._create_remote_sample")
+    mocker.patch("base.logic.backup.synchronisation.transport_tuner.TransportTuner._remove_remote_sample")
+    mocker.patch("base.logic.backup.synchronisation.transport_tuner.TransportTuner._modify")
+    return mocker.patch(
+        "base.logic.backup.synchronisation.transport_tuner.TransportTuner._trial", side_effect=fake_trial
+    )
+
+
+def test_tune_finds_the_fastest_profile(tmp_path: Path, trials: Any) -> None:
+    transport_tuner = tuner(tmp_path)
+    best = transport_tuner.tune()
+    assert best is not None
+    assert (best.cipher, best.compress_choice, best.compress_level, best.whole_file) == (CIPHERS[1], "zstd", 3, False)
+    assert best.bytes_per_second == 180
+    assert TransportProfile.load(transport_tuner.profile_file) == best
+    assert trials.call_count == 1 + len(CIPHERS) + 1 + len(COMPRESSIONS) + 2
+    assert not transport_tuner.due()
+
+
+def test_aborted_tuning_keeps_the_previous_profile(tmp_path: Path, trials: Any) -> None:
+    transport_tuner = tuner(tmp_path)
+    transport_tuner.terminate()
+    assert transport_tuner.tune() is None
+    assert not transport_tuner.profile_file.exists()
+
+
+@pytest.mark.parametrize(
+    "profile, changes, due",
+    [
+        (None, {}, True),
+        (TransportProfile(host="nas", tuned=datetime.now().isoformat()), {}, False),
+        (TransportProfile(host="nas", tuned=(datetime.now() - timedelta(days=8)).isoformat()), {}, True),
+        (TransportProfile(host="other nas", tuned=datetime.now().isoformat()), {}, True),
+        (None, {"transport_tuning_interval_days": 0}, False),
+        (None, {"transport_profile": ""}, False),
+    ],
+)
+def test_due(tmp_path: Path, profile: Optional[TransportProfile], changes: Dict[str, Any], due: bool) -> None:
+    transport_tuner = tuner(tmp_path, **changes)
+    if profile is not None:
+        profile.save(transport_tuner.profile_file)
+    assert transport_tuner.due() == due
+
+
+def test_modify(tmp_path: Path) -> None:
+    sample = tmp_path / "sample"
+    sample.write_bytes(bytes(BLOCK_SIZE * 12))
+    TransportTuner._modify(sample)
+    content = sample.read_bytes()
+    assert len(content) == BLOCK_SIZE * 12
+    assert content[:BLOCK_SIZE] == b"\xff" * BLOCK_SIZE
+    assert content[BLOCK_SIZE : 10 * BLOCK_SIZE] == bytes(9 * BLOCK_SIZE)
+    assert content[10 * BLOCK_SIZE : 11 * BLOCK_SIZE] == b"\xff" * BLOCK_SIZE
+    assert sample.stat().st_mtime == 0
+
+
+def test_unreachable_nas_keeps_the_previous_profile(tmp_path: Path, mocker: MockFixture) -> None:
+    mocker.patch("paramiko.SSHClient.close")
+    mocker.patch("base.common.ssh_interface.SSHInterface.connect", return_value="timed out")
+    run_and_raise = mocker.patch("base.common.ssh_interface.SSHInterface.run_and_raise")
+    trial = mocker.patch("base.logic.backup.synchronisation.transport_tuner.TransportTuner._trial")
+    transport_tuner = tuner(tmp_path)
+    transport_tuner.tune_if_due()
+    run_and_raise.assert_not_called()
+    trial.assert_not_called()
+    assert not transport_tuner.profile_file.exists()
@@ -19,6 +19,18 @@ from py import path
 
 from base.common.constants import current_backup_timestring_format_for_directory
 from base.logic.backup.protocol import Protocol
+from base.logic.backup.snapshot_strategy import SnapshotStrategy
+
+# no time windows, and the thresholds are never reached
+UNLIMITED_BANDWIDTH = {
+    "bwlimit_windows": [],
+    "bwlimit_adjust_interval": 300,
+    "bwlimit_reduction_factor": 0.5,
+    "bwlimit_minimum_kib_per_second": 1024,
+    "bwlimit_nas_load_threshold": 100.0,
+    "bwlimit_sbu_temperature_threshold": 100.0,
+    "bwlimit_input_current_threshold": 10.0,
+}
 
 
 @pytest.fixture
@@ -88,6 +100,7 @@ class BackupTestEnvironmentInput:
     bytesize_of_each_old_backup: int
     amount_preexisting_source_files_in_latest_backup: int = 0
     no_teardown: bool = False
+    snapshot_strategy: SnapshotStrategy = SnapshotStrategy.HARDLINK_COPY
 
 
 BackupTestEnvironmentOutput = namedtuple("BackupTestEnvironmentOutput", "sync_config backup_config nas_config")
@@ -206,12 +219,19 @@ class BackupTestEnvironment:
             "local_backup_target_location": self._sink.as_posix(),
             "local_nas_hdd_mount_point": SMB_MOUNTPOINT.as_posix(),
             "protocol": "smb",
+            "snapshot_strategy": self._configuration.snapshot_strategy.value,
+            "reuse_change_list": True,
+            "change_list_max_age": 600,
+            "backup_catalog_sd_copy": "/tmp/base_backup_catalog.jsonl",
+            "partial_dir": ".rsync-partial",
+            **UNLIMITED_BANDWIDTH,
         }
         nas_config = {
             "smb_host": "127.0.0.1",
             "smb_user": "base",
             "smb_credentials_file": "/etc/base-credentials",
             "smb_share_name": "Backup",
+            "share_root_cache": "/tmp/base_nas_share_roots.json",
         }
         p = Popen("mount /tmp/base_tmpshare_mntdir/".split(), stderr=PIPE)
         p.wait()
@@ -221,17 +241,31 @@ class BackupTestEnvironment:
                 raise Exception(
                     "Error in the Test Environment: please make sure /etc/samba/smb.conf is set up to have a share named 'Backup' on path '/tmp/base_tmpshare'"
                 )
-        return BackupTestEnvironmentOutput(sync_config=sync_config, backup_config={}, nas_config=nas_config)
+        return BackupTestEnvironmentOutput(
+            sync_config=sync_config, backup_config={"scrub_after_backup": False}, nas_config=nas_config
+        )
 
     def prepare_for_ssh(self) -> BackupTestEnvironmentOutput:
         sync_config = {
             "remote_backup_source_location": self._src.as_posix(),
             "local_backup_target_location": self._sink.as_posix(),
             "protocol": "ssh",
+            "ssh_control_path": "/tmp/base_test_ssh_%r@%h:%p",
+            "ssh_control_persist": 60,
+            "transport_profile": "",
+            "snapshot_strategy": self._configuration.snapshot_strategy.value,
+            "reuse_change_list": True,
+            "change_list_max_age": 600,
+            "backup_catalog_sd_copy": "/tmp/base_backup_catalog.jsonl",
+            "partial_dir": ".rsync-partial",
+            **UNLIMITED_BANDWIDTH,
         }
         nas_config = {
             "ssh_host": "127.0.0.1",
             "ssh_port": 22,
             "ssh_user": getuser(),
+            "share_root_cache": "/tmp/base_nas_share_roots.json",
         }
-        return BackupTestEnvironmentOutput(sync_config=sync_config, backup_config={}, nas_config=nas_config)
+        return BackupTestEnvironmentOutput(
+            sync_config=sync_config, backup_config={"scrub_after_backup": False}, nas_config=nas_config
+        )
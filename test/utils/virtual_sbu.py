@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import os
+import struct
+import tty
+from dataclasses import dataclass, field
+from pathlib import Path
+from random import Random
+from select import select
+from threading import Event, Thread
+from time import sleep
+from types import TracebackType
+from typing import Dict, List, Optional, Sequence, Type
+
+from base.common.constants import BAUD_RATE
+from base.hardware.sbu.commands import SbuCommand, SbuCommands
+from base.hardware.sbu.framing import BINARY_FRAMING_OFFER, FLAG_NAK, MAGIC, Frame, FrameDecoder
+
+HEADER = struct.Struct("<BBBBH")  # see Frame
+CRC_SIZE = 2
+BITS_PER_BYTE = 10  # start bit, 8 data bits, stop bit
+KNOWN_CODES = {command.message_code for command in vars(SbuCommands).values() if isinstance(command, SbuCommand)}
+
+
+@dataclass
+class VirtualSbuTiming:
+    """Delays of the firmware in seconds. A response frame is sent after all three of them."""
+
+    acknowledge_delay: float = 0.0
+    response_delay: float = 0.0  # e.g. the conversion of the ADC
+    ready_delay: float = 0.0
+    line_rate: bool = True  # bytes take as long as on the UART at the current baud rate
+
+
+@dataclass
+class VirtualSbuFaults:
+    """Probabilities of the faults per message."""
+
+    drop: float = 0.0  # the message is ignored
+    corrupt: float = 0.0  # a byte of the answer is flipped
+    nak: float = 0.0  # a frame is rejected
+    seed: int = 0
+
+
+@dataclass
+class VirtualSbuState:
+    raw_measurements: Dict[str, int] = field(
+        default_factory=lambda: {
+            SbuCommands.measure_current.message_code: 512,
+            SbuCommands.measure_vcc3v.message_code: 1008,
+            SbuCommands.measure_temperature.message_code: 25,
+        }
+    )
+    wakeup_reason: str = "WR_BACKUP"
+    display: List[str] = field(default_factory=lambda: ["", ""])
+    display_brightness: int = 0
+    led_brightness: int = 0
+    seconds_to_next_bu: Optional[int] = None
+    readable_timestamp: str = ""
+    shutdown_requested: bool = False
+
+
+class VirtualSbu:
+    """Emulates the SBU on a pseudo terminal, so that the SerialInterface, the SbuSession and the SbuCommunicator can be
+    tested end-to-end and benchmarked without the board. The slave end of the terminal is used as port.
+
+    It implements the text protocol (ACK, response, Ready) of the commands in SbuCommands, the negotiation of the binary
+    framing (if binary_framing) and of the baud rate (if baud_rates are given). Messages of unknown commands are
+    ignored like the firmware does. The timing and faults are adjustable while the emulation runs.
+    """
+
+    def __init__(
+        self,
+        timing: Optional[VirtualSbuTiming] = None,
+        faults: Optional[VirtualSbuFaults] = None,
+        binary_framing: bool = True,
+        baud_rates: Sequence[int] = (),
+    ) -> None:
+        self.timing = timing or VirtualSbuTiming()
+        self.faults = faults or VirtualSbuFaults()
+        self.state = VirtualSbuState()
+        self.received: List[str] = []
+        self._supports_binary_framing = binary_framing
+        self._baud_rates = baud_rates
+        self._baud_rate = BAUD_RATE
+        self._binary_framing = False
+        self._random = Random(self.faults.seed)
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self._port = Path(os.ttyname(self._slave))
+        self._buffer = bytearray()
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, name="VirtualSbu", daemon=True)
+
+    @property
+    def port(self) -> Path:
+        return self._port
+
+    @property
+    def baud_rate(self) -> int:
+        return self._baud_rate
+
+    @property
+    def binary_framing(self) -> bool:
+        return self._binary_framing
+
+    def __enter__(self) -> VirtualSbu:
+        self.start()
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException], exc_tb: Optional[TracebackType]
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(1)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            readable, _, _ = select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            data = os.read(self._master, 4096)
+            self._transmission(len(data))
+            self._buffer += data
+            self._process()
+
+    def _process(self) -> None:
+        while self._buffer:
+            if self._buffer[0] == 0:  # flush_sbu_channel
+                del self._buffer[0]
+            elif self._binary_framing and self._buffer[0] == MAGIC:
+                if len(self._buffer) < HEADER.size:
+                    return
+                length = HEADER.unpack_from(self._buffer)[4]
+                end = HEADER.size + length + CRC_SIZE
+                if len(self._buffer) < end:
+                    return
+                frames = FrameDecoder().feed(bytes(self._buffer[:end]))
+                del self._buffer[:end]
+                for frame in frames:
+                    self._handle_frame(frame)
+            else:
+                end = self._buffer.find(b"\n")
+                if end < 0:
+                    return
+                line = self._buffer[:end].decode(errors="replace").strip()
+                del self._buffer[: end + 1]
+                self._handle_line(line)
+
+    def _handle_line(self, line: str) -> None:
+        code, _, payload = line.partition(":")
+        if not self._known(code) or self._fault(self.faults.drop):
+            return
+        self.received.append(line)
+        sleep(self.timing.acknowledge_delay)
+        self._send(f"ACK:{code}\n".encode())
+        response = self._execute(code, payload)
+        sleep(self.timing.response_delay)
+        if response is not None:
+            self._send(f"{response}\n".encode())
+        sleep(self.timing.ready_delay)
+        self._send(b"Ready\n")
+        self._switch(code, payload, response)
+
+    def _handle_frame(self, frame: Frame) -> None:
+        code, _, payload = frame.payload.decode(errors="replace").partition(":")
+        if not self._known(code) or self._fault(self.faults.drop):
+            return
+        if self._fault(self.faults.nak):
+            self._send(Frame(sequence=frame.sequence, flags=FLAG_NAK).encode())
+            return
+        self.received.append(f"{code}:{payload}")
+        response = self._execute(code, payload)
+        sleep(self.timing.acknowledge_delay + self.timing.response_delay + self.timing.ready_delay)
+        self._send(Frame(sequence=frame.sequence, payload=(response or "").encode()).encode())
+
+    def _known(self, code: str) -> bool:
+        if code == SbuCommands.set_baud_rate.message_code:
+            return bool(self._baud_rates)
+        return code in KNOWN_CODES
+
+    def _execute(self, code: str, payload: str) -> Optional[str]:
+        """:return: the response, None for commands without response"""
+        state = self.state
+        if code == SbuCommands.test.message_code:
+            accepted = payload == BINARY_FRAMING_OFFER and self._supports_binary_framing
+            return f"Echo:{BINARY_FRAMING_OFFER}" if accepted else "Echo"
+        if code == SbuCommands.set_baud_rate.message_code:
+            return f"{code}:{payload if payload.isdigit() and int(payload) in self._baud_rates else 0}"
+        if code in state.raw_measurements:
+            return f"{code}:{state.raw_measurements[code]}"
+        if code == SbuCommands.set_seconds_to_next_bu.message_code:
+            state.seconds_to_next_bu = int(payload)
+            return f"CMP:{int(payload) // 32}"
+        if code == SbuCommands.request_wakeup_reason.message_code:
+            return state.wakeup_reason
+        if code == SbuCommands.set_wakeup_reason.message_code:
+            state.wakeup_reason = payload
+        elif code == SbuCommands.write_to_display_line1.message_code:
+            state.display[0] = payload
+        elif code == SbuCommands.write_to_display_line2.message_code:
+            state.display[1] = payload
+        elif code == SbuCommands.set_display_brightness.message_code:
+            state.display_brightness = int(payload)
+        elif code == SbuCommands.set_led_brightness.message_code:
+            state.led_brightness = int(payload)
+        elif code == SbuCommands.send_readable_timestamp_of_next_bu.message_code:
+            state.readable_timestamp = payload
+        elif code == SbuCommands.request_shutdown.message_code:
+            state.shutdown_requested = True
+        elif code == SbuCommands.abort_shutdown.message_code:
+            state.shutdown_requested = False
+        return None
+
+    def _switch(self, code: str, payload: str, response: Optional[str]) -> None:
+        """after Ready, like the firmware"""
+        if code == SbuCommands.test.message_code and response is not None:
+            self._binary_framing = BINARY_FRAMING_OFFER in response
+        elif code == SbuCommands.set_baud_rate.message_code and response == f"{code}:{payload}":
+            self._baud_rate = int(payload)
+
+    def _send(self, data: bytes) -> None:
+        if self._fault(self.faults.corrupt):
+            corrupted = bytearray(data)
+            corrupted[self._random.randrange(len(corrupted))] ^= 0xFF
+            data = bytes(corrupted)
+        self._transmission(len(data))
+        os.write(self._master, data)
+
+    def _transmission(self, size: int) -> None:
+        if self.timing.line_rate:
+            sleep(size * BITS_PER_BYTE / self._baud_rate)
+
+    def _fault(self, probability: float) -> bool:
+        return probability > 0 and self._random.random() < probability